@@ -0,0 +1,171 @@
+"""Load benchmark of the hot handlers against a fake Telegram client and in-memory database.
+
+    python benchmarks/bench_handlers.py                      # all scenarios
+    python benchmarks/bench_handlers.py join start --ops 5000 --latency 0.08
+    python benchmarks/bench_handlers.py broadcast --users 20000 --flood-rate 0.001
+
+Runs offline. Outgoing rate limits are lifted unless --real-limits is given,
+so the numbers reflect the code rather than Telegram's quotas.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakes  # noqa: E402  (sets up the environment before any plugin import)
+
+SCENARIOS = ("join", "start", "fsub", "quote", "broadcast")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_ops(op, count: int, concurrency: int) -> list:
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            started = time.perf_counter()
+            try:
+                await op(i)
+            except Exception as e:
+                logging.debug(f"op {i} failed: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies
+
+
+async def settle():
+    # Let fire-and-forget posts (log / approve channel) finish so their API calls are counted
+    from plugins.sender import sender
+    while sender._backlog:
+        await asyncio.sleep(0.01)
+
+
+async def scenario(name, args, client, db, dispatcher):
+    import plugins.bio as bio
+    import plugins.broadcast as broadcast
+    import plugins.fsub as fsub
+    rnd = random.Random(args.seed)
+    users = [10_000 + i for i in range(args.users)]
+    chats = [-1001_000_000_000 - i for i in range(args.chats)]
+
+    if name == "join":
+        # What a join-queue worker runs for each request
+        async def op(i):
+            await bio.join_queue.process(client, fakes.make_join_request(client, rnd.choice(chats), rnd.choice(users)))
+        return await run_ops(op, args.ops, args.concurrency), args.ops
+
+    if name == "start":
+        async def op(i):
+            await dispatcher.feed(fakes.make_message(client, users[i % len(users)], users[i % len(users)], "/start"))
+        return await run_ops(op, args.ops, args.concurrency), args.ops
+
+    if name == "fsub":
+        async def op(i):
+            user_id = rnd.choice(users)
+            await fsub.get_fsub(client, fakes.make_message(client, user_id, user_id, "/start"))
+        return await run_ops(op, args.ops, args.concurrency), args.ops
+
+    if name == "quote":
+        from plugins.quote.quote import quote_store
+        categories = quote_store.categories
+
+        async def op(i):
+            await dispatcher.feed(fakes.make_callback(client, rnd.choice(users), f"quote_{rnd.choice(categories)}"))
+        return await run_ops(op, args.ops, args.concurrency), args.ops
+
+    if name == "broadcast":
+        db.users.clear()
+        db.seed_users(users)
+        latencies = []
+        send_one = broadcast.BroadcastJob._send_one
+
+        async def timed_send_one(self, user_id):
+            started = time.perf_counter()
+            await send_one(self, user_id)
+            latencies.append(time.perf_counter() - started)
+
+        broadcast.BroadcastJob._send_one = timed_send_one
+        try:
+            original = fakes.make_message(client, fakes.ADMIN_ID, fakes.ADMIN_ID, "Hello everyone")
+            await dispatcher.feed(fakes.make_message(client, fakes.ADMIN_ID, fakes.ADMIN_ID, "/broadcast", reply_to=original))
+            await broadcast.current_job.task
+        finally:
+            broadcast.BroadcastJob._send_one = send_one
+        return latencies, len(users)
+
+    raise ValueError(name)
+
+
+async def main(args):
+    db = fakes.install_fake_db(args.db_latency)
+    client = fakes.FakeClient(
+        latency=args.latency, jitter=args.latency / 4, flood_rate=args.flood_rate,
+        flood_seconds=args.flood_seconds, error_rate=args.error_rate, seed=args.seed
+    )
+    dispatcher = fakes.Dispatcher(client, fakes.load_plugins())
+    import plugins.bio as bio
+
+    print(
+        f"latency {args.latency * 1000:.0f} ms · db {args.db_latency * 1000:.1f} ms · "
+        f"flood {args.flood_rate:.2%} · errors {args.error_rate:.2%} · concurrency {args.concurrency}"
+        f"{' · real rate limits' if args.real_limits else ''}\n"
+    )
+    print(f"{'scenario':<10} {'ops':>7} {'secs':>8} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'api/op':>7} {'db/op':>6}   top API calls")
+    for name in args.scenarios:
+        client.calls.clear()
+        db.ops.clear()
+        started = time.perf_counter()
+        latencies, ops = await scenario(name, args, client, db, dispatcher)
+        elapsed = time.perf_counter() - started
+        await settle()
+        api = sum(client.calls.values())
+        top = ", ".join(f"{method} {count / ops:.2f}" for method, count in client.calls.most_common(3))
+        print(
+            f"{name:<10} {ops:>7} {elapsed:>8.2f} {ops / elapsed:>9.1f} "
+            f"{percentile(latencies, 0.5) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} "
+            f"{api / ops:>7.2f} {sum(db.ops.values()) / ops:>6.2f}   {top}"
+        )
+    await bio.join_queue.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per scenario")
+    parser.add_argument("--users", type=int, default=5000, help="distinct users (also the broadcast audience)")
+    parser.add_argument("--chats", type=int, default=20, help="distinct chats receiving join requests")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean API latency, seconds")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="per-operation database latency, seconds")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="probability an API call raises FloodWait")
+    parser.add_argument("--flood-seconds", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability an API call raises an RPC error")
+    parser.add_argument("--real-limits", action="store_true", help="keep the production send rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.real_limits:
+        fakes.unthrottle()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(args))
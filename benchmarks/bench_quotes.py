@@ -0,0 +1,69 @@
+"""Micro-benchmark: quote callback body, per-call file read vs preloaded QuoteStore.
+
+    python benchmarks/bench_quotes.py
+"""
+import json
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from plugins.quote.store import EMOJI_GROUPS, QuoteStore, get_random_emoji  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "plugins" / "quote" / "quotes"
+
+
+# The implementation QuoteStore replaced (plugins/quote/quote.py)
+def old_get_all_categories():
+    return [file.stem for file in DATA_DIR.glob("*.json") if file.is_file()]
+
+
+def old_get_random_quote(category):
+    file_path = DATA_DIR / f"{category}.json"
+    if not file_path.exists():
+        return "⚠️ No quotes found for this category."
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            quotes = json.load(f)
+    except json.JSONDecodeError:
+        return "⚠️ Invalid JSON format in quotes file."
+    quote_data = random.choice(quotes)
+    if isinstance(quote_data, dict):
+        return f"\"{quote_data.get('quote', str(quote_data))}\""
+    return f"\"{str(quote_data)}\""
+
+
+def old_get_random_emoji():
+    # The dict literal was rebuilt on every call
+    emoji_categories = {name: list(group) for name, group in EMOJI_GROUPS.items()}
+    all_emojis = [emoji for category in emoji_categories.values() for emoji in category]
+    return ''.join(random.choices(all_emojis, k=random.randint(1, 2)))
+
+
+def old_callback(category):
+    # Button press + the three emoji lookups of an auto-post
+    old_get_all_categories()
+    return f"{old_get_random_emoji()} {old_get_random_quote(category)} {old_get_random_emoji()} {old_get_random_emoji()}"
+
+
+def new_callback(store, category):
+    store.categories
+    return f"{get_random_emoji()} {store.random_quote(category)} {get_random_emoji()} {get_random_emoji()}"
+
+
+def main():
+    store = QuoteStore(DATA_DIR)
+    store.refresh()
+    print(f"{'category':>12} {'old/s':>10} {'new/s':>12} {'speed-up':>9}")
+    for category in store.categories:
+        old = min(timeit.repeat(lambda: old_callback(category), number=200, repeat=5)) / 200
+        new = min(timeit.repeat(lambda: new_callback(store, category), number=20000, repeat=5)) / 20000
+        print(f"{category:>12} {1 / old:>10.0f} {1 / new:>12.0f} {old / new:>8.0f}x")
+    refresh = min(timeit.repeat(store.refresh, number=1000, repeat=5)) / 1000
+    print(f"\nwatcher poll with nothing changed: {refresh * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Micro-benchmark: tag rule matching, old substring scan vs TagRules (scan up to SCAN_LIMIT rules, Aho-Corasick above).
+
+    python benchmarks/bench_tags.py
+"""
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from plugins.matcher import TagRules  # noqa: E402
+
+
+# The implementation TagRules replaced (plugins/bio.py before per-chat rules)
+def old_required_tags(tag_map, description):
+    description = description.lower()
+    required_tags = []
+    for hashtag, tags in tag_map.items():
+        if hashtag in description:
+            required_tags.extend(tags)
+    return list(dict.fromkeys(required_tags))
+
+
+def make_rules(n, rnd):
+    rules = {}
+    while len(rules) < n:
+        word = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 12)))
+        rules["#" + word] = ["@" + word + "_channel"]
+    return rules
+
+
+def make_description(rules, rnd):
+    words = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(2, 9))) for _ in range(45)]
+    words += rnd.sample(list(rules), 2)
+    rnd.shuffle(words)
+    return "Welcome to our channel! " + " ".join(words)
+
+
+def bench(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    rnd = random.Random(42)
+    print(f"{'rules':>7} {'old µs':>10} {'new µs':>10} {'speed-up':>9}   (required tags from description)")
+    for n in (6, 32, 100, 1000, 5000, 20000):
+        rules = make_rules(n, rnd)
+        description = make_description(rules, rnd)
+        compiled = TagRules(rules)
+        assert compiled.required_tags(description) == old_required_tags(rules, description)
+        number = max(20, 20000 // n)
+        old = bench(lambda: old_required_tags(rules, description), number)
+        new = bench(lambda: compiled.required_tags(description), number)
+        print(f"{n:>7} {old:>10.1f} {new:>10.1f} {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Throughput of the multi-process mode (WORKER_PROCESSES) on the handler benchmark workload.
+
+    python benchmarks/bench_workers.py                         # 1, 2 and 4 processes
+    python benchmarks/bench_workers.py --processes 1 2 4 8 --ops 20000 --latency 0.01
+
+The main process shards join requests and /start messages by chat id over the
+same WorkerPool the bot uses; each worker runs the plugin handlers against the
+fake client and in-memory database from fakes.py. Every send still takes its
+rate-limit slot from the single sender in the main process, so that round
+trip is part of the numbers. API latency is simulated inside the workers.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakes  # noqa: E402  (sets up the environment before any plugin import)
+from bench_handlers import percentile  # noqa: E402
+
+
+async def _worker(index, inbox, outbox, latency, db_latency, concurrency, seed):
+    fakes.install_fake_db(db_latency)
+    client = fakes.FakeClient(latency=latency, jitter=latency / 4, seed=seed + index)
+    dispatcher = fakes.Dispatcher(client, fakes.load_plugins())
+    import plugins.bio as bio
+    from plugins.sender import sender
+    from plugins.workers import WorkerLink
+
+    link = WorkerLink(index, inbox, outbox)
+    sender.remote = link
+    sem = asyncio.Semaphore(concurrency)
+
+    async def handle(item):
+        kind, chat_id, user_id = item
+        async with sem:
+            started = time.perf_counter()
+            try:
+                if kind == "join":
+                    await bio.join_queue.process(client, fakes.make_join_request(client, chat_id, user_id))
+                else:
+                    await dispatcher.feed(fakes.make_message(client, user_id, user_id, "/start"))
+                ok = True
+            except Exception as e:
+                logging.debug(f"{kind} failed: {e}")
+                ok = False
+        link.send("done", kind, ok, time.perf_counter() - started)
+
+    link.start(lambda item: asyncio.create_task(handle(item)))
+    link.send("ready", index)
+    await link.stopped.wait()
+
+
+def bench_worker(index, inbox, outbox, *args):
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(_worker(index, inbox, outbox, *args))
+
+
+async def run(processes: int, args) -> dict:
+    from plugins.sender import sender
+    from plugins.workers import WorkerPool
+
+    loop = asyncio.get_running_loop()
+    ready, finished = asyncio.Event(), asyncio.Event()
+    started_workers = set()
+    results = Counter()
+    latencies = []
+
+    def on_ready(index):
+        started_workers.add(index)
+        if len(started_workers) == processes:
+            ready.set()
+
+    def on_done(kind, ok, seconds):
+        results[kind if ok else "failed"] += 1
+        latencies.append(seconds)
+        if len(latencies) == args.ops:
+            finished.set()
+
+    pool = WorkerPool(processes, bench_worker, args.latency, args.db_latency, args.concurrency, args.seed)
+    boot = loop.time()
+    pool.start({"acquire": sender.acquire, "feedback": sender.feedback, "ready": on_ready, "done": on_done})
+    await ready.wait()
+    boot = loop.time() - boot
+
+    rnd = random.Random(args.seed)
+    users = [10_000 + i for i in range(args.users)]
+    chats = [-1001_000_000_000 - i for i in range(args.chats)]
+    started = time.perf_counter()
+    for i in range(args.ops):
+        user_id = rnd.choice(users)
+        if rnd.random() < args.join_share:
+            pool.submit(chat_id := rnd.choice(chats), ("join", chat_id, user_id))
+        else:
+            pool.submit(user_id, ("start", user_id, user_id))
+    await finished.wait()
+    elapsed = time.perf_counter() - started
+    await pool.stop()
+    return {
+        "elapsed": elapsed, "boot": boot, "failed": results["failed"],
+        "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99),
+    }
+
+
+async def main(args):
+    print(
+        f"{args.ops} ops ({args.join_share:.0%} join requests) · latency {args.latency * 1000:.0f} ms · "
+        f"concurrency {args.concurrency}/process · {os.cpu_count()} CPUs\n"
+    )
+    print(f"{'processes':>9} {'boot s':>7} {'secs':>8} {'ops/s':>9} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    baseline = None
+    for processes in args.processes:
+        r = await run(processes, args)
+        rate = args.ops / r["elapsed"]
+        baseline = baseline or rate
+        print(
+            f"{processes:>9} {r['boot']:>7.1f} {r['elapsed']:>8.2f} {rate:>9.1f} {rate / baseline:>7.2f}x "
+            f"{r['p50'] * 1000:>8.1f} {r['p99'] * 1000:>8.1f} {r['failed']:>7}"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ops", type=int, default=10000)
+    parser.add_argument("--join-share", type=float, default=0.7, help="fraction of ops that are join requests")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=64, help="distinct chats receiving join requests")
+    parser.add_argument("--concurrency", type=int, default=200, help="updates in flight per process")
+    parser.add_argument("--latency", type=float, default=0.005, help="mean API latency, seconds")
+    parser.add_argument("--db-latency", type=float, default=0.0005, help="per-operation database latency, seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    fakes.unthrottle()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(args))
@@ -0,0 +1,71 @@
+"""Check Bot.invoke's FloodWait handling: sleeps are not handler API time, and sends through sender.call see every FloodWait.
+
+    python benchmarks/check_invoke_timing.py
+
+Runs offline: the parent Client.invoke is replaced by one that raises a
+FloodWait on the first call and answers after --latency on the next, and the
+bot's instrumented-handler accounting is read back.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fakes  # noqa: E402  (sets up the environment before any plugin import)
+from pyrogram import Client, raw  # noqa: E402
+from pyrogram.errors import FloodWait  # noqa: E402
+
+
+async def main(args):
+    # Plugins bind to the in-memory database; nothing here may reach MongoDB
+    fakes.install_fake_db()
+    import bot
+    from plugins import metrics
+    metrics.detailed = True
+
+    calls = 0
+
+    async def telegram(self, query, *a, **kw):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(args.latency)
+        if calls == 1:
+            raise FloodWait(value=args.flood)
+        return True
+
+    Client.invoke = telegram
+    client = bot.Bot()
+
+    async def handler(client, update):
+        return await client.invoke(raw.functions.help.GetConfig())
+
+    handler.__module__ = "plugins.check"
+    started = time.perf_counter()
+    await metrics.instrument(handler)(client, None)
+    wall = time.perf_counter() - started
+    api = metrics.handler_api_seconds.labels("check.handler").sum
+
+    print(f"wall {wall:.3f}s · api {api:.3f}s · expected api ≈ {2 * args.latency:.3f}s (FloodWait {args.flood}s excluded)")
+    assert calls == 2, calls
+    assert wall >= args.flood, "FloodWait was not slept"
+    assert api < args.flood, "FloodWait sleep was counted as API time"
+    assert api >= 2 * args.latency * 0.9, "round trips were not counted"
+
+    # Inside sender.call every FloodWait reaches the sender, which backs off and retries
+    from plugins.sender import sender
+    calls, floods = 0, sender.flood_waits
+    await sender.call(1, 0, client.invoke, raw.functions.help.GetConfig())
+    print(f"sender.call: {calls} calls, {sender.flood_waits - floods} FloodWait reported to the sender")
+    assert calls == 2 and sender.flood_waits == floods + 1, "FloodWait was absorbed by Bot.invoke"
+    print("ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated round trip, seconds")
+    parser.add_argument("--flood", type=int, default=1, help="FloodWait seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,487 @@
+"""Offline stand-ins for Telegram and MongoDB, shared by the handler benchmarks and replay.
+
+Import this module before anything under ``plugins``: it fills in the config
+environment and swaps ``plugins.database.db`` for an in-memory ``FakeDatabase``
+so the plugins bind to the fake when they do ``from .database import db``.
+"""
+import asyncio
+import datetime
+import importlib
+import itertools
+import os
+import random
+import sys
+import tempfile
+from collections import Counter, defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+ADMIN_ID = 1000
+BOT_ID = 999
+LOG_CHANNEL = -1000000000001
+APPROVE_CHANNEL = -1000000000002
+AUTH_CHANNELS = (-1000000000003, -1000000000004)
+
+for key, value in {
+    "API_ID": "1", "API_HASH": "bench", "BOT_TOKEN": "1:bench",
+    "LOG_CHANNEL": str(LOG_CHANNEL), "ADMINS": str(ADMIN_ID),
+    "DB_URI": "mongodb://127.0.0.1:9", "APPROVE_CHANNEL": str(APPROVE_CHANNEL),
+    "AUTH_CHANNEL": " ".join(map(str, AUTH_CHANNELS)),
+    "BROADCAST_DIR": tempfile.mkdtemp(prefix="bench-broadcasts-"),
+    "REGISTRY_DB": os.path.join(tempfile.mkdtemp(prefix="bench-registry-"), "bot_data.db"),
+}.items():
+    os.environ.setdefault(key, value)
+
+
+def unthrottle():
+    """Lift the outgoing rate limits so benchmarks measure the code, not Telegram's quotas."""
+    for key in ("SEND_GLOBAL_RATE", "SEND_PRIVATE_RATE", "SEND_GROUP_RATE"):
+        os.environ.setdefault(key, "1e9")
+    os.environ.setdefault("SEND_CHAT_BACKLOG", "1000000")
+
+
+from pyrogram import enums, types, ContinuePropagation, StopPropagation  # noqa: E402
+from pyrogram.errors import FloodWait, InternalServerError, UserNotParticipant  # noqa: E402
+from pyrogram.handlers import (  # noqa: E402
+    CallbackQueryHandler, ChatJoinRequestHandler, ChatMemberUpdatedHandler, MessageHandler
+)
+
+
+class FakeClient:
+    """Answers the Client methods the plugins use, after a simulated network delay.
+
+    Every call is counted by method name. ``flood_rate`` and ``error_rate`` are
+    the probabilities that a call raises FloodWait / InternalServerError
+    instead of succeeding.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.01, flood_rate=0.0, flood_seconds=1, error_rate=0.0,
+                 member_rate=0.9, tagged_rate=0.7, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.flood_seconds = flood_seconds
+        self.error_rate = error_rate
+        self.member_rate = member_rate
+        self.tagged_rate = tagged_rate
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.me = types.User(client=self, id=BOT_ID, is_bot=True, first_name="Bench", username="bench_bot")
+        self.parse_mode = enums.ParseMode.DEFAULT
+        self.is_connected = True
+        self.sleep_threshold = 10
+        self._message_ids = itertools.count(1)
+        self._links = itertools.count(1)
+
+    async def _api(self, method: str):
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+        roll = self.rng.random()
+        if roll < self.flood_rate:
+            raise FloodWait(value=self.flood_seconds)
+        if roll < self.flood_rate + self.error_rate:
+            raise InternalServerError("injected")
+
+    def _message(self, chat_id, text=None):
+        return make_message(self, chat_id, chat_id, text, message_id=next(self._message_ids), outgoing=True)
+
+    # 📥 Reads
+    async def get_chat(self, chat_id):
+        await self._api("get_chat")
+        if chat_id > 0:
+            # Deterministic per user, so repeated lookups agree
+            tagged = random.Random(chat_id).random() < self.tagged_rate
+            return SimpleNamespace(id=chat_id, type=enums.ChatType.PRIVATE, bio="learning #motivation daily" if tagged else "")
+        return SimpleNamespace(
+            id=chat_id, type=enums.ChatType.CHANNEL, title=f"Channel {chat_id}",
+            description="Daily quotes #Motivation #Success", members_count=12345,
+            invite_link=f"https://t.me/+bench{-chat_id}",
+        )
+
+    async def get_chat_members_count(self, chat_id):
+        await self._api("get_chat_members_count")
+        return 12345
+
+    async def get_chat_member(self, chat_id, user_id):
+        await self._api("get_chat_member")
+        if random.Random(user_id * 31 + chat_id).random() >= self.member_rate:
+            raise UserNotParticipant()
+        return SimpleNamespace(status=enums.ChatMemberStatus.MEMBER, is_member=True)
+
+    async def get_chat_invite_link(self, chat_id, invite_link):
+        await self._api("get_chat_invite_link")
+        return SimpleNamespace(invite_link=invite_link, is_revoked=False, expire_date=None)
+
+    # 📤 Writes
+    async def create_chat_invite_link(self, chat_id, **kwargs):
+        await self._api("create_chat_invite_link")
+        return SimpleNamespace(invite_link=f"https://t.me/+link{next(self._links)}")
+
+    async def export_chat_invite_link(self, chat_id):
+        await self._api("export_chat_invite_link")
+        return f"https://t.me/+export{next(self._links)}"
+
+    async def send_message(self, chat_id, text, *args, **kwargs):
+        await self._api("send_message")
+        return self._message(chat_id, text)
+
+    async def send_sticker(self, chat_id, sticker, *args, **kwargs):
+        await self._api("send_sticker")
+        return self._message(chat_id)
+
+    async def send_document(self, chat_id, document, *args, **kwargs):
+        await self._api("send_document")
+        return self._message(chat_id)
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, *args, **kwargs):
+        await self._api("copy_message")
+        return self._message(chat_id)
+
+    async def edit_message_text(self, chat_id, message_id, text, *args, **kwargs):
+        await self._api("edit_message_text")
+        return self._message(chat_id, text)
+
+    # pyrofork's handlers ask for a pending client.listen() first
+    def get_listener_matching_with_data(self, data, listener_type):
+        return None
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    def __getattr__(self, name):
+        # approve_chat_join_request, answer_callback_query, delete_messages, ...
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            await self._api(name)
+            return True
+        return call
+
+
+class FakeDatabase:
+    """In-memory ``plugins.database.Database`` with an optional per-operation delay."""
+
+    def __init__(self, latency=0.0):
+        from plugins.database import KnownUsers
+        self.latency = latency
+        self.ops = Counter()
+        self.users = {}
+        self.links = {}
+        self.broadcasts = {}
+        self.approved = {}
+        self.rules = {}
+        self.drains = {}
+        self.quote_channels = {}
+        self.quote_seeded = False
+        self.outbox = {}
+        self.known = KnownUsers()
+        self._ids = itertools.count(1)
+
+    async def _op(self, name):
+        self.ops[name] += 1
+        await asyncio.sleep(self.latency)
+
+    def seed_users(self, user_ids):
+        for user_id in user_ids:
+            self.users[int(user_id)] = {"id": int(user_id), "name": f"user{user_id}", "session": None}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def ping(self):
+        await self._op("ping")
+
+    def new_user(self, id, name):
+        return dict(id=id, name=name, session=None)
+
+    async def add_user(self, id, name):
+        await self._op("add_user")
+        new = int(id) not in self.users
+        self.users.setdefault(int(id), self.new_user(int(id), name))
+        self.known.add(int(id))
+        return new
+
+    async def is_user_exist(self, id):
+        if self.known.loaded:
+            return int(id) in self.known
+        await self._op("is_user_exist")
+        return int(id) in self.users
+
+    async def load_known_users(self):
+        await self.known.load(self.iter_user_ids())
+
+    async def total_users_count(self):
+        await self._op("total_users_count")
+        return len(self.users)
+
+    async def iter_user_ids(self):
+        await self._op("iter_user_ids")
+        for user_id in sorted(self.users):
+            yield user_id
+
+    async def delete_user(self, user_id):
+        await self._op("delete_user")
+        self.users.pop(int(user_id), None)
+        self.known.discard(int(user_id))
+
+    async def set_session(self, id, session):
+        await self._op("set_session")
+        if int(id) in self.users:
+            self.users[int(id)]["session"] = session
+
+    async def get_session(self, id):
+        await self._op("get_session")
+        return self.users.get(int(id), {}).get("session")
+
+    async def get_invite_link(self, chat_id):
+        await self._op("get_invite_link")
+        return self.links.get(int(chat_id))
+
+    async def set_invite_link(self, chat_id, link, created):
+        await self._op("set_invite_link")
+        self.links[int(chat_id)] = {"link": link, "created": created}
+
+    async def add_broadcast(self, data):
+        await self._op("add_broadcast")
+        broadcast_id = next(self._ids)
+        self.broadcasts[broadcast_id] = dict(data, _id=broadcast_id)
+        return broadcast_id
+
+    async def update_broadcast(self, broadcast_id, data):
+        await self._op("update_broadcast")
+        self.broadcasts[broadcast_id].update(data)
+
+    async def get_unfinished_broadcasts(self):
+        await self._op("get_unfinished_broadcasts")
+        return [dict(b) for b in self.broadcasts.values() if b["status"] in ("running", "paused")]
+
+    async def add_approved(self, chat_id, user_id, tags):
+        await self._op("add_approved")
+        now = datetime.datetime.now().timestamp()
+        doc = self.approved.setdefault((int(chat_id), int(user_id)), {"chat_id": int(chat_id), "user_id": int(user_id), "approved_at": now})
+        doc.update(tags=list(tags), verified_at=now, warned_at=None)
+
+    async def get_due_approved(self, verified_before, limit):
+        await self._op("get_due_approved")
+        due = sorted((d for d in self.approved.values() if d["verified_at"] < verified_before), key=lambda d: d["verified_at"])
+        return [dict(d) for d in due[:limit]]
+
+    async def update_approved(self, chat_id, user_id, data):
+        await self._op("update_approved")
+        doc = self.approved.get((int(chat_id), int(user_id)))
+        if doc is not None:
+            doc.update(data)
+
+    async def remove_approved(self, chat_id, user_id):
+        await self._op("remove_approved")
+        self.approved.pop((int(chat_id), int(user_id)), None)
+
+    async def approved_count(self):
+        await self._op("approved_count")
+        return len(self.approved)
+
+    async def get_tag_rules_version(self, chat_id):
+        await self._op("get_tag_rules_version")
+        return self.rules.get(int(chat_id), {}).get("version", 0)
+
+    async def get_tag_rules(self, chat_id):
+        await self._op("get_tag_rules")
+        doc = self.rules.get(int(chat_id))
+        return dict(doc) if doc else None
+
+    async def set_tag_rules(self, chat_id, rules):
+        await self._op("set_tag_rules")
+        doc = self.rules.setdefault(int(chat_id), {"chat_id": int(chat_id), "version": 0})
+        doc["rules"] = rules
+        doc["version"] += 1
+
+    async def add_drain(self, data):
+        await self._op("add_drain")
+        drain_id = next(self._ids)
+        self.drains[drain_id] = dict(data, _id=drain_id)
+        return drain_id
+
+    async def update_drain(self, drain_id, data):
+        await self._op("update_drain")
+        self.drains[drain_id].update(data)
+
+    async def get_unfinished_drains(self):
+        await self._op("get_unfinished_drains")
+        return [dict(d) for d in self.drains.values() if d["status"] == "running"]
+
+    async def get_quote_channels(self):
+        await self._op("get_quote_channels")
+        return [dict(c) for c in self.quote_channels.values()]
+
+    async def mark_quote_seeded(self):
+        await self._op("mark_quote_seeded")
+        seeded, self.quote_seeded = self.quote_seeded, True
+        return not seeded
+
+    async def get_quote_channel(self, chat_id):
+        await self._op("get_quote_channel")
+        doc = self.quote_channels.get(int(chat_id))
+        return dict(doc) if doc else None
+
+    async def set_quote_channel(self, chat_id, data):
+        await self._op("set_quote_channel")
+        self.quote_channels.setdefault(int(chat_id), {"chat_id": int(chat_id)}).update(data)
+
+    async def delete_quote_channel(self, chat_id):
+        await self._op("delete_quote_channel")
+        return self.quote_channels.pop(int(chat_id), None) is not None
+
+    async def claim_quote_slot(self, chat_id, next_run, data):
+        await self._op("claim_quote_slot")
+        doc = self.quote_channels.get(int(chat_id))
+        if doc is None or doc.get("next_run") != next_run:
+            return False
+        doc.update(data)
+        return True
+
+    async def outbox_commit(self, records, updates):
+        await self._op("outbox_commit")
+        existing = {r["_id"] for r in records if r["_id"] in self.outbox}
+        for r in records:
+            self.outbox.setdefault(r["_id"], dict(r))
+        for key, change in updates:
+            doc = self.outbox.get(key)
+            if doc is not None:
+                doc.update(change.get("$set", {}))
+                for field, n in change.get("$inc", {}).items():
+                    doc[field] = doc.get(field, 0) + n
+        return existing
+
+    async def outbox_pending(self, created_before):
+        await self._op("outbox_pending")
+        docs = [d for d in self.outbox.values() if d["done"] is None and d["created"] < created_before]
+        for doc in sorted(docs, key=lambda d: (d["created"], d["_id"])):
+            yield dict(doc)
+
+    async def outbox_prune(self, done_before):
+        await self._op("outbox_prune")
+        keys = [k for k, d in self.outbox.items() if d["done"] is not None and d["done"] < done_before]
+        for key in keys:
+            del self.outbox[key]
+        return len(keys)
+
+
+def install_fake_db(latency=0.0) -> FakeDatabase:
+    """Replace ``plugins.database.db``; must run before the other plugins are imported."""
+    import plugins.database
+    fake = FakeDatabase(latency)
+    plugins.database.db = fake
+    return fake
+
+
+# 🧩 Update factories
+def make_user(client, user_id: int) -> types.User:
+    return types.User(client=client, id=user_id, is_bot=False, first_name=f"User{user_id}")
+
+
+def make_chat(chat_id: int) -> types.Chat:
+    if chat_id > 0:
+        return types.Chat(id=chat_id, type=enums.ChatType.PRIVATE, first_name=f"User{chat_id}")
+    return types.Chat(id=chat_id, type=enums.ChatType.CHANNEL, title=f"Channel {chat_id}")
+
+
+def make_message(client, chat_id: int, user_id: int, text: str = None, message_id: int = None,
+                 reply_to: types.Message = None, outgoing: bool = False) -> types.Message:
+    return types.Message(
+        client=client,
+        id=message_id or next(client._message_ids),
+        chat=make_chat(chat_id),
+        from_user=client.me if outgoing else make_user(client, user_id),
+        date=datetime.datetime.now(),
+        text=text,
+        reply_to_message=reply_to,
+        reply_to_message_id=reply_to.id if reply_to else None,
+        outgoing=outgoing,
+    )
+
+
+def make_join_request(client, chat_id: int, user_id: int) -> types.ChatJoinRequest:
+    return types.ChatJoinRequest(
+        client=client, chat=make_chat(chat_id), from_user=make_user(client, user_id), date=datetime.datetime.now()
+    )
+
+
+def make_callback(client, user_id: int, data: str) -> types.CallbackQuery:
+    return types.CallbackQuery(
+        client=client, id=str(next(client._message_ids)), from_user=make_user(client, user_id),
+        chat_instance="bench", message=make_message(client, user_id, user_id, "menu", outgoing=True), data=data,
+    )
+
+
+def make_member_update(client, chat_id: int, user_id: int, old: str = None, new: str = None,
+                       from_user_id: int = None) -> types.ChatMemberUpdated:
+    """``old``/``new`` are ChatMemberStatus names, e.g. "administrator" or "left"."""
+    user = client.me if user_id == client.me.id else make_user(client, user_id)
+
+    def member(status):
+        if status:
+            return types.ChatMember(client=client, status=enums.ChatMemberStatus[status.upper()], user=user)
+
+    return types.ChatMemberUpdated(
+        client=client, chat=make_chat(chat_id), from_user=make_user(client, from_user_id or user_id),
+        date=datetime.datetime.now(), old_chat_member=member(old), new_chat_member=member(new),
+    )
+
+
+HANDLER_TYPES = {
+    types.Message: MessageHandler,
+    types.CallbackQuery: CallbackQueryHandler,
+    types.ChatJoinRequest: ChatJoinRequestHandler,
+    types.ChatMemberUpdated: ChatMemberUpdatedHandler,
+}
+
+
+def load_plugins(root: str = "plugins") -> list:
+    """Import every plugin module the way Pyrogram does (sorted for repeatable runs)."""
+    modules = []
+    for path in sorted((ROOT / root).rglob("*.py")):
+        if "__pycache__" in path.parts or path.name == "__init__.py":
+            continue
+        name = ".".join(path.relative_to(ROOT).with_suffix("").parts)
+        modules.append(importlib.import_module(name))
+    return modules
+
+
+class Dispatcher:
+    """Routes updates through the ``func.handlers`` the ``@Client.on_*`` decorators left behind.
+
+    Same rules as Pyrogram: groups in ascending order, the first matching
+    handler of each group runs.
+    """
+
+    def __init__(self, client, modules):
+        self.client = client
+        groups = defaultdict(list)
+        seen = set()
+        for module in modules:
+            for obj in list(vars(module).values()):
+                for handler, group in getattr(obj, "handlers", None) or ():
+                    if id(handler) not in seen:
+                        seen.add(id(handler))
+                        groups[group].append(handler)
+        self.groups = [groups[g] for g in sorted(groups)]
+
+    async def feed(self, update):
+        handler_type = HANDLER_TYPES[type(update)]
+        for handlers in self.groups:
+            for handler in handlers:
+                if not isinstance(handler, handler_type) or not await handler.check(self.client, update):
+                    continue
+                try:
+                    await handler.callback(self.client, update)
+                except StopPropagation:
+                    return
+                except ContinuePropagation:
+                    continue
+                break
@@ -0,0 +1,189 @@
+"""Replay a recorded update trace (RECORD_UPDATES=True) through the plugin handlers.
+
+    python benchmarks/replay.py traces/updates-20261018-120000.jsonl            # real time
+    python benchmarks/replay.py traces/updates-....jsonl --speed 10
+    python benchmarks/replay.py traces/updates-....jsonl --speed max --latency 0.08
+    python benchmarks/replay.py traces/updates-20261018-120000-w*.jsonl    # one file per worker process
+
+Updates are rebuilt from the anonymised trace and fed, on the recorded
+schedule divided by --speed, to a pool of workers the size of the bot's own
+(Client(workers=50)), against the fake client and in-memory database from
+fakes.py. Latency is measured from an update's scheduled arrival to the end
+of its handlers, so queueing behind a spike is included. Join requests are
+also followed through the join queue until it drains.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakes  # noqa: E402  (sets up the environment before any plugin import)
+from bench_handlers import percentile, settle  # noqa: E402
+
+
+def load_trace(paths: list, limit: int = None) -> list:
+    events = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    events.sort(key=lambda e: e["t"])
+    return events[:limit] if limit else events
+
+
+def build_update(client, event: dict):
+    def uid(key="user"):
+        # Admin commands only pass filters.user(ADMINS) for the configured admin id
+        if event.get("admin") and key == "user":
+            return fakes.ADMIN_ID
+        return event.get(key) or fakes.ADMIN_ID
+
+    kind = event["type"]
+    if kind == "message":
+        if event.get("command"):
+            text = " ".join([event["command"]] + ["x"] * event.get("args", 0))
+        else:
+            text = "x" * event["len"] if event.get("len") else None
+        user_id = uid()
+        chat_id = event.get("chat") or user_id
+        reply = fakes.make_message(client, chat_id, user_id, "earlier message") if event.get("reply") else None
+        return fakes.make_message(client, chat_id, user_id, text, reply_to=reply)
+    if kind == "callback":
+        return fakes.make_callback(client, uid(), event.get("data") or "")
+    if kind == "join_request":
+        return fakes.make_join_request(client, event["chat"], uid())
+    if kind == "member":
+        user_id = client.me.id if event.get("bot") else uid()
+        return fakes.make_member_update(client, event["chat"], user_id, event.get("old"), event.get("new"), event.get("by"))
+    raise ValueError(kind)
+
+
+def describe(event: dict) -> str:
+    if event["type"] == "message" and event.get("command"):
+        return f"message {event['command']}"
+    if event["type"] == "callback":
+        return f"callback {(event.get('data') or '').split('_', 1)[0]}"
+    return event["type"]
+
+
+async def replay(events: list, speed: float, workers: int, client, dispatcher):
+    queue = asyncio.Queue()
+    latencies = defaultdict(list)
+    failures = Counter()
+    behind = 0.0
+
+    async def worker():
+        while True:
+            due, label, update = await queue.get()
+            try:
+                await dispatcher.feed(update)
+            except Exception as e:
+                failures[label] += 1
+                logging.debug(f"{label} failed: {e}")
+            latencies[label].append(time.perf_counter() - due)
+            queue.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    started = time.perf_counter()
+    first = events[0]["t"] if events else 0.0
+    for event in events:
+        due = started + (event["t"] - first) / speed if speed else time.perf_counter()
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            behind = max(behind, -delay)
+        queue.put_nowait((due, describe(event), build_update(client, event)))
+    await queue.join()
+    fed = time.perf_counter() - started
+    for task in tasks:
+        task.cancel()
+    return latencies, failures, fed, behind
+
+
+async def main(args):
+    db = fakes.install_fake_db(args.db_latency)
+    client = fakes.FakeClient(
+        latency=args.latency, jitter=args.latency / 4, flood_rate=args.flood_rate,
+        flood_seconds=args.flood_seconds, error_rate=args.error_rate, seed=args.seed
+    )
+    dispatcher = fakes.Dispatcher(client, fakes.load_plugins())
+    from plugins.bio import join_queue
+    join_queue.start(client)
+
+    events = load_trace(args.traces, args.limit)
+    if not events:
+        sys.exit("empty trace")
+    db.seed_users({e["user"] for e in events if e.get("user")})
+    span = events[-1]["t"] - events[0]["t"]
+    print(
+        f"{len(events)} updates over {span:.1f}s recorded · speed {'max' if not args.speed else f'{args.speed:g}x'} · "
+        f"latency {args.latency * 1000:.0f} ms · workers {args.workers}\n"
+    )
+
+    started = time.perf_counter()
+    latencies, failures, fed, behind = await replay(events, args.speed, args.workers, client, dispatcher)
+    while join_queue.depth or join_queue.busy:
+        await asyncio.sleep(0.01)
+    await settle()
+    drained = time.perf_counter() - started
+
+    print(f"{'update':<24} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'failed':>7}")
+    for label, values in sorted(latencies.items(), key=lambda kv: -len(kv[1])):
+        print(
+            f"{label:<24} {len(values):>7} {percentile(values, 0.5) * 1000:>8.1f} "
+            f"{percentile(values, 0.99) * 1000:>8.1f} {max(values) * 1000:>8.1f} {failures[label]:>7}"
+        )
+    stats = join_queue.stats()
+    print(
+        f"\nhandled in {fed:.2f}s ({len(events) / fed:.1f} updates/s), fully drained in {drained:.2f}s"
+        f"{f' · fell {behind:.2f}s behind schedule' if behind > 0.05 else ''}"
+    )
+    if stats["enqueued"]:
+        print(
+            f"join queue: {stats['processed']} processed · {stats['coalesced']} coalesced · {stats['dropped']} dropped · "
+            f"wait avg {stats['wait_avg'] * 1000:.0f} ms max {stats['wait_max'] * 1000:.0f} ms"
+        )
+    api = sum(client.calls.values())
+    top = ", ".join(f"{method} {count}" for method, count in client.calls.most_common(5))
+    print(f"API calls: {api} ({api / len(events):.2f}/update) · {top}")
+    print(f"DB ops: {sum(db.ops.values())} ({sum(db.ops.values()) / len(events):.2f}/update)")
+    await join_queue.stop()
+
+
+def parse_speed(value: str) -> float:
+    if value.lower() == "max":
+        return 0.0
+    speed = float(value.rstrip("xX"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", type=Path, nargs="+", metavar="trace", help="JSONL trace(s) written by plugins/recorder.py")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, ... or max (default: 1)")
+    parser.add_argument("--limit", type=int, help="replay only the first N updates")
+    parser.add_argument("--workers", type=int, default=50, help="update workers, as in Client(workers=...)")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean API latency, seconds")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="per-operation database latency, seconds")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="probability an API call raises FloodWait")
+    parser.add_argument("--flood-seconds", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability an API call raises an RPC error")
+    parser.add_argument("--real-limits", action="store_true", help="keep the production send rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.real_limits:
+        fakes.unthrottle()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(args))
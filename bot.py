@@ -1,26 +1,33 @@
 import os
-import sqlite3
+import time
 import warnings
 import asyncio
+from plugins.startup import startup  # ⏱ first, so the import time of everything below is measured
 from pyrogram import Client
+from pyrogram.errors import FloodWait
 from aiohttp import web
 
-from config import API_ID, API_HASH, BOT_TOKEN
-from plugins.quote.quote import auto_quote_sender  # ✅ Import properly
+from config import API_ID, API_HASH, BOT_TOKEN, QUOTE_RELOAD_INTERVAL, SLOW_HANDLER_SECONDS, HANDLER_TIMING, WORKER_PROCESSES
+from plugins.quote.quote import quote_store  # ✅ Import properly
+from plugins.quote.scheduler import quote_scheduler
+from plugins.bio import bio_refresher, join_queue
+from plugins.broadcast import resume_broadcasts
+from plugins.database import db
+from plugins.sweeper import bio_sweeper
+from plugins.drain import resume_drains
+from plugins.sessions import session_pool
+from plugins.registry import channel_registry
+from plugins.sender import sender, floods_handled
+from plugins import metrics, peers
+from plugins.health import health
+from plugins import recorder
+from plugins.outbox import outbox
+from plugins.workers import WorkerPool, ShardingQueue, worker_main, rpc_handlers
 
 
-warnings.filterwarnings("ignore", message=".*message.forward_date.*")
+startup.mark("imports")
 
-# Initialize SQLite DB
-conn = sqlite3.connect("bot_data.db", check_same_thread=False)
-cur = conn.cursor()
-cur.execute("""
-CREATE TABLE IF NOT EXISTS channels (
-    chat_id INTEGER PRIMARY KEY,
-    title TEXT
-)
-""")
-conn.commit()
+warnings.filterwarnings("ignore", message=".*message.forward_date.*")
 
 # Define aiohttp route for health check
 r = web.RouteTableDef()
@@ -29,6 +36,20 @@ r = web.RouteTableDef()
 async def root_route_handler(request):
     return web.Response(text='<h3 align="center"><b>I am Alive</b></h3>', content_type='text/html')
 
+@r.get("/ready")
+async def ready_route_handler(request):
+    report = health.report()
+    return web.json_response(report, status=200 if report["status"] == "ok" else 503)
+
+@r.get("/metrics")
+async def metrics_route_handler(request):
+    # In multi-process mode the handler, join and database series come from the workers
+    return web.Response(text=metrics.render(await peers.gather("metrics")), content_type="text/plain", charset="utf-8")
+
+metrics.Gauge("join_queue_depth", "Join requests waiting to be processed.", lambda: join_queue.stats()["depth"])
+metrics.Gauge("sender_waiting", "Sends waiting for a global rate-limit slot.", lambda: sender.stats()["waiting"])
+metrics.Gauge("known_users", "Users in the in-memory known-user index.", lambda: len(db.known))
+
 async def wsrvr():
     wa = web.Application(client_max_size=30000000)
     wa.add_routes(r)
@@ -46,28 +67,111 @@ class Bot(Client):
             workers=50,
             sleep_threshold=10
         )
+        self.worker_pool = None
+        if WORKER_PROCESSES:
+            # Chat updates go to the worker processes instead of the local handlers
+            self.worker_pool = WorkerPool(WORKER_PROCESSES, worker_main)
+            self.dispatcher.updates_queue = ShardingQueue(self.worker_pool, self)
+            metrics.Gauge("worker_processes_alive", "Worker processes running.", lambda: self.worker_pool.stats()["alive"])
+            metrics.Gauge("worker_updates_forwarded", "Updates forwarded to worker processes.", lambda: self.worker_pool.forwarded)
+            metrics.Gauge("worker_restarts", "Worker processes restarted after exiting.", lambda: self.worker_pool.restarts)
 
     async def start(self):
+        started = time.time()
+        # MongoDB is connected in the background, while Telegram connects
+        startup.background("mongodb", self.warm_database())
+
         # Start aiohttp web server
         app = web.AppRunner(await wsrvr())
         await app.setup()
         ba = "0.0.0.0"
         port = int(os.environ.get("PORT", 8080)) or 8080
         await web.TCPSite(app, ba, port).start()
-        
+        startup.mark("web server")
+
         # Start Pyrogram Client
         await super().start()
+        startup.mark("telegram")
         me = await self.get_me()
         self.username = '@' + me.username
+        startup.mark("get_me")
+        self.instrument_handlers()
+        health.start(self)
+        if self.worker_pool:
+            # Run the registry migration once here, not racing in every worker
+            await channel_registry.run(lambda conn: None)
+            self.worker_pool.start(rpc_handlers(self))
+        startup.mark("handlers")
+
+        # ✅ Updates are being handled from here on; warm caches behind them
+        startup.background("quotes", asyncio.to_thread(quote_store.refresh))
+        ready = startup.set_ready()
+        asyncio.create_task(quote_scheduler.run(self))
+        asyncio.create_task(quote_store.watch(QUOTE_RELOAD_INTERVAL))
+        asyncio.create_task(bio_refresher(self))
+        join_queue.start(self)
+        asyncio.create_task(resume_broadcasts(self))
+        asyncio.create_task(bio_sweeper(self))
+        asyncio.create_task(resume_drains(self))
+        asyncio.create_task(outbox.replay(self, started))
+
+        print(f'Bot Started as {self.username} 🚀 {ready}')
+
+    async def warm_database(self):
+        await db.connect()
+        startup.background("indexes", db.ensure_indexes())
+        if not self.worker_pool:
+            # With worker processes each of them keeps the index; admin lookups here go to MongoDB
+            startup.background("known users", db.load_known_users())
 
-        # ✅ Start auto quote task in background
-        asyncio.create_task(auto_quote_sender(self))
+    def instrument_handlers(self):
+        # Plugins are loaded by now: time every registered handler
+        metrics.detailed = HANDLER_TIMING
+        for handlers in self.dispatcher.groups.values():
+            for handler in handlers:
+                callback = handler.callback
+                if asyncio.iscoroutinefunction(callback) and not getattr(callback, "instrumented", False):
+                    handler.callback = metrics.instrument(callback, SLOW_HANDLER_SECONDS)
 
-        print(f'Bot Started as {self.username} 🚀')
+    async def invoke(self, query, *args, sleep_threshold=None, **kwargs):
+        # Count every API call; FloodWaits are handled here instead of inside the
+        # session so they can be counted too (same sleep_threshold behaviour)
+        method = query.QUALNAME
+        threshold = self.sleep_threshold if sleep_threshold is None else sleep_threshold
+        if floods_handled.get():
+            # sender.call backs off through its token buckets and retries
+            threshold = 0
+        api = metrics.api_time.get()
+        while True:
+            metrics.api_calls.labels(method).inc()
+            started = time.perf_counter()
+            try:
+                return await super().invoke(query, *args, sleep_threshold=0, **kwargs)
+            except FloodWait as e:
+                metrics.flood_waits.labels(method).inc()
+                metrics.flood_seconds.inc(e.value)
+                if e.value > threshold:
+                    raise
+                wait = e.value
+            finally:
+                # Handler time spent waiting on Telegram; runs before the sleep
+                # below, so FloodWait sleeps are excluded
+                if api is not None:
+                    api[0] += time.perf_counter() - started
+            await asyncio.sleep(wait)
 
     async def stop(self, *args):
+        if self.worker_pool:
+            await self.worker_pool.stop()
+        await join_queue.stop()
+        await outbox.flush()
+        await session_pool.close_all()
+        await channel_registry.close()
+        if recorder.trace:
+            await recorder.trace.flush()
         await super().stop()
         print('Bot Stopped. Bye 👋')
 
-# Run the bot
-Bot().run()
+# Run the bot (guarded: worker processes re-import this module)
+if __name__ == "__main__":
+    Bot().run()
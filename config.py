@@ -14,12 +14,107 @@ IS_FSUB = bool(environ.get("FSUB", True))
 AUTH_CHANNELS = list(map(int, environ.get("AUTH_CHANNEL", "").split()))
 APPROVE_CHANNEL = int(environ.get("APPROVE_CHANNEL", ""))  # Replace with your actual channel ID
 
+# Join request caches (seconds)
+CHAT_CACHE_TTL = int(environ.get("CHAT_CACHE_TTL", 600))
+MEMBER_COUNT_TTL = int(environ.get("MEMBER_COUNT_TTL", 300))
+TAG_RULES_TTL = int(environ.get("TAG_RULES_TTL", 60))
+
+# Shared join-request invite link per chat (seconds)
+INVITE_LINK_ROTATE = int(environ.get("INVITE_LINK_ROTATE", 7 * 24 * 3600))
+INVITE_LINK_CHECK = int(environ.get("INVITE_LINK_CHECK", 3600))
+
+# User bio cache: empty/private bios are kept for a shorter time (seconds)
+BIO_CACHE_TTL = int(environ.get("BIO_CACHE_TTL", 60))
+BIO_NEGATIVE_TTL = int(environ.get("BIO_NEGATIVE_TTL", 15))
+BIO_CACHE_SIZE = int(environ.get("BIO_CACHE_SIZE", 50000))
+BIO_REFRESH_INTERVAL = int(environ.get("BIO_REFRESH_INTERVAL", 10))
+BIO_REFRESH_BATCH = int(environ.get("BIO_REFRESH_BATCH", 50))
+
+# Join request pipeline
+JOIN_WORKERS = int(environ.get("JOIN_WORKERS", 16))
+JOIN_QUEUE_SIZE = int(environ.get("JOIN_QUEUE_SIZE", 20000))
+
+# Outgoing message limits (messages per second)
+SEND_GLOBAL_RATE = float(environ.get("SEND_GLOBAL_RATE", 28))
+SEND_PRIVATE_RATE = float(environ.get("SEND_PRIVATE_RATE", 1))
+SEND_GROUP_RATE = float(environ.get("SEND_GROUP_RATE", 20 / 60))
+SEND_CHAT_BACKLOG = int(environ.get("SEND_CHAT_BACKLOG", 200))
+
+# Broadcast engine
+BROADCAST_CONCURRENCY = int(environ.get("BROADCAST_CONCURRENCY", 25))
+BROADCAST_BATCH = int(environ.get("BROADCAST_BATCH", 500))
+BROADCAST_STATUS_INTERVAL = int(environ.get("BROADCAST_STATUS_INTERVAL", 15))
+BROADCAST_DIR = environ.get("BROADCAST_DIR", "broadcasts")
+
+# /accept drain of pending join requests
+DRAIN_BATCH = int(environ.get("DRAIN_BATCH", 100))
+DRAIN_CONCURRENCY = int(environ.get("DRAIN_CONCURRENCY", 5))
+DRAIN_STATUS_INTERVAL = int(environ.get("DRAIN_STATUS_INTERVAL", 10))
+
+# Force-sub caches (seconds)
+FSUB_CACHE_TTL = int(environ.get("FSUB_CACHE_TTL", 600))
+FSUB_CACHE_SIZE = int(environ.get("FSUB_CACHE_SIZE", 100000))
+FSUB_CHANNEL_TTL = int(environ.get("FSUB_CHANNEL_TTL", 24 * 3600))
+
+# Re-checking bios of approved members: one full pass per SWEEP_PERIOD (seconds)
+SWEEP_PERIOD = int(environ.get("SWEEP_PERIOD", 7 * 24 * 3600))
+SWEEP_GRACE = int(environ.get("SWEEP_GRACE", 24 * 3600))
+SWEEP_BATCH = int(environ.get("SWEEP_BATCH", 50))
+SWEEP_MAX_RATE = float(environ.get("SWEEP_MAX_RATE", 3))
+SWEEP_REMOVE = environ.get("SWEEP_REMOVE", "True").lower() in ("1", "true", "yes")
+
+# Connected user-session clients kept for /accept and /login
+SESSION_POOL_SIZE = int(environ.get("SESSION_POOL_SIZE", 20))
+SESSION_IDLE_TTL = int(environ.get("SESSION_IDLE_TTL", 900))
+
+# How often quote files are checked for changes (seconds)
+QUOTE_RELOAD_INTERVAL = int(environ.get("QUOTE_RELOAD_INTERVAL", 30))
+
+# Scheduled quote posts: default interval and random spread of each post (seconds)
+QUOTE_INTERVAL = int(environ.get("QUOTE_INTERVAL", 3600))
+QUOTE_JITTER = int(environ.get("QUOTE_JITTER", 120))
+
+# SQLite registry of chats the bot is admin in; rows per /start settings page
+REGISTRY_DB = environ.get("REGISTRY_DB", "bot_data.db")
+SETTINGS_PAGE_SIZE = int(environ.get("SETTINGS_PAGE_SIZE", 10))
+
+# /ready: degraded above this event-loop lag or when MongoDB does not answer in time (seconds)
+READY_MAX_LAG = float(environ.get("READY_MAX_LAG", 1.0))
+READY_MONGO_TIMEOUT = float(environ.get("READY_MONGO_TIMEOUT", 3))
+HEALTH_INTERVAL = int(environ.get("HEALTH_INTERVAL", 10))
+
+# Handler calls slower than this are kept for /slowcalls; /profile sampling limits
+SLOW_HANDLER_SECONDS = float(environ.get("SLOW_HANDLER_SECONDS", 1.0))
+PROFILE_MAX_SECONDS = int(environ.get("PROFILE_MAX_SECONDS", 120))
+PROFILE_INTERVAL = float(environ.get("PROFILE_INTERVAL", 0.005))
+# Split handler time into CPU and Telegram API time on every call (always on while /profile runs)
+HANDLER_TIMING = environ.get("HANDLER_TIMING", "False").lower() in ("1", "true", "yes")
+
+# Opt-in anonymised update trace for benchmarks/replay.py
+RECORD_UPDATES = environ.get("RECORD_UPDATES", "False").lower() in ("1", "true", "yes")
+RECORD_DIR = environ.get("RECORD_DIR", "traces")
+
+# Outbox: join-request side effects replayed after a restart (rate in items/s, ages in seconds)
+OUTBOX_REPLAY_RATE = float(environ.get("OUTBOX_REPLAY_RATE", 5))
+OUTBOX_MAX_ATTEMPTS = int(environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_MAX_AGE = int(environ.get("OUTBOX_MAX_AGE", 24 * 3600))
+OUTBOX_KEEP = int(environ.get("OUTBOX_KEEP", 48 * 3600))
+# Channel posts kept in memory while the channel's send backlog is full (the rest are skipped)
+OUTBOX_OVERFLOW = int(environ.get("OUTBOX_OVERFLOW", 2000))
+
+# Run the plugin handlers in this many worker processes (0: everything in one process).
+# Each worker keeps its own caches and known-user index, so those take N times the memory
+WORKER_PROCESSES = int(environ.get("WORKER_PROCESSES", 0))
+
 # New OpenAI config
 OPENAI_API_KEY = environ.get("OPENAI_API_KEY", "")
 OPENAI_MODEL = environ.get("OPENAI_MODEL", "gpt-3.5-turbo")
 OPENAI_MAX_TOKENS = int(environ.get("OPENAI_MAX_TOKENS", 60))
 OPENAI_TEMPERATURE = float(environ.get("OPENAI_TEMPERATURE", 0.7))
 
-# Initialize OpenAI
-import openai
-openai.api_key = OPENAI_API_KEY
+# Initialize OpenAI on first use: the import alone takes about half a second
+# and nothing needs it during startup
+def get_openai():
+    import openai
+    openai.api_key = OPENAI_API_KEY
+    return openai
@@ -1,24 +1,22 @@
 import random
 import logging
 import asyncio
+import time
 from pyrogram import Client, filters, enums
-from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ChatJoinRequest, Message
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ChatJoinRequest, ChatMemberUpdated, Message
 from pyrogram.errors import InputUserDeactivated, UserNotParticipant, FloodWait, UserIsBlocked, PeerIdInvalid, UserNotMutualContact
 from config import *
 from .database import db
+from .cache import TTLCache, merge_stats
+from .invite_links import get_invite_link, link_cache
+from .join_queue import JoinRequestQueue, merge_stats as merge_queue_stats
+from .sender import APPROVAL, BACKGROUND
+from .outbox import outbox, OutboxItem, buttons_data
+from .tag_rules import DEFAULT_RULES, get_tag_rules
+from . import metrics, peers
 
 logger = logging.getLogger(__name__)
 
-# Updated TAG MAP with multiple tags for #study
-TAG_MAP = {
-    "#movie": ["@real_pirates", "@drama_loverx"],
-    "#drama": ["@drama_loverx"],
-    "#study": ["@II_LevelUP_II"],
-    "#success": ["@ii_way_to_success_ii"],
-    "#skill": ["@II_LevelUP_II"],
-    "#alone": ["@just_vibing_alone"],
-}
-
 
 async def retry_with_backoff(retries, coroutine, *args, **kwargs):
     delay = 1
@@ -32,55 +30,234 @@ async def retry_with_backoff(retries, coroutine, *args, **kwargs):
             delay *= 2
 
 
-def get_required_tags_from_description(description: str):
-    description = description.lower()
-    required_tags = []
-    for hashtag, tags in TAG_MAP.items():
-        if hashtag in description:
-            required_tags.extend(tags)
-    return list(dict.fromkeys(required_tags))
+def get_required_tags_from_description(description: str, rules=DEFAULT_RULES):
+    return rules.required_tags(description)
 
 
 def has_required_tag_in_bio(user_bio: str, required_tags: list):
     if not user_bio or not required_tags:
         return False
+    # A chat needs only a handful of tags: plain substring checks beat a compiled matcher here
     user_bio = user_bio.lower()
     return any(tag.lower() in user_bio for tag in required_tags)
 
-from pyrogram.errors import UserAlreadyParticipant, UserNotMutualContact, PeerIdInvalid
+
+# 🗂 Per-chat metadata cache: title, description and the tags derived from it
+class ChatMeta:
+    __slots__ = ("id", "title", "description", "required_tags", "rules_version", "members_count", "counted_at")
+
+    def __init__(self, chat):
+        self.id = chat.id
+        self.title = chat.title
+        self.description = chat.description or ""
+        self.required_tags = []
+        self.rules_version = None
+        self.members_count = chat.members_count or 0
+        self.counted_at = time.monotonic()
+
+
+chat_cache = TTLCache(CHAT_CACHE_TTL)
+_counting = set()
+
+
+async def get_chat_meta(client: Client, chat_id: int) -> ChatMeta:
+    async def load():
+        return ChatMeta(await client.get_chat(chat_id))
+
+    meta = await chat_cache.get_or_load(chat_id, load)
+    rules = await get_tag_rules(chat_id)
+    if meta.rules_version != rules.version:
+        # Rules changed (or first use): re-derive the tags, no need to refetch the chat
+        meta.required_tags = get_required_tags_from_description(meta.description, rules)
+        meta.rules_version = rules.version
+    if chat_id not in _counting and time.monotonic() - meta.counted_at > MEMBER_COUNT_TTL:
+        _counting.add(chat_id)
+        asyncio.create_task(_refresh_members_count(client, meta))
+    return meta
+
+
+async def _refresh_members_count(client: Client, meta: ChatMeta):
+    try:
+        meta.members_count = await client.get_chat_members_count(meta.id)
+        meta.counted_at = time.monotonic()
+    except Exception as e:
+        logger.warning(f"Could not refresh member count of {meta.id}: {e}")
+    finally:
+        _counting.discard(meta.id)
+
+
+# 👤 User bio cache, so one user requesting several chats costs one lookup
+bio_cache = TTLCache(
+    BIO_CACHE_TTL,
+    maxsize=BIO_CACHE_SIZE,
+    ttl_for=lambda bio: BIO_CACHE_TTL if bio else BIO_NEGATIVE_TTL,
+)
+
+
+async def _fetch_bio(client: Client, user_id: int) -> str:
+    user = await client.get_chat(user_id)
+    return user.bio or ""
+
+
+async def get_user_bio(client: Client, user_id: int, fresh: bool = False) -> str:
+    loader = lambda: _fetch_bio(client, user_id)
+    if fresh:
+        return await bio_cache.reload(user_id, loader)
+    return await bio_cache.get_or_load(user_id, loader)
+
+
+async def check_user_bio(client: Client, user_id: int, tags: list) -> tuple:
+    """(bio, has a tag); a missing tag is only trusted from a fresh lookup, never the cache."""
+    cached = user_id in bio_cache
+    bio = await get_user_bio(client, user_id)
+    if cached and not has_required_tag_in_bio(bio, tags):
+        # The user may have just added the tag (rejected, edited bio, asked again)
+        bio = await get_user_bio(client, user_id, fresh=True)
+    return bio, has_required_tag_in_bio(bio, tags)
+
+
+async def bio_refresher(client: Client):
+    # Re-fetch bios that are still being read before they expire, a batch at a time
+    while True:
+        await asyncio.sleep(BIO_REFRESH_INTERVAL)
+        user_ids = bio_cache.refresh_candidates(BIO_REFRESH_INTERVAL * 2, BIO_REFRESH_BATCH)
+        if not user_ids:
+            continue
+        results = await asyncio.gather(
+            *(bio_cache.reload(uid, lambda uid=uid: _fetch_bio(client, uid)) for uid in user_ids),
+            return_exceptions=True
+        )
+        failed = sum(isinstance(r, Exception) for r in results)
+        if failed:
+            logger.warning(f"Bio refresh: {failed}/{len(user_ids)} lookups failed")
+
+
+def is_member(member) -> bool:
+    if member is None:
+        return False
+    if member.status == enums.ChatMemberStatus.RESTRICTED:
+        return bool(member.is_member)
+    return member.status in (
+        enums.ChatMemberStatus.MEMBER,
+        enums.ChatMemberStatus.ADMINISTRATOR,
+        enums.ChatMemberStatus.OWNER,
+    )
+
+
+def _is_admin(member) -> bool:
+    return member is not None and member.status in (
+        enums.ChatMemberStatus.ADMINISTRATOR,
+        enums.ChatMemberStatus.OWNER,
+    )
+
+
+@Client.on_chat_member_updated(group=1)
+async def chat_cache_member_updated(client: Client, update: ChatMemberUpdated):
+    old, new = update.old_chat_member, update.new_chat_member
+    member = new or old
+    if is_member(old) and not is_member(new) and member and member.user:
+        # Left or removed: nothing for the bio sweeper to check any more
+        await db.remove_approved(update.chat.id, member.user.id)
+
+    # The bot or an admin changed: what we can see about the chat may have changed too
+    if (member and member.user and member.user.id == client.me.id) or _is_admin(old) or _is_admin(new):
+        # Admin actions are handled by the main process; the chat's own worker must hear of it
+        peers.broadcast("refresh_chat", update.chat.id)
+        return
+
+    # Plain join/leave: keep the cached member count roughly right without a round trip
+    meta = chat_cache.get(update.chat.id)
+    if meta is not None:
+        meta.members_count += is_member(new) - is_member(old)
+
+
+@peers.hook("refresh_chat")
+def _refresh_chat(chat_id=None):
+    if chat_id is None:
+        chat_cache.clear()
+        link_cache.clear()
+    else:
+        chat_cache.invalidate(chat_id)
+        link_cache.invalidate(chat_id)
+
+
+@peers.hook("cache_stats")
+def _cache_stats():
+    return {"Chats": chat_cache.stats(), "Invite links": link_cache.stats(), "Bios": bio_cache.stats()}
+
+
+@Client.on_message(filters.command("refresh_chat") & filters.user(ADMINS))
+async def refresh_chat_cache(client: Client, message: Message):
+    # Every worker process has its own copy of the caches
+    if len(message.command) < 2:
+        peers.broadcast("refresh_chat")
+        return await message.reply_text("♻️ Cleared cached data of all chats.")
+    try:
+        chat_id = int(message.command[1])
+    except ValueError:
+        return await message.reply_text("❌ Usage: `/refresh_chat [chat_id]`")
+    peers.broadcast("refresh_chat", chat_id)
+    await message.reply_text(f"♻️ Cleared cached data of `{chat_id}`.")
+
+
+@Client.on_message(filters.command("cachestats") & filters.user(ADMINS))
+async def cache_stats(client: Client, message: Message):
+    parts = [_cache_stats()] + await peers.gather("cache_stats")
+    lines = ["📊 <b>Cache Stats</b>\n"]
+    for name in parts[0]:
+        st = merge_stats([part[name] for part in parts])
+        lines.append(
+            f"<b>{name}</b>: {st['size']} entries\n"
+            f"   ┗ hits {st['hits']} · misses {st['misses']} · evictions {st['evictions']} · "
+            f"hit rate {st['hit_rate']:.1%}"
+        )
+    if len(parts) > 1:
+        lines.append(f"\n<i>Summed over {len(parts)} processes</i>")
+    await message.reply_text("\n".join(lines))
 
 @Client.on_chat_join_request()
 async def join_request_handler(client: Client, m: ChatJoinRequest):
     if not NEW_REQ_MODE:
         return
+    # Only enqueue here: the Pyrogram workers stay free for commands and callbacks
+    join_queue.submit(m)
+
+
+@Client.on_message(filters.command("queue") & filters.user(ADMINS))
+async def join_queue_stats(client: Client, message: Message):
+    st = merge_queue_stats([join_queue.stats()] + await peers.gather("join_queue_stats"))
+    await message.reply_text(
+        f"📥 <b>Join Request Queue</b>\n\n"
+        f"Waiting: {st['depth']} in {st['chats']} chats\n"
+        f"Workers busy: {st['busy']}/{st['workers']}\n"
+        f"Wait: avg {st['wait_avg']:.2f}s · max {st['wait_max']:.2f}s\n"
+        f"Throughput: {st['rate']:.1f} req/s\n\n"
+        f"Enqueued: {st['enqueued']}\n"
+        f"Coalesced: {st['coalesced']}\n"
+        f"Dropped (queue full): {st['dropped']}\n"
+        f"Processed: {st['processed']} (errors: {st['failed']})"
+    )
 
+
+async def process_join_request(client: Client, m: ChatJoinRequest):
     try:
-        chat = await client.get_chat(m.chat.id)
-        description = chat.description or ""
-        required_tags = get_required_tags_from_description(description)
+        chat = await get_chat_meta(client, m.chat.id)
+        required_tags = chat.required_tags
 
         if not required_tags:
             logger.info(f"No required tags for chat {chat.id}")
             return
 
-        user = await client.get_chat(m.from_user.id)
-        bio = user.bio or ""
+        _, approved = await check_user_bio(client, m.from_user.id, required_tags)
 
-        invite_link_obj = await client.create_chat_invite_link(
-            chat_id=m.chat.id,
-            name=f"Join {chat.title}",
-            creates_join_request=True
-        )
-        invite_link = invite_link_obj.invite_link
+        invite_link = await get_invite_link(client, m.chat.id, chat.title)
 
         full_name = f"{m.from_user.first_name or ''} {m.from_user.last_name or ''}".strip()
         member_count = chat.members_count
+        # 📮 Everything below is recorded in the outbox first, so a restart can finish it
+        request_key = f"{m.chat.id}:{m.from_user.id}:{int(m.date.timestamp()) if m.date else 0}"
 
-        if has_required_tag_in_bio(bio, required_tags):
-            try:
-                await client.approve_chat_join_request(m.chat.id, m.from_user.id)
-            except UserAlreadyParticipant:
-                logger.info(f"User {m.from_user.id} is already in {chat.title}")
+        if approved:
 
             approve_text = (
                 f"🔓 <b>Access Granted ✅</b>\n\n"
@@ -104,23 +281,40 @@ async def join_request_handler(client: Client, m: ChatJoinRequest):
                 "CAACAgUAAxkBAAEBZJBob5akEh3rGh9h7lANaH7MGAJfkAACwxoAAit2eVeMbZ7zpZHiGB4E"
             ]
 
+            uid = m.from_user.id
+            approval = OutboxItem(f"{request_key}:0", "approve", m.chat.id, APPROVAL, {"user_id": uid, "tags": required_tags})
+            dms = [
+                OutboxItem(f"{request_key}:1", "message", uid, APPROVAL, {"text": approve_text}),
+                OutboxItem(f"{request_key}:2", "message", uid, APPROVAL, {"text": warning_text}),
+                OutboxItem(f"{request_key}:3", "sticker", uid, APPROVAL, {"sticker": random.choice(stickers)}),
+            ]
+            posts = [
+                OutboxItem(f"{request_key}:4", "message", APPROVE_CHANNEL, BACKGROUND, {"text": approve_text, "disable_web_page_preview": True}),
+                OutboxItem(f"{request_key}:5", "sticker", APPROVE_CHANNEL, BACKGROUND, {"sticker": random.choice(stickers)}),
+            ]
+            if not await outbox.record([approval, *dms, *posts]):
+                logger.info(f"Join request {request_key} was already recorded, skipping")
+                return
+
+            try:
+                await outbox.deliver(client, approval)
+            except Exception:
+                outbox.skip(dms + posts, "approval failed")
+                raise
+            metrics.join_requests.labels(m.chat.id, "approved").inc()
+
             # ✅ Send to user (DM)
             try:
-                await client.send_message(m.from_user.id, approve_text)
-                await client.send_message(m.from_user.id, warning_text)
-                await client.send_sticker(m.from_user.id, random.choice(stickers))
+                await outbox.send_all(client, dms)
             except Exception as e:
                 logger.warning(f"Could not DM approved user: {e}")
 
-            # ✅ Send to APPROVE_CHANNEL
-            try:
-                await client.send_message(APPROVE_CHANNEL, approve_text, disable_web_page_preview=True)                
-                await client.send_sticker(APPROVE_CHANNEL, random.choice(stickers))
-            except Exception as e:
-                logger.warning(f"Could not send to APPROVE_CHANNEL: {e}")
+            # ✅ Send to APPROVE_CHANNEL (in the background: the channel only takes ~20 posts/min)
+            for post in posts:
+                outbox.post(client, post)
 
         else:
-            
+            metrics.join_requests.labels(m.chat.id, "rejected").inc()
 
             tags_display = '\n'.join([f"<blockquote>● <code>{tag}</code> ♡</blockquote>" for tag in required_tags])
 
@@ -151,9 +345,17 @@ async def join_request_handler(client: Client, m: ChatJoinRequest):
                 ]
             ])
 
+            uid = m.from_user.id
+            dms = [
+                OutboxItem(f"{request_key}:1", "message", uid, APPROVAL, {"text": reject_text, "disable_web_page_preview": True, "buttons": buttons_data(buttons)}),
+                OutboxItem(f"{request_key}:2", "sticker", uid, APPROVAL, {"sticker": "CAACAgUAAxkBAAEBZJhob6GN_Xkb4T-bfBGyTidwpYR8ywAC3RsAAoPe2FZmgpOgyG0j3h4E"}),
+            ]
+            if not await outbox.record(dms):
+                logger.info(f"Join request {request_key} was already recorded, skipping")
+                return
+
             try:
-                await client.send_message(m.from_user.id, reject_text, disable_web_page_preview=True, reply_markup=buttons)
-                await client.send_sticker(m.from_user.id, "CAACAgUAAxkBAAEBZJhob6GN_Xkb4T-bfBGyTidwpYR8ywAC3RsAAoPe2FZmgpOgyG0j3h4E")
+                await outbox.send_all(client, dms)
             except (UserNotMutualContact, PeerIdInvalid):
                 pass
             except Exception as e:
@@ -161,3 +363,8 @@ async def join_request_handler(client: Client, m: ChatJoinRequest):
 
     except Exception as e:
         logger.error(f"Join request handler error: {e}")
+
+
+# Queue workers are not Pyrogram handlers, so they are instrumented here
+join_queue = JoinRequestQueue(metrics.instrument(process_join_request, SLOW_HANDLER_SECONDS), JOIN_WORKERS, JOIN_QUEUE_SIZE)
+peers.hook("join_queue_stats")(join_queue.stats)
@@ -1,9 +1,14 @@
-import time, datetime, asyncio
+import os, mmap, time, datetime, asyncio, logging
+from array import array
+from bisect import bisect_right
+from pathlib import Path
 from pyrogram import Client, filters
 from pyrogram.types import Message
-from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
-from config import ADMINS
+from pyrogram.errors import InputUserDeactivated, UserIsBlocked, PeerIdInvalid, MessageNotModified
+from config import ADMINS, BROADCAST_CONCURRENCY, BROADCAST_BATCH, BROADCAST_STATUS_INTERVAL, BROADCAST_DIR
 from plugins.database import db  # make sure this works!
+from plugins.sender import sender, INTERACTIVE, BROADCAST
+from plugins import metrics
 
 # Send message to a single user
 @Client.on_message(filters.command("send") & filters.user(ADMINS))
@@ -14,7 +19,7 @@ async def send_message_to_user(client: Client, message: Message):
     try:
         user_id = int(message.command[1])
         text = " ".join(message.command[2:])
-        await client.send_message(chat_id=user_id, text=text)
+        await sender.call(user_id, INTERACTIVE, client.send_message, user_id, text)
         await message.reply_text(f"✅ Message sent successfully to `{user_id}`.")
     except Exception as e:
         await message.reply_text(
@@ -24,73 +29,283 @@ async def send_message_to_user(client: Client, message: Message):
         )
 
 
-# Broadcast a message to all users
-@Client.on_message(filters.command("broadcast") & filters.user(ADMINS) & filters.reply)
-async def broadcast(client: Client, message: Message):
-    users = await db.get_all_users()
-    total_users = await db.total_users_count()
-    b_msg = message.reply_to_message
+# 📢 Broadcast engine: concurrent sends, progress checkpointed in MongoDB after every batch
+current_job = None
+_broadcast_results = {r: metrics.broadcast_messages.labels(r) for r in ("sent", "blocked", "deleted", "failed")}
+
+
+class UserSnapshot:
+    """Audience of one broadcast: sorted user ids packed as int64 in a file, read through mmap."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.ids = None
+        self._file = None
+        self._mm = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    async def build(self) -> int:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        count = 0
+        last = None
+        with open(tmp, "wb") as f:
+            chunk = array("q")
+            async for user_id in db.iter_user_ids():
+                if user_id == last:  # duplicate documents of one user
+                    continue
+                last = user_id
+                chunk.append(user_id)
+                if len(chunk) >= 10000:
+                    chunk.tofile(f)
+                    count += len(chunk)
+                    chunk = array("q")
+            chunk.tofile(f)
+            count += len(chunk)
+        os.replace(tmp, self.path)
+        return count
+
+    def open(self):
+        self._file = open(self.path, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.ids = memoryview(self._mm).cast("q")
+        else:  # mmap refuses empty files
+            self.ids = memoryview(b"").cast("q")
+
+    def close(self):
+        if self.ids is not None:
+            self.ids.release()
+            self.ids = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
 
-    sent = blocked = deleted = failed = 0
-    start_time = time.time()
-    done = 0
 
-    sts = await message.reply_text("📢 Starting broadcast...")
+class BroadcastJob:
+    def __init__(self, client: Client, data: dict):
+        self.client = client
+        self.data = data
+        self.id = data["_id"]
+        self.concurrency = BROADCAST_CONCURRENCY
+        self.cancelled = False
+        self.running = asyncio.Event()
+        if data["status"] == "running":
+            self.running.set()
+        self.task = None
 
-    async for user in users:
-        user_id = user.get("id")
-        if not user_id:
-            continue
+    def start(self):
+        self.task = asyncio.create_task(self.run())
 
+    async def pause(self):
+        self.running.clear()
+        self.data["status"] = "paused"
+        await db.update_broadcast(self.id, {"status": "paused"})
+
+    async def resume(self):
+        self.data["status"] = "running"
+        await db.update_broadcast(self.id, {"status": "running"})
+        self.running.set()
+
+    def cancel(self):
+        self.cancelled = True
+        self.running.set()
+
+    def _progress(self) -> dict:
+        d = self.data
+        return {k: d[k] for k in ("status", "total", "position", "last_user_id", "done", "sent", "blocked", "deleted", "failed", "elapsed")}
+
+    def _status_text(self, title: str) -> str:
+        d = self.data
+        rate = d["done"] / d["elapsed"] if d["elapsed"] else 0.0
+        return (
+            f"{title}\n\n"
+            f"👥 Total: {d['total']}\n"
+            f"🔄 Progress: {d['done']}/{d['total']}\n"
+            f"✅ Sent: {d['sent']}\n"
+            f"🚫 Blocked: {d['blocked']}\n"
+            f"🗑 Deleted: {d['deleted']}\n"
+            f"❌ Failed: {d['failed']}\n"
+            f"⏱ Time: {datetime.timedelta(seconds=int(d['elapsed']))}\n"
+            f"⚡ Speed: {rate:.1f} msg/s"
+        )
+
+    async def edit_status(self, title: str):
         try:
-            await b_msg.copy(chat_id=user_id)
-            sent += 1
+            await sender.call(
+                self.data["admin_chat_id"], INTERACTIVE, self.client.edit_message_text,
+                self.data["admin_chat_id"], self.data["status_message_id"], self._status_text(title)
+            )
+        except Exception as e:
+            logging.warning(f"Could not update broadcast status: {e}")
+
+    async def run(self):
+        global current_job
+        d = self.data
+        snapshot = UserSnapshot(Path(BROADCAST_DIR) / f"{self.id}.ids")
+        last_report = time.monotonic()
+        try:
+            if not snapshot.exists():
+                d["total"] = await snapshot.build()
+                if d["last_user_id"] is not None:
+                    # Snapshot lost (e.g. redeploy wiped the disk): it is sorted, so find our place again
+                    snapshot.open()
+                    d["position"] = bisect_right(snapshot.ids, d["last_user_id"])
+                    snapshot.close()
+                await db.update_broadcast(self.id, self._progress())
+            snapshot.open()
+            ids = snapshot.ids
+
+            while d["position"] < len(ids):
+                await self.running.wait()
+                if self.cancelled:
+                    break
+                batch = ids[d["position"]:d["position"] + BROADCAST_BATCH].tolist()
+                started = time.monotonic()
+                await self._send_batch(batch)
+                d["elapsed"] += time.monotonic() - started
+                d["position"] += len(batch)
+                d["last_user_id"] = batch[-1]
+                await db.update_broadcast(self.id, self._progress())
+
+                if time.monotonic() - last_report >= BROADCAST_STATUS_INTERVAL:
+                    last_report = time.monotonic()
+                    title = "📣 Broadcasting..." if self.running.is_set() else "⏸ Broadcast paused."
+                    await self.edit_status(title)
 
-        except FloodWait as e:
-            await asyncio.sleep(e.value)
+            d["status"] = "cancelled" if self.cancelled else "done"
+            await db.update_broadcast(self.id, self._progress())
+            snapshot.remove()
+            await self.edit_status("🛑 Broadcast cancelled." if self.cancelled else "✅ Broadcast completed.")
+        except Exception as e:
+            # Marked failed, so resume_broadcasts doesn't retry the same error on every restart
+            logging.exception(f"Broadcast {self.id} failed")
+            d["status"] = "failed"
             try:
-                await b_msg.copy(chat_id=user_id)
-                sent += 1
-            except Exception:
-                failed += 1
+                await db.update_broadcast(self.id, {**self._progress(), "error": str(e) or type(e).__name__})
+            except Exception as db_error:
+                logging.error(f"Could not mark broadcast {self.id} as failed: {db_error}")
+            await self.edit_status(f"❌ Broadcast failed: {e}")
+        finally:
+            snapshot.close()
+            if current_job is self:
+                current_job = None
 
+    async def _send_batch(self, user_ids: list):
+        sem = asyncio.Semaphore(self.concurrency)
+        floods_before = sender.flood_waits
+
+        async def send(user_id):
+            async with sem:
+                await self._send_one(user_id)
+
+        await asyncio.gather(*(send(user_id) for user_id in user_ids))
+
+        # Telegram pushed back: halve the parallelism, otherwise creep back up
+        if sender.flood_waits > floods_before:
+            self.concurrency = max(1, self.concurrency // 2)
+        elif self.concurrency < BROADCAST_CONCURRENCY:
+            self.concurrency += 1
+
+    async def _send_one(self, user_id: int):
+        d = self.data
+        try:
+            await sender.call(
+                user_id, BROADCAST, self.client.copy_message,
+                user_id, d["from_chat_id"], d["message_id"]
+            )
+            result = "sent"
         except InputUserDeactivated:
             await db.delete_user(user_id)
-            deleted += 1
-
+            result = "deleted"
         except UserIsBlocked:
             await db.delete_user(user_id)
-            blocked += 1
-
+            result = "blocked"
         except PeerIdInvalid:
             await db.delete_user(user_id)
-            failed += 1
-
+            result = "failed"
         except Exception:
-            failed += 1
-
-        done += 1
-        if done % 20 == 0:
-            await sts.edit_text(
-                f"📣 Broadcasting...\n"
-                f"✅ Sent: {sent}\n"
-                f"🚫 Blocked: {blocked}\n"
-                f"🗑 Deleted: {deleted}\n"
-                f"❌ Failed: {failed}\n"
-                f"🔄 Progress: {done}/{total_users}"
-            )
+            result = "failed"
+        d[result] += 1
+        d["done"] += 1
+        _broadcast_results[result].value += 1
+
 
-    end_time = time.time()
-    duration = datetime.timedelta(seconds=int(end_time - start_time))
+# Broadcast a message to all users
+@Client.on_message(filters.command("broadcast") & filters.user(ADMINS) & filters.reply)
+async def broadcast(client: Client, message: Message):
+    global current_job
+    if current_job is not None:
+        return await message.reply_text("⚠️ A broadcast is already running. Use /cancel_broadcast first.")
 
-    await sts.edit_text(
-        f"✅ Broadcast completed in {duration}.\n\n"
-        f"👥 Total: {total_users}\n"
-        f"✅ Sent: {sent}\n"
-        f"🚫 Blocked: {blocked}\n"
-        f"🗑 Deleted: {deleted}\n"
-        f"❌ Failed: {failed}"
+    sts = await message.reply_text(
+        "📢 Starting broadcast...\n\n"
+        "/pause_broadcast · /resume_broadcast · /cancel_broadcast"
     )
+    data = {
+        "status": "running",
+        "from_chat_id": message.chat.id,
+        "message_id": message.reply_to_message.id,
+        "admin_chat_id": sts.chat.id,
+        "status_message_id": sts.id,
+        "total": 0,
+        "position": 0,
+        "last_user_id": None,
+        "done": 0, "sent": 0, "blocked": 0, "deleted": 0, "failed": 0,
+        "elapsed": 0.0,
+        "created": datetime.datetime.utcnow(),
+    }
+    data["_id"] = await db.add_broadcast(data)
+    current_job = BroadcastJob(client, data)
+    current_job.start()
+
+
+@Client.on_message(filters.command("pause_broadcast") & filters.user(ADMINS))
+async def pause_broadcast(client: Client, message: Message):
+    if current_job is None or not current_job.running.is_set():
+        return await message.reply_text("⚠️ No running broadcast.")
+    await current_job.pause()
+    await message.reply_text("⏸ Broadcast will pause after the current batch.")
+
+
+@Client.on_message(filters.command("resume_broadcast") & filters.user(ADMINS))
+async def resume_broadcast(client: Client, message: Message):
+    if current_job is None or current_job.running.is_set():
+        return await message.reply_text("⚠️ No paused broadcast.")
+    await current_job.resume()
+    await message.reply_text("▶️ Broadcast resumed.")
+
+
+@Client.on_message(filters.command("cancel_broadcast") & filters.user(ADMINS))
+async def cancel_broadcast(client: Client, message: Message):
+    if current_job is None:
+        return await message.reply_text("⚠️ No broadcast to cancel.")
+    current_job.cancel()
+    await message.reply_text("🛑 Broadcast will stop after the current batch.")
+
+
+async def resume_broadcasts(client: Client):
+    # Pick up a broadcast that was interrupted by a restart or redeploy
+    global current_job
+    unfinished = sorted(await db.get_unfinished_broadcasts(), key=lambda d: d["created"])
+    for data in unfinished[:-1]:
+        await db.update_broadcast(data["_id"], {"status": "cancelled"})
+    if unfinished:
+        current_job = BroadcastJob(client, unfinished[-1])
+        current_job.start()
+        if current_job.running.is_set():
+            await current_job.edit_status("♻️ Broadcast resumed after restart.")
+        else:
+            await current_job.edit_status("⏸ Broadcast paused. Use /resume_broadcast to continue.")
 
 
 
@@ -99,7 +314,7 @@ sent_messages = []
 
 # Function to store the sent messages
 async def store_sent_message(client: Client, chat_id, text):
-    sent_msg = await client.send_message(chat_id, text)
+    sent_msg = await sender.call(chat_id, INTERACTIVE, client.send_message, chat_id, text)
     sent_messages.append(sent_msg.message_id)  # Store the message ID
 
 # Command to delete all bot's sent messages in a private chat
@@ -117,7 +332,8 @@ async def delete_all_bot_messages(client: Client, message):
     await message.reply_text("✅ All messages sent by the bot have been deleted successfully.")
 
 # Example of sending a message and storing the message ID
-@Client.on_message(filters.text)
+# (only that phrase: a bare filters.text in group 0 would swallow every command of plugins loaded after this one)
+@Client.on_message(filters.text & filters.regex(r"(?i)^send me a message$"))
 async def example_message_handler(client: Client, message):
     if message.text.lower() == "send me a message":
         await store_sent_message(client, message.chat.id, "This is a message from the bot.")
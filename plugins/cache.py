@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Async TTL cache where concurrent misses for one key share a single load.
+
+    With ``maxsize`` set the least recently used entries are evicted first;
+    ``ttl_for(value)`` may pick a different lifetime per value (e.g. shorter
+    for negative results).
+    """
+
+    def __init__(self, ttl: float, maxsize: int = None, ttl_for=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.ttl_for = ttl_for
+        self._data = OrderedDict()  # key -> [expires_at, value, used_since_load]
+        self._inflight = {}         # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry[0] < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        entry[2] = True
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        if ttl is None:
+            ttl = self.ttl_for(value) if self.ttl_for else self.ttl
+        self._data[key] = [time.monotonic() + ttl, value, False]
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+        # A load that is already running must not write its (old) result back
+        self._inflight.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+        self._inflight.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # Unexpired entry present; no hit/miss accounting
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def refresh_candidates(self, within: float, limit: int) -> list:
+        """Keys read since their last load that expire in the next ``within`` seconds."""
+        deadline = time.monotonic() + within
+        keys = []
+        # Most recently used first: those are the ones worth keeping warm
+        for key in reversed(self._data):
+            expires_at, _, used = self._data[key]
+            if used and expires_at <= deadline and key not in self._inflight:
+                keys.append(key)
+                if len(keys) >= limit:
+                    break
+        return keys
+
+    async def get_or_load(self, key, loader):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return await self.reload(key, loader)
+
+    async def reload(self, key, loader):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+        # shield: one cancelled waiter must not cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader):
+        try:
+            value = await loader()
+        except BaseException:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+            raise
+        if self._inflight.get(key) is asyncio.current_task():
+            del self._inflight[key]
+            self.set(key, value)
+        return value
+
+
+def merge_stats(parts: list) -> dict:
+    """One stats() view of the copies of a cache held by several processes."""
+    merged = {key: sum(p[key] for p in parts) for key in ("size", "hits", "misses", "evictions")}
+    lookups = merged["hits"] + merged["misses"]
+    merged["hit_rate"] = merged["hits"] / lookups if lookups else 0.0
+    return merged
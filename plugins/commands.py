@@ -1,15 +1,16 @@
-import asyncio 
 from pyrogram import Client, filters, enums
 from config import *
 from .database import db
 from .fsub import get_fsub
+from .sender import sender, INTERACTIVE, BACKGROUND
+from .bio import retry_with_backoff
+from .drain import jobs as drain_jobs, start_drain
+from .sessions import session_pool
+from .registry import channel_registry, DEMOTED, REMOVED
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, ChatJoinRequest, CallbackQuery
-from pyrogram.errors import InputUserDeactivated, UserNotParticipant, FloodWait, UserIsBlocked, PeerIdInvalid
-import datetime
-import time
+from pyrogram.errors import UserNotParticipant
 import logging
 from pyrogram.types import ChatMemberUpdated
-import sqlite3
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -23,10 +24,10 @@ from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 @Client.on_message(filters.command("start", prefixes="/"))
 async def start_message(c, m):
-    # Register user if not in DB
-    if not await db.is_user_exist(m.from_user.id):
-        await db.add_user(m.from_user.id, m.from_user.first_name)
-        await c.send_message(
+    # Register user if not in DB (answered from memory once known users are loaded)
+    if not await db.is_user_exist(m.from_user.id) and await db.add_user(m.from_user.id, m.from_user.first_name):
+        sender.post(
+            LOG_CHANNEL, BACKGROUND, c.send_message,
             LOG_CHANNEL,
             f"<b>#NewUser\nID - <code>{m.from_user.id}</code>\nName - {m.from_user.mention}</b>"
         )
@@ -55,7 +56,7 @@ async def start_message(c, m):
         [InlineKeyboardButton("⚙️ Settings", callback_data="settings")]
     ])
 
-    await m.reply_text(text, reply_markup=buttons, disable_web_page_preview=True)
+    await sender.call(m.chat.id, INTERACTIVE, m.reply_text, text, reply_markup=buttons, disable_web_page_preview=True)
 
 
 @Client.on_chat_member_updated()
@@ -63,36 +64,51 @@ async def track_admin_channels(client, update: ChatMemberUpdated):
     try:
         if update.new_chat_member and update.new_chat_member.user.id == client.me.id:
             new_status = update.new_chat_member.status
-            if new_status == "administrator":
-                chat_id = update.chat.id
+            chat_id = update.chat.id
+            if new_status == enums.ChatMemberStatus.ADMINISTRATOR:
                 title = update.chat.title or "Unnamed"
-
-                cur.execute("INSERT OR IGNORE INTO channels (chat_id, title) VALUES (?, ?)", (chat_id, title))
-                conn.commit()
-                print(f"✅ Added: {title} ({chat_id})")
+                added_by = update.from_user.id if update.from_user else None
+                await channel_registry.set_admin(chat_id, title, update.chat.username, added_by)
+                logger.info(f"✅ Added: {title} ({chat_id}) by {added_by}")
+            elif new_status in (enums.ChatMemberStatus.LEFT, enums.ChatMemberStatus.BANNED):
+                await channel_registry.set_status(chat_id, REMOVED)
+            else:
+                await channel_registry.set_status(chat_id, DEMOTED)
     except Exception as e:
-        print(f"[track_admin_channels ERROR] {e}")
+        logger.error(f"[track_admin_channels ERROR] {e}")
+
+def _channel_button(chat_id, title, username):
+    if username:
+        return InlineKeyboardButton(title, url=f"https://t.me/{username}")
+    # For private channels (starting with -100), format correctly
+    if str(chat_id).startswith("-100"):
+        return InlineKeyboardButton(title, url=f"https://t.me/c/{str(chat_id)[4:]}")
+    return InlineKeyboardButton(title, callback_data="ignore")
 
-@Client.on_callback_query(filters.regex("settings"))
+@Client.on_callback_query(filters.regex(r"^settings(:-?\d+)?$"))
 async def open_settings_cb(client, query):
+    # settings:<chat_id> continues after that chat (keyset pagination)
+    after = int(query.data.split(":")[1]) if ":" in query.data else None
     try:
-        cur.execute("SELECT chat_id, title FROM channels")
-        rows = cur.fetchall()
+        rows = await channel_registry.page(query.from_user.id, after, SETTINGS_PAGE_SIZE + 1)
 
         if not rows:
-            await query.message.edit_text("⚠️ No channels found where I'm admin.")
+            await query.message.edit_text("⚠️ No channels found where you made me admin.")
             return
 
-        keyboard = []
-        for chat_id, title in rows:
-            # For private channels (starting with -100), format correctly
-            channel_url = f"https://t.me/c/{str(chat_id)[4:]}" if str(chat_id).startswith("-100") else f"https://t.me/{title}"
-            keyboard.append([InlineKeyboardButton(title, url=channel_url)])
+        keyboard = [[_channel_button(*row)] for row in rows[:SETTINGS_PAGE_SIZE]]
+        nav = []
+        if after is not None:
+            nav.append(InlineKeyboardButton("« First", callback_data="settings"))
+        if len(rows) > SETTINGS_PAGE_SIZE:
+            nav.append(InlineKeyboardButton("Next »", callback_data=f"settings:{rows[SETTINGS_PAGE_SIZE - 1][0]}"))
+        if nav:
+            keyboard.append(nav)
 
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text("🛠️ Channels where I'm admin:", reply_markup=reply_markup)
+        await query.message.edit_text("🛠️ Channels where you made me admin:", reply_markup=reply_markup)
     except Exception as e:
-        print(f"[open_settings_cb ERROR] {e}")
+        logger.error(f"[open_settings_cb ERROR] {e}")
         await query.message.edit_text("❌ Error loading channels. First Add Me in Channels")
         
 @Client.on_callback_query(filters.regex("back_to_home"))
@@ -143,7 +159,8 @@ def help_markup(current_page: int):
 # /help command
 @Client.on_message(filters.command("help"))
 async def help_message(c, m):
-    await m.reply_text(
+    await sender.call(
+        m.chat.id, INTERACTIVE, m.reply_text,
         help_pages[1],
         reply_markup=help_markup(1),
         disable_web_page_preview=True
@@ -165,57 +182,15 @@ async def help_page_handler(c, query: CallbackQuery):
 @Client.on_message(filters.command("users") & filters.user(ADMINS))
 async def users(bot, message):
    total_users = await db.total_users_count()
+   known = db.known
+   index = (
+       f"{len(known)} ids · {known.memory_bytes() / 2**20:.1f} MiB · loaded in {known.load_seconds:.2f}s"
+       if known.loaded else "loading..."
+   )
    await message.reply_text(
-        text=f'◉ ᴛᴏᴛᴀʟ ᴜꜱᴇʀꜱ: {total_users}'
+        text=f'◉ ᴛᴏᴛᴀʟ ᴜꜱᴇʀꜱ: {total_users}\n◉ Known-user index: {index}'
    )
 
-@Client.on_message(filters.command("broadcast") & filters.user(ADMINS) & filters.reply)
-async def broadcast(bot, message):
-    users = await db.get_all_users()
-    b_msg = message.reply_to_message
-    sts = await message.reply_text("Broadcasting your messages...")
-    
-    start_time = time.time()
-    total_users = await db.total_users_count()
-
-    # Initialize Counters
-    done, blocked, deleted, failed, success = 0, 0, 0, 0, 0
-
-    async for user in users:
-        if 'id' in user:
-            user_id = int(user['id'])
-            try:
-                await retry_with_backoff(5, b_msg.copy, chat_id=user_id)
-                success += 1
-            except FloodWait as e:
-                await asyncio.sleep(e.value)
-                try:
-                    await b_msg.copy(chat_id=user_id)
-                    success += 1
-                except Exception:
-                    failed += 1
-            except InputUserDeactivated:
-                await db.delete_user(user_id)
-                logging.info(f"{user_id} - Removed from database (Deleted Account).")
-                deleted += 1
-            except UserIsBlocked:
-                await db.delete_user(user_id)
-                logging.info(f"{user_id} - Blocked the bot.")
-                blocked += 1
-            except PeerIdInvalid:
-                await db.delete_user(user_id)
-                logging.info(f"{user_id} - PeerIdInvalid")
-                failed += 1
-            except Exception:
-                failed += 1
-            
-            done += 1
-            if not done % 20:
-                await sts.edit(f"Broadcast in progress:\n\nTotal Users: {total_users}\nCompleted: {done}/{total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")
-    
-    time_taken = datetime.timedelta(seconds=int(time.time() - start_time))
-    await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Users: {total_users}\nCompleted: {done}/{total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")
-
 @Client.on_message(filters.command('accept') & filters.private)
 async def accept(client, message):
     show = await message.reply("**Please Wait.....**")
@@ -224,8 +199,7 @@ async def accept(client, message):
         await show.edit("**For Accepte Pending Request You Have To /login First.**")
         return
     try:
-        acc = Client("joinrequest", session_string=user_data, api_hash=API_HASH, api_id=API_ID)
-        await acc.connect()
+        acc = await session_pool.acquire(message.from_user.id, user_data)
     except:
         return await show.edit("**Your Login Session Expired. So /logout First Then Login Again By - /login**")
     show = await show.edit("**Now Forward A Message From Your Channel Or Group With Forward Tag\n\nMake Sure Your Logged In Account Is Admin In That Channel Or Group With Full Rights.**")
@@ -235,21 +209,18 @@ async def accept(client, message):
         try:
             await retry_with_backoff(5, acc.get_chat, chat_id)
         except:
-            await show.edit("**Error - Make Sure Your Logged In Account Is Admin In This Channel Or Group With Rights.**")
+            session_pool.release(message.from_user.id)
+            return await show.edit("**Error - Make Sure Your Logged In Account Is Admin In This Channel Or Group With Rights.**")
     else:
+        session_pool.release(message.from_user.id)
         return await message.reply("**Message Not Forwarded From Channel Or Group.**")
     await vj.delete()
+    if (message.from_user.id, chat_id) in drain_jobs:
+        session_pool.release(message.from_user.id)
+        return await show.edit("**Already accepting join requests in this chat. Please wait until it's completed.**")
     msg = await show.edit("**Accepting all join requests... Please wait until it's completed.**")
-    try:
-        while True:
-            await retry_with_backoff(5, acc.approve_all_chat_join_requests, chat_id)
-            await asyncio.sleep(1)
-            join_requests = [request async for request in acc.get_chat_join_requests(chat_id)]
-            if not join_requests:
-                break
-        await msg.edit("**Successfully accepted all join requests.**")
-    except Exception as e:
-        await msg.edit(f"**An error occurred:** {str(e)}")
+    # Runs in the background, reports progress in `msg` and survives restarts
+    await start_drain(client, acc, message.from_user.id, chat_id, msg)
 
 @Client.on_message(filters.command("toggle_mode") & filters.user(6947378236))
 async def toggle_mode(_, message: Message):
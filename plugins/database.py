@@ -1,12 +1,184 @@
+import asyncio
+import heapq
+import logging
+import time
+from array import array
+from bisect import bisect_left
 import motor.motor_asyncio
+from pymongo import monitoring, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from config import DB_NAME, DB_URI
+from . import metrics, peers
+
+logger = logging.getLogger(__name__)
+
+
+class KnownUsers:
+    """Exact in-memory set of registered user ids.
+
+    The startup load is a sorted int64 array (8 bytes per user); users added
+    or deleted afterwards sit in small sets until the next compaction.
+
+    With WORKER_PROCESSES > 0 each worker loads its own copy (kept in step
+    through peers broadcasts), so the index costs WORKER_PROCESSES times the
+    memory; the main process skips it and asks MongoDB instead.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.load_seconds = 0.0
+        self._ids = array('q')
+        self._added = set()
+        self._removed = set()
+
+    def __contains__(self, user_id):
+        if user_id in self._added:
+            return True
+        if user_id in self._removed:
+            return False
+        i = bisect_left(self._ids, user_id)
+        return i < len(self._ids) and self._ids[i] == user_id
+
+    def __len__(self):
+        return len(self._ids) + len(self._added) - len(self._removed)
+
+    def add(self, user_id):
+        self._removed.discard(user_id)
+        if user_id not in self:
+            self._added.add(user_id)
+            if len(self._added) > 50000:
+                self._compact()
+
+    def discard(self, user_id):
+        self._added.discard(user_id)
+        # Only ids in the array need a tombstone; anything else would skew len()
+        if self._in_array(user_id):
+            self._removed.add(user_id)
+            if len(self._removed) > 50000:
+                self._compact()
+
+    def _compact(self):
+        merged = heapq.merge(self._ids, sorted(self._added))
+        self._ids = array('q', (i for i in merged if i not in self._removed))
+        self._added.clear()
+        self._removed.clear()
+
+    def memory_bytes(self) -> int:
+        return self._ids.buffer_info()[1] * self._ids.itemsize
+
+    async def load(self, ids):
+        started = time.perf_counter()
+        loaded = array('q')
+        last = None
+        async for user_id in ids:
+            if user_id != last:
+                loaded.append(user_id)
+                last = user_id
+        self._ids = loaded
+        # Changes that raced with the load are already in _added/_removed
+        self._added = {i for i in self._added if not self._in_array(i)}
+        self._removed = {i for i in self._removed if self._in_array(i)}
+        self.loaded = True
+        self.load_seconds = time.perf_counter() - started
+        per_million = self.memory_bytes() / len(loaded) * 1e6 / 2**20 if loaded else 0.0
+        logger.info(
+            f"Known users: loaded {len(loaded)} ids in {self.load_seconds:.2f}s, "
+            f"{self.memory_bytes() / 2**20:.1f} MiB ({per_million:.1f} MiB per million users)"
+        )
+
+    def _in_array(self, user_id):
+        i = bisect_left(self._ids, user_id)
+        return i < len(self._ids) and self._ids[i] == user_id
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Feeds MongoDB command latency into /metrics (runs on driver threads)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.mongo_seconds.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        metrics.mongo_seconds.labels(event.command_name).observe(event.duration_micros / 1e6)
+        metrics.mongo_failures.labels(event.command_name).inc()
+
+
+class _Collection:
+    # Looked up on the shared client; importing the module opens no connection
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, database, owner=None):
+        if database is None:
+            return self
+        return database.db[self.name]
+
 
 class Database:
 
+    col = _Collection("users")
+    links = _Collection("invite_links")
+    broadcasts = _Collection("broadcasts")
+    approved = _Collection("approved_members")
+    rules = _Collection("tag_rules")
+    drains = _Collection("accept_jobs")
+    quote_channels = _Collection("quote_channels")
+    outbox = _Collection("outbox")
+
     def __init__(self, uri, database_name):
-        self._client = motor.motor_asyncio.AsyncIOMotorClient(uri)
-        self.db = self._client[database_name]
-        self.col = self.db.users
+        self._uri = uri
+        self._name = database_name
+        self._client = None
+        self._connecting = None
+        self.known = KnownUsers()
+
+    def _new_client(self):
+        return motor.motor_asyncio.AsyncIOMotorClient(self._uri, event_listeners=[CommandMetrics()])
+
+    async def _open(self):
+        # A mongodb+srv URI resolves DNS records in the constructor: keep that off the event loop
+        try:
+            self._client = await asyncio.to_thread(self._new_client)
+        except Exception:
+            self._connecting = None
+            raise
+
+    def _ready(self):
+        """Awaited before every query: all callers share the one client being built."""
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open())
+        return self._connecting
+
+    @property
+    def db(self):
+        return self._client[self._name]
+
+    async def connect(self):
+        """Create the client and wait until the server answers."""
+        await self.ping()
+
+    async def ensure_indexes(self):
+        await self._ready()
+        try:
+            await self.col.create_index('id', unique=True)
+        except (DuplicateKeyError, OperationFailure) as e:
+            # Old deployments may already hold duplicate users; still index the lookups
+            logger.warning(f"Could not create unique index on users.id ({e}), using a plain index")
+            await self.col.create_index('id')
+        await self.links.create_index('chat_id', unique=True)
+        await self.broadcasts.create_index('status')
+        await self.approved.create_index([('chat_id', 1), ('user_id', 1)], unique=True)
+        await self.approved.create_index('verified_at')
+        await self.rules.create_index('chat_id', unique=True)
+        await self.drains.create_index('status')
+        await self.quote_channels.create_index('chat_id', unique=True)
+        await self.outbox.create_index([('done', 1), ('created', 1), ('_id', 1)])
+
+    async def ping(self):
+        await self._ready()
+        await self.db.command('ping')
 
     def new_user(self, id, name):
         return dict(
@@ -16,28 +188,204 @@ class Database:
         )
 
     async def add_user(self, id, name):
-        user = self.new_user(id, name)
-        await self.col.insert_one(user)
+        # One round trip; returns True only when the user was not registered yet
+        user = self.new_user(int(id), name)
+        await self._ready()
+        result = await self.col.update_one({'id': user['id']}, {'$setOnInsert': user}, upsert=True)
+        if result.upserted_id is None:
+            self.known.add(user['id'])
+            return False
+        peers.broadcast("known_add", user['id'])
+        return True
 
     async def is_user_exist(self, id):
-        user = await self.col.find_one({'id':int(id)})
+        if self.known.loaded:
+            return int(id) in self.known
+        await self._ready()
+        user = await self.col.find_one({'id': int(id)}, {'_id': 1})
         return bool(user)
 
+    async def load_known_users(self):
+        await self.known.load(self.iter_user_ids())
+
     async def total_users_count(self):
-        count = await self.col.count_documents({})
-        return count
+        # Taken from collection metadata, no scan
+        await self._ready()
+        return await self.col.estimated_document_count()
 
-    async def get_all_users(self):
-        return self.col.find({})
+    async def iter_user_ids(self):
+        # Only the ids, sorted, in large batches: used to snapshot a broadcast audience
+        await self._ready()
+        cursor = self.col.find({'id': {'$exists': True}}, {'id': 1, '_id': 0}, allow_disk_use=True)
+        async for user in cursor.sort('id', 1).batch_size(10000):
+            yield int(user['id'])
 
     async def delete_user(self, user_id):
+        await self._ready()
         await self.col.delete_many({'id': int(user_id)})
+        # Broadcasts run in the main process, the user's /start in a worker
+        peers.broadcast("known_discard", int(user_id))
 
     async def set_session(self, id, session):
+        await self._ready()
         await self.col.update_one({'id': int(id)}, {'$set': {'session': session}})
 
     async def get_session(self, id):
-        user = await self.col.find_one({'id': int(id)})
-        return user['session']
+        await self._ready()
+        user = await self.col.find_one({'id': int(id)}, {'session': 1, '_id': 0})
+        return user.get('session') if user else None
+
+    async def get_invite_link(self, chat_id):
+        await self._ready()
+        return await self.links.find_one({'chat_id': int(chat_id)}, {'link': 1, 'created': 1})
+
+    async def set_invite_link(self, chat_id, link, created):
+        await self._ready()
+        await self.links.update_one(
+            {'chat_id': int(chat_id)},
+            {'$set': {'link': link, 'created': created}},
+            upsert=True
+        )
+
+    async def add_broadcast(self, data):
+        await self._ready()
+        result = await self.broadcasts.insert_one(data)
+        return result.inserted_id
+
+    async def update_broadcast(self, broadcast_id, data):
+        await self._ready()
+        await self.broadcasts.update_one({'_id': broadcast_id}, {'$set': data})
+
+    async def get_unfinished_broadcasts(self):
+        await self._ready()
+        return await self.broadcasts.find({'status': {'$in': ['running', 'paused']}}).to_list(length=None)
+
+    async def add_approved(self, chat_id, user_id, tags):
+        now = time.time()
+        await self._ready()
+        await self.approved.update_one(
+            {'chat_id': int(chat_id), 'user_id': int(user_id)},
+            {'$set': {'tags': list(tags), 'verified_at': now, 'warned_at': None},
+             '$setOnInsert': {'approved_at': now}},
+            upsert=True
+        )
+
+    async def get_due_approved(self, verified_before, limit):
+        # Stalest first; verified_at doubles as the sweep checkpoint
+        await self._ready()
+        cursor = self.approved.find({'verified_at': {'$lt': verified_before}}).sort('verified_at', 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def update_approved(self, chat_id, user_id, data):
+        await self._ready()
+        await self.approved.update_one({'chat_id': int(chat_id), 'user_id': int(user_id)}, {'$set': data})
+
+    async def remove_approved(self, chat_id, user_id):
+        await self._ready()
+        await self.approved.delete_one({'chat_id': int(chat_id), 'user_id': int(user_id)})
+
+    async def approved_count(self):
+        await self._ready()
+        return await self.approved.estimated_document_count()
+
+    async def get_tag_rules_version(self, chat_id):
+        await self._ready()
+        doc = await self.rules.find_one({'chat_id': int(chat_id)}, {'version': 1, '_id': 0})
+        return doc['version'] if doc else 0
+
+    async def get_tag_rules(self, chat_id):
+        await self._ready()
+        return await self.rules.find_one({'chat_id': int(chat_id)}, {'_id': 0})
+
+    async def set_tag_rules(self, chat_id, rules):
+        await self._ready()
+        await self.rules.update_one(
+            {'chat_id': int(chat_id)},
+            {'$set': {'rules': rules}, '$inc': {'version': 1}},
+            upsert=True
+        )
+
+    async def add_drain(self, data):
+        await self._ready()
+        result = await self.drains.insert_one(data)
+        return result.inserted_id
+
+    async def update_drain(self, drain_id, data):
+        await self._ready()
+        await self.drains.update_one({'_id': drain_id}, {'$set': data})
+
+    async def get_unfinished_drains(self):
+        await self._ready()
+        return await self.drains.find({'status': 'running'}).to_list(length=None)
+
+    async def get_quote_channels(self):
+        # Skips the seed marker below, the one document without a chat_id
+        await self._ready()
+        return await self.quote_channels.find({'chat_id': {'$exists': True}}, {'_id': 0}).to_list(length=None)
+
+    async def mark_quote_seeded(self):
+        # True only the first time: the legacy TARGET_CHANNEL_ID is migrated once
+        await self._ready()
+        try:
+            await self.quote_channels.insert_one({'_id': 'seeded', 'at': time.time()})
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def get_quote_channel(self, chat_id):
+        await self._ready()
+        return await self.quote_channels.find_one({'chat_id': int(chat_id)}, {'_id': 0})
+
+    async def set_quote_channel(self, chat_id, data):
+        await self._ready()
+        await self.quote_channels.update_one({'chat_id': int(chat_id)}, {'$set': data}, upsert=True)
+
+    async def delete_quote_channel(self, chat_id):
+        await self._ready()
+        result = await self.quote_channels.delete_one({'chat_id': int(chat_id)})
+        return result.deleted_count > 0
+
+    async def claim_quote_slot(self, chat_id, next_run, data):
+        # Only whoever still sees the old next_run gets the slot
+        await self._ready()
+        result = await self.quote_channels.update_one(
+            {'chat_id': int(chat_id), 'next_run': next_run},
+            {'$set': data}
+        )
+        return result.modified_count == 1
+
+    async def outbox_commit(self, records, updates):
+        # Everything queued since the last commit in one round trip; returns the keys that already existed
+        ops = [UpdateOne({'_id': r['_id']}, {'$setOnInsert': r}, upsert=True) for r in records]
+        ops += [UpdateOne({'_id': key}, change) for key, change in updates]
+        if not ops:
+            return set()
+        await self._ready()
+        result = await self.outbox.bulk_write(ops, ordered=False)
+        inserted = {records[i]['_id'] for i in result.upserted_ids if i < len(records)}
+        return {r['_id'] for r in records} - inserted
+
+    async def outbox_pending(self, created_before):
+        # Oldest first; keys of one join request sort together
+        await self._ready()
+        cursor = self.outbox.find({'done': None, 'created': {'$lt': created_before}})
+        async for doc in cursor.sort([('created', 1), ('_id', 1)]):
+            yield doc
+
+    async def outbox_prune(self, done_before):
+        await self._ready()
+        result = await self.outbox.delete_many({'done': {'$lt': done_before}})
+        return result.deleted_count
 
 db = Database(DB_URI, DB_NAME)
+
+
+# Every worker process keeps its own known-user index
+@peers.hook("known_add")
+def _known_add(user_id):
+    db.known.add(user_id)
+
+
+@peers.hook("known_discard")
+def _known_discard(user_id):
+    db.known.discard(user_id)
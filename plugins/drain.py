@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+import logging
+import time
+from pyrogram import Client, raw
+from pyrogram.errors import FloodWait, UserAlreadyParticipant, HideRequesterMissing
+from config import DRAIN_BATCH, DRAIN_CONCURRENCY, DRAIN_STATUS_INTERVAL
+from .database import db
+from .sender import sender, INTERACTIVE
+from .sessions import session_pool
+
+logger = logging.getLogger(__name__)
+
+# 📥 /accept drain: everything pending is approved with one bulk call per pass
+# (every request is approved, so nothing needs looking at one by one). If the
+# bulk call fails or stops making progress, the requests left are streamed
+# page by page and approved in bounded concurrent batches. Progress is saved
+# so a restart carries on.
+jobs = {}  # (user_id, chat_id) -> DrainJob
+
+
+class DrainJob:
+    def __init__(self, bot: Client, acc: Client, data: dict):
+        self.bot = bot
+        self.acc = acc
+        self.data = data
+        self.id = data["_id"]
+        self.task = None
+        self._reported = time.monotonic()
+
+    def start(self):
+        jobs[(self.data["user_id"], self.data["chat_id"])] = self
+        self.task = asyncio.create_task(self.run())
+
+    def _status_text(self, title: str) -> str:
+        d = self.data
+        rate = d["approved"] / d["elapsed"] if d["elapsed"] else 0.0
+        return (
+            f"**{title}**\n\n"
+            f"✅ Approved: {d['approved']}\n"
+            f"⏭ Skipped: {d['skipped']}\n"
+            f"❌ Failed: {d['failed']}\n"
+            f"⏱ Time: {datetime.timedelta(seconds=int(d['elapsed']))}\n"
+            f"⚡ Speed: {rate:.1f} req/s"
+        )
+
+    async def edit_status(self, title: str):
+        d = self.data
+        try:
+            await sender.call(
+                d["status_chat_id"], INTERACTIVE, self.bot.edit_message_text,
+                d["status_chat_id"], d["status_message_id"], self._status_text(title)
+            )
+        except Exception as e:
+            logger.warning(f"Could not update /accept status: {e}")
+
+    async def _save(self):
+        d = self.data
+        await db.update_drain(self.id, {k: d[k] for k in ("status", "approved", "skipped", "failed", "elapsed")})
+
+    async def _approve(self, user_id: int, sem: asyncio.Semaphore):
+        d = self.data
+        async with sem:
+            for _ in range(3):
+                try:
+                    await self.acc.approve_chat_join_request(d["chat_id"], user_id)
+                    d["approved"] += 1
+                    return
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+                except (UserAlreadyParticipant, HideRequesterMissing):
+                    d["skipped"] += 1
+                    return
+                except Exception as e:
+                    logger.info(f"Could not approve {user_id} in {d['chat_id']}: {e}")
+                    break
+            d["failed"] += 1
+
+    async def _approve_batch(self, user_ids: list):
+        sem = asyncio.Semaphore(DRAIN_CONCURRENCY)
+        started = time.monotonic()
+        await asyncio.gather(*(self._approve(user_id, sem) for user_id in user_ids))
+        self.data["elapsed"] += time.monotonic() - started
+        await self._save()
+
+    async def _report(self):
+        if time.monotonic() - self._reported >= DRAIN_STATUS_INTERVAL:
+            self._reported = time.monotonic()
+            await self.edit_status("Accepting join requests...")
+
+    async def _pending(self) -> int:
+        r = await self.acc.invoke(
+            raw.functions.messages.GetChatInviteImporters(
+                peer=await self.acc.resolve_peer(self.data["chat_id"]),
+                limit=1, offset_date=0, offset_user=raw.types.InputUserEmpty(), requested=True, q=""
+            )
+        )
+        return r.count
+
+    async def _approve_all(self) -> bool:
+        """Bulk-approve while it makes progress; False if requests are left for one-by-one approval."""
+        d = self.data
+        pending = await self._pending()
+        while pending:
+            started = time.monotonic()
+            try:
+                await self.acc.approve_all_chat_join_requests(d["chat_id"])
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+                continue
+            except Exception as e:
+                logger.info(f"Bulk approval in {d['chat_id']} failed, approving one by one: {e}")
+                return False
+            # Telegram applies it in the background: give it a moment before counting again
+            await asyncio.sleep(1)
+            left = await self._pending()
+            d["approved"] += max(0, pending - left)
+            d["elapsed"] += time.monotonic() - started
+            await self._save()
+            await self._report()
+            if left >= pending:
+                return False
+            pending = left
+        return True
+
+    async def _approve_each(self):
+        d = self.data
+        while True:
+            seen = 0
+            approved_before = d["approved"]
+            batch = []
+            # Approved requests disappear from the list, so every pass restarts from the top
+            async for request in self.acc.get_chat_join_requests(d["chat_id"]):
+                seen += 1
+                batch.append(request.user.id)
+                if len(batch) >= DRAIN_BATCH:
+                    await self._approve_batch(batch)
+                    batch = []
+                    await self._report()
+            if batch:
+                await self._approve_batch(batch)
+            # Nothing pending, or only requests we keep failing on: done
+            if not seen or d["approved"] == approved_before:
+                break
+
+    async def run(self):
+        d = self.data
+        try:
+            if not await self._approve_all():
+                await self._approve_each()
+            d["status"] = "done"
+            await self._save()
+            await self.edit_status("Successfully accepted all join requests.")
+        except Exception as e:
+            d["status"] = "failed"
+            await self._save()
+            await self.edit_status(f"An error occurred: {e}")
+        finally:
+            jobs.pop((d["user_id"], d["chat_id"]), None)
+            # The connection stays in the pool for the next /accept
+            session_pool.release(d["user_id"])
+
+
+async def start_drain(bot: Client, acc: Client, user_id: int, chat_id: int, status_message) -> DrainJob:
+    data = {
+        "user_id": user_id,
+        "chat_id": chat_id,
+        "status": "running",
+        "status_chat_id": status_message.chat.id,
+        "status_message_id": status_message.id,
+        "approved": 0, "skipped": 0, "failed": 0,
+        "elapsed": 0.0,
+        "created": datetime.datetime.utcnow(),
+    }
+    data["_id"] = await db.add_drain(data)
+    job = DrainJob(bot, acc, data)
+    job.start()
+    return job
+
+
+async def resume_drains(bot: Client):
+    for data in await db.get_unfinished_drains():
+        session = await db.get_session(data["user_id"])
+        if session is None:
+            await db.update_drain(data["_id"], {"status": "failed"})
+            continue
+        try:
+            acc = await session_pool.acquire(data["user_id"], session)
+        except Exception as e:
+            logger.warning(f"Could not resume /accept for {data['user_id']}: {e}")
+            await db.update_drain(data["_id"], {"status": "failed"})
+            continue
+        job = DrainJob(bot, acc, data)
+        job.start()
+        await job.edit_status("♻️ Resumed after restart, accepting join requests...")
@@ -1,33 +1,81 @@
+import asyncio
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from config import AUTH_CHANNELS
-from pyrogram import Client
-from pyrogram.types import Message
+from config import AUTH_CHANNELS, FSUB_CACHE_TTL, FSUB_CACHE_SIZE, FSUB_CHANNEL_TTL
+from pyrogram import Client, filters, enums
+from pyrogram.types import Message, ChatMemberUpdated
 from typing import List
 from pyrogram.errors import UserNotParticipant
+from .cache import TTLCache
+from .sender import sender, INTERACTIVE
+from . import peers
+
+# Only positive answers are cached: a user who just joined must pass on "Try Again"
+member_cache = TTLCache(FSUB_CACHE_TTL, maxsize=FSUB_CACHE_SIZE)
+# channel_id -> (title, invite_link); exporting a link revokes the previous one, so do it rarely
+channel_cache = TTLCache(FSUB_CHANNEL_TTL)
+
+
+async def is_subscribed(bot: Client, channel_id: int, user_id: int) -> bool:
+    if member_cache.get((user_id, channel_id)):
+        return True
+    try:
+        await bot.get_chat_member(channel_id, user_id)
+    except UserNotParticipant:
+        return False
+    member_cache.set((user_id, channel_id), True)
+    return True
+
+
+async def get_channel_info(bot: Client, channel_id: int):
+    async def load():
+        chat = await bot.get_chat(channel_id)
+        invite_link = chat.invite_link or await bot.export_chat_invite_link(channel_id)
+        return chat.title, invite_link
+
+    return await channel_cache.get_or_load(channel_id, load)
+
+
+@Client.on_chat_member_updated(filters.chat(AUTH_CHANNELS), group=2)
+async def fsub_member_updated(bot: Client, update: ChatMemberUpdated):
+    member = update.new_chat_member or update.old_chat_member
+    if not member or not member.user:
+        return
+    new = update.new_chat_member
+    joined = bool(new and new.status in (
+        enums.ChatMemberStatus.MEMBER,
+        enums.ChatMemberStatus.ADMINISTRATOR,
+        enums.ChatMemberStatus.OWNER,
+    ))
+    # The channel's updates reach one worker process; the user's checks run in another
+    peers.broadcast("fsub_member", member.user.id, update.chat.id, joined)
+
+
+@peers.hook("fsub_member")
+def _fsub_member(user_id: int, channel_id: int, joined: bool):
+    if joined:
+        member_cache.set((user_id, channel_id), True)
+    else:
+        member_cache.invalidate((user_id, channel_id))
+
 
 async def get_fsub(bot: Client, message: Message) -> bool:
-    tb = await bot.get_me()
     user_id = message.from_user.id
-    not_joined_channels = []
-    for channel_id in AUTH_CHANNELS:
-        try:
-            await bot.get_chat_member(channel_id, user_id)
-        except UserNotParticipant:
-            chat = await bot.get_chat(channel_id)
-            invite_link = chat.invite_link or await bot.export_chat_invite_link(channel_id)
-            not_joined_channels.append((chat.title, invite_link))
-    if not_joined_channels:
-        join_buttons = []
-        for i in range(0, len(not_joined_channels), 2):
-            row = []
-            for j in range(2):
-                if i + j < len(not_joined_channels):
-                    title, link = not_joined_channels[i + j]
-                    button_text = f"{i + j + 1}. {title}"
-                    row.append(InlineKeyboardButton(button_text, url=link))
-            join_buttons.append(row)
-        join_buttons.append([InlineKeyboardButton("🔄 Try Again", url=f"https://telegram.me/{tb.username}?start=start")])
-        await message.reply(f"**🎭 {message.from_user.mention}, As I see, you haven’t joined my channel yet.\nPlease join by clicking the button below.**",
-                            reply_markup=InlineKeyboardMarkup(join_buttons),)
-        return False
-    return True
\ No newline at end of file
+    joined = await asyncio.gather(*(is_subscribed(bot, channel_id, user_id) for channel_id in AUTH_CHANNELS))
+    missing = [channel_id for channel_id, ok in zip(AUTH_CHANNELS, joined) if not ok]
+    if not missing:
+        return True
+
+    not_joined_channels = await asyncio.gather(*(get_channel_info(bot, channel_id) for channel_id in missing))
+    join_buttons = []
+    for i in range(0, len(not_joined_channels), 2):
+        row = []
+        for j in range(2):
+            if i + j < len(not_joined_channels):
+                title, link = not_joined_channels[i + j]
+                button_text = f"{i + j + 1}. {title}"
+                row.append(InlineKeyboardButton(button_text, url=link))
+        join_buttons.append(row)
+    join_buttons.append([InlineKeyboardButton("🔄 Try Again", url=f"https://telegram.me/{bot.me.username}?start=start")])
+    await sender.call(message.chat.id, INTERACTIVE, message.reply, f"**🎭 {message.from_user.mention}, As I see, you haven’t joined my channel yet.\nPlease join by clicking the button below.**",
+                        reply_markup=InlineKeyboardMarkup(join_buttons),)
+    return False
@@ -2,6 +2,7 @@
 # Subscribe YouTube Channel For Amazing Bot https://youtube.com/@Tech_VJ
 # Ask Doubt on telegram @KingVJ01
 
+import asyncio
 import traceback
 from pyrogram.types import Message
 from pyrogram import Client, filters
@@ -17,6 +18,7 @@ from pyrogram.errors import (
 )
 from config import API_ID, API_HASH
 from plugins.database import db
+from plugins.sessions import session_pool
 
 SESSION_STRING_SIZE = 351
 
@@ -26,6 +28,7 @@ async def logout(client, message):
     if user_data is None:
         return 
     await db.set_session(message.from_user.id, session=None)  
+    await session_pool.discard(message.from_user.id)
     await message.reply("**Logout Successfully** ♦")
 
 @Client.on_message(filters.private & ~filters.forwarded & filters.command(["login"]))
@@ -39,49 +42,54 @@ async def main(bot: Client, message: Message):
     if phone_number_msg.text=='/cancel':
         return await phone_number_msg.reply('<b>process cancelled !</b>')
     phone_number = phone_number_msg.text
-    client = Client(":memory:", API_ID, API_HASH)
+    client = Client(f"login_{user_id}", api_id=API_ID, api_hash=API_HASH, in_memory=True)
     await client.connect()
-    await phone_number_msg.reply("Sending OTP...")
+    pooled = False
     try:
-        code = await client.send_code(phone_number)
-        phone_code_msg = await bot.ask(user_id, "Please check for an OTP in official telegram account. If you got it, send OTP here after reading the below format. \n\nIf OTP is `12345`, **please send it as** `1 2 3 4 5`.\n\n**Enter /cancel to cancel The Procces**", filters=filters.text, timeout=600)
-    except PhoneNumberInvalid:
-        await phone_number_msg.reply('`PHONE_NUMBER` **is invalid.**')
-        return
-    if phone_code_msg.text=='/cancel':
-        return await phone_code_msg.reply('<b>process cancelled !</b>')
-    try:
-        phone_code = phone_code_msg.text.replace(" ", "")
-        await client.sign_in(phone_number, code.phone_code_hash, phone_code)
-    except PhoneCodeInvalid:
-        await phone_code_msg.reply('**OTP is invalid.**')
-        return
-    except PhoneCodeExpired:
-        await phone_code_msg.reply('**OTP is expired.**')
-        return
-    except SessionPasswordNeeded:
-        two_step_msg = await bot.ask(user_id, '**Your account has enabled two-step verification. Please provide the password.\n\nEnter /cancel to cancel The Procces**', filters=filters.text, timeout=300)
-        if two_step_msg.text=='/cancel':
-            return await two_step_msg.reply('<b>process cancelled !</b>')
+        await phone_number_msg.reply("Sending OTP...")
         try:
-            password = two_step_msg.text
-            await retry_with_backoff(5, client.check_password, password=password)
-        except PasswordHashInvalid:
-            await two_step_msg.reply('**Invalid Password Provided**')
+            code = await client.send_code(phone_number)
+            phone_code_msg = await bot.ask(user_id, "Please check for an OTP in official telegram account. If you got it, send OTP here after reading the below format. \n\nIf OTP is `12345`, **please send it as** `1 2 3 4 5`.\n\n**Enter /cancel to cancel The Procces**", filters=filters.text, timeout=600)
+        except PhoneNumberInvalid:
+            await phone_number_msg.reply('`PHONE_NUMBER` **is invalid.**')
             return
-    string_session = await client.export_session_string()
-    await client.disconnect()
-    if len(string_session) < SESSION_STRING_SIZE:
-        return await message.reply('<b>invalid session string</b>')
-    try:
-        user_data = await db.get_session(message.from_user.id)
-        if user_data is None:
-            uclient = Client(":memory:", session_string=string_session, api_id=API_ID, api_hash=API_HASH)
-            await uclient.connect()
-            await db.set_session(message.from_user.id, session=string_session)
-    except Exception as e:
-        return await message.reply_text(f"<b>ERROR IN LOGIN:</b> `{e}`")
-    await bot.send_message(message.from_user.id, "<b>Account Login Successfully.\n\nIf You Get Any Error Related To AUTH KEY Then /logout first and /login again</b>")
+        if phone_code_msg.text=='/cancel':
+            return await phone_code_msg.reply('<b>process cancelled !</b>')
+        try:
+            phone_code = phone_code_msg.text.replace(" ", "")
+            await client.sign_in(phone_number, code.phone_code_hash, phone_code)
+        except PhoneCodeInvalid:
+            await phone_code_msg.reply('**OTP is invalid.**')
+            return
+        except PhoneCodeExpired:
+            await phone_code_msg.reply('**OTP is expired.**')
+            return
+        except SessionPasswordNeeded:
+            two_step_msg = await bot.ask(user_id, '**Your account has enabled two-step verification. Please provide the password.\n\nEnter /cancel to cancel The Procces**', filters=filters.text, timeout=300)
+            if two_step_msg.text=='/cancel':
+                return await two_step_msg.reply('<b>process cancelled !</b>')
+            try:
+                password = two_step_msg.text
+                await retry_with_backoff(5, client.check_password, password=password)
+            except PasswordHashInvalid:
+                await two_step_msg.reply('**Invalid Password Provided**')
+                return
+        string_session = await client.export_session_string()
+        if len(string_session) < SESSION_STRING_SIZE:
+            return await message.reply('<b>invalid session string</b>')
+        try:
+            user_data = await db.get_session(message.from_user.id)
+            if user_data is None:
+                await db.set_session(message.from_user.id, session=string_session)
+        except Exception as e:
+            return await message.reply_text(f"<b>ERROR IN LOGIN:</b> `{e}`")
+        # ♻️ The signed-in client is already connected and authorized: keep it for /accept
+        session_pool.put(user_id, client, string_session)
+        pooled = True
+        await bot.send_message(message.from_user.id, "<b>Account Login Successfully.\n\nIf You Get Any Error Related To AUTH KEY Then /logout first and /login again</b>")
+    finally:
+        if not pooled:
+            await client.disconnect()
 
 async def retry_with_backoff(retries, coroutine, *args, **kwargs):
     delay = 1
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from config import READY_MAX_LAG, READY_MONGO_TIMEOUT, HEALTH_INTERVAL
+from .database import db
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Background checks behind GET /ready.
+
+    Event-loop lag is how late a short sleep wakes up, sampled continuously;
+    the worst lag since the last MongoDB check is what gets reported, so a
+    single long block is not averaged away.
+    """
+
+    LAG_TICK = 0.25
+
+    def __init__(self):
+        self.client = None
+        self.lag = 0.0
+        self.lag_max = 0.0
+        self.lag_window = 0.0
+        self._window_max = 0.0
+        self.mongo_ok = False
+        self.mongo_latency = None
+        self.mongo_error = None
+        self.checked = 0.0
+        self._tasks = []
+
+    def start(self, client):
+        self.client = client
+        self._tasks = [asyncio.create_task(self._lag_loop()), asyncio.create_task(self._check_loop())]
+
+    async def _lag_loop(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.LAG_TICK)
+            lag = max(0.0, time.perf_counter() - started - self.LAG_TICK)
+            self.lag = lag
+            self._window_max = max(self._window_max, lag)
+            self.lag_max = max(self.lag_max, lag)
+
+    async def _check_loop(self):
+        while True:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(db.ping(), READY_MONGO_TIMEOUT)
+                self.mongo_ok, self.mongo_error = True, None
+                self.mongo_latency = time.perf_counter() - started
+            except Exception as e:
+                self.mongo_ok, self.mongo_latency = False, None
+                self.mongo_error = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e)
+                logger.warning(f"MongoDB health check failed: {self.mongo_error}")
+            self.checked = time.time()
+            await asyncio.sleep(HEALTH_INTERVAL)
+            self.lag_window, self._window_max = self._window_max, 0.0
+
+    def window_lag(self) -> float:
+        return max(self.lag_window, self._window_max)
+
+    def report(self) -> dict:
+        lag = self.window_lag()
+        connected = bool(self.client and self.client.is_connected)
+        problems = []
+        if lag > READY_MAX_LAG:
+            problems.append("event_loop_lag")
+        if not self.mongo_ok:
+            problems.append("mongodb")
+        if not connected:
+            problems.append("telegram")
+        return {
+            "status": "degraded" if problems else "ok",
+            "problems": problems,
+            "event_loop_lag": round(lag, 4),
+            "event_loop_lag_now": round(self.lag, 4),
+            "event_loop_lag_max": round(self.lag_max, 4),
+            "mongodb_ok": self.mongo_ok,
+            "mongodb_latency": None if self.mongo_latency is None else round(self.mongo_latency, 4),
+            "mongodb_error": self.mongo_error,
+            "telegram_connected": connected,
+            "checked_ago": round(time.time() - self.checked, 1) if self.checked else None,
+        }
+
+
+health = HealthMonitor()
+
+metrics.Gauge("event_loop_lag_seconds", "Worst event-loop lag over the last check interval.", health.window_lag)
+metrics.Gauge("mongodb_up", "Whether the last MongoDB ping succeeded.", lambda: health.mongo_ok)
@@ -1,5 +1,6 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
+from .sender import sender, INTERACTIVE
 
 @Client.on_message(filters.command("id"))
 async def id_command_handler(client, message: Message):
@@ -37,4 +38,4 @@ async def id_command_handler(client, message: Message):
         if fwd_user.username:
             lines.append(f"   ┗ 🔗 `@{fwd_user.username}`")
 
-    await message.reply_text("\n".join(lines), quote=True)
+    await sender.call(message.chat.id, INTERACTIVE, message.reply_text, "\n".join(lines), quote=True)
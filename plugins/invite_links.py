@@ -0,0 +1,44 @@
+import logging
+import time
+from datetime import datetime
+from pyrogram import Client
+from pyrogram.errors import RPCError
+from config import INVITE_LINK_ROTATE, INVITE_LINK_CHECK
+from .cache import TTLCache
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+# 🔗 One join-request link per chat, shared by every approve/reject message.
+# The link lives in MongoDB so restarts reuse it; memory only remembers that
+# it was still valid the last time we checked.
+link_cache = TTLCache(INVITE_LINK_CHECK)
+
+
+async def get_invite_link(client: Client, chat_id: int, title: str) -> str:
+    async def load():
+        return await _load_invite_link(client, chat_id, title)
+
+    return await link_cache.get_or_load(chat_id, load)
+
+
+async def _load_invite_link(client: Client, chat_id: int, title: str) -> str:
+    doc = await db.get_invite_link(chat_id)
+    if doc and time.time() - doc['created'] < INVITE_LINK_ROTATE:
+        try:
+            link = await client.get_chat_invite_link(chat_id, doc['link'])
+            expired = link.expire_date is not None and link.expire_date < datetime.now()
+            if not link.is_revoked and not expired:
+                return doc['link']
+            logger.info(f"Invite link of {chat_id} was revoked or expired, creating a new one")
+        except RPCError as e:
+            logger.warning(f"Could not check invite link of {chat_id}: {e}")
+
+    # Old links are left working: users may still have them in earlier DMs
+    link = await client.create_chat_invite_link(
+        chat_id=chat_id,
+        name=f"Join {title}",
+        creates_join_request=True
+    )
+    await db.set_invite_link(chat_id, link.invite_link, time.time())
+    return link.invite_link
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class JoinRequestQueue:
+    """Bounded in-process queue for join requests, drained by its own workers.
+
+    Requests are kept per chat and chats are served round-robin, so a viral
+    chat can use every idle worker without starving the others. A request
+    from a user who is already waiting for the same chat is coalesced.
+    """
+
+    def __init__(self, process, workers: int, maxsize: int):
+        self.process = process
+        self.workers = workers
+        self.maxsize = maxsize
+        self._chats = {}     # chat_id -> deque[(enqueued_at, request)]
+        self._ready = None   # asyncio.Queue of chat ids with waiting requests
+        self._pending = set()
+        self._tasks = []
+        self._client = None
+        self._done_at = deque(maxlen=2000)
+        self.depth = 0
+        self.busy = 0
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+        self.wait_avg = 0.0
+        self.wait_max = 0.0
+
+    def start(self, client):
+        self._client = client
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+            for chat_id in self._chats:
+                self._ready.put_nowait(chat_id)
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def submit(self, request) -> bool:
+        key = (request.chat.id, request.from_user.id)
+        if key in self._pending:
+            self.coalesced += 1
+            return True
+        if self.depth >= self.maxsize:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"Join queue full ({self.depth}), {self.dropped} requests left pending")
+            return False
+
+        self._pending.add(key)
+        self.depth += 1
+        self.enqueued += 1
+        items = self._chats.get(request.chat.id)
+        if items is None:
+            items = self._chats[request.chat.id] = deque()
+            if self._ready is not None:
+                self._ready.put_nowait(request.chat.id)
+        items.append((time.monotonic(), request))
+        return True
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            items = self._chats[chat_id]
+            enqueued_at, request = items.popleft()
+            if items:
+                # Back of the line, so other chats get a turn
+                self._ready.put_nowait(chat_id)
+            else:
+                del self._chats[chat_id]
+            self._pending.discard((chat_id, request.from_user.id))
+            self.depth -= 1
+
+            wait = time.monotonic() - enqueued_at
+            self.wait_avg = wait if not self.processed else self.wait_avg * 0.98 + wait * 0.02
+            self.wait_max = max(self.wait_max, wait)
+
+            self.busy += 1
+            try:
+                await self.process(self._client, request)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Join request worker error: {e}")
+            finally:
+                self.busy -= 1
+                self.processed += 1
+                self._done_at.append(time.monotonic())
+
+    def rate(self) -> float:
+        if len(self._done_at) < 2:
+            return 0.0
+        span = time.monotonic() - self._done_at[0]
+        return len(self._done_at) / span if span > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "chats": len(self._chats),
+            "busy": self.busy,
+            "workers": self.workers,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "failed": self.failed,
+            "wait_avg": self.wait_avg,
+            "wait_max": self.wait_max,
+            "rate": self.rate(),
+        }
+
+
+def merge_stats(parts: list) -> dict:
+    """One stats() view of the queues of several processes."""
+    merged = {key: sum(p[key] for p in parts) for key in parts[0] if key not in ("wait_avg", "wait_max")}
+    # The average is weighted by how much each queue processed
+    weight = sum(p["processed"] for p in parts)
+    merged["wait_avg"] = sum(p["wait_avg"] * p["processed"] for p in parts) / weight if weight else 0.0
+    merged["wait_max"] = max(p["wait_max"] for p in parts)
+    return merged
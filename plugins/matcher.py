@@ -0,0 +1,108 @@
+import re
+from collections import deque
+
+
+class TagMatcher:
+    """Case-insensitive multi-substring matcher (Aho-Corasick).
+
+    One pass over the text finds every pattern it contains, however many
+    patterns there are. While no match is in progress the scan jumps straight
+    to the next character that can start a pattern (for hashtag rules: the
+    next ``#``), so ordinary text is skipped at C speed.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [p.lower() for p in patterns]
+        goto = [{}]
+        out = [()]
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (index,)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        first = "".join(sorted(goto[0]))
+        self._start = re.compile("[" + re.escape(first) + "]") if first else None
+
+    def search(self, text: str) -> set:
+        """Indexes of all patterns that occur in ``text``."""
+        found = set()
+        if not text or self._start is None:
+            return found
+        goto, fail, out, start = self._goto, self._fail, self._out, self._start
+        text = text.lower()
+        state = 0
+        i, n = 0, len(text)
+        while i < n:
+            if state == 0:
+                m = start.search(text, i)
+                if m is None:
+                    break
+                i = m.start()
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+            i += 1
+        return found
+
+
+class TagRules:
+    """Compiled hashtag -> required-tags rules of one chat.
+
+    Up to SCAN_LIMIT rules a plain ``in`` per hashtag is faster than the
+    automaton (the default TAG_MAP is 6 rules), so it is only built above that.
+    """
+
+    SCAN_LIMIT = 32
+
+    __slots__ = ("version", "hashtags", "tags", "matcher", "_scan")
+
+    def __init__(self, rules: dict, version: int = 0):
+        self.version = version
+        self.hashtags = list(rules)
+        self.tags = [rules[hashtag] for hashtag in self.hashtags]
+        if len(self.hashtags) > self.SCAN_LIMIT:
+            self.matcher = TagMatcher(self.hashtags)
+            self._scan = None
+        else:
+            self.matcher = None
+            self._scan = [(hashtag.lower(), tags) for hashtag, tags in zip(self.hashtags, self.tags) if hashtag]
+
+    def required_tags(self, description: str) -> list:
+        required = []
+        # Rule order, not text order, decides the order of the tags
+        if self.matcher is None:
+            description = description.lower() if description else ""
+            for hashtag, tags in self._scan:
+                if hashtag in description:
+                    required.extend(tags)
+        else:
+            for index in sorted(self.matcher.search(description)):
+                required.extend(self.tags[index])
+        return list(dict.fromkeys(required))
@@ -2,6 +2,7 @@ import logging
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 import random
+from .sender import sender, INTERACTIVE
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -76,7 +77,8 @@ async def start_math_game(client, message: Message):
     }
     logging.debug(f"Session initialized: {user_sessions[user_id]}")
     
-    await message.reply(
+    await sender.call(
+        message.chat.id, INTERACTIVE, message.reply,
         "🎮 <b>Welcome to the Math Game!</b>\nChoose question count and difficulty level below:",
         reply_markup=get_main_menu(user_sessions[user_id])
     )
@@ -113,7 +115,8 @@ async def send_next_question(client, chat_id, user_id):
     session = user_sessions.get(user_id)
     if not session or session["game_over"] or session["current"] >= session["count"]:
         session["game_over"] = True
-        await client.send_message(
+        await sender.call(
+            chat_id, INTERACTIVE, client.send_message,
             chat_id,
             f"🏁 <b>Game Over!</b>\n✅ Score: {session['score']} / {session['count']}",
             reply_markup=InlineKeyboardMarkup([
@@ -135,7 +138,7 @@ async def send_next_question(client, chat_id, user_id):
     buttons.append([InlineKeyboardButton("🛑 Stop", callback_data="stop_game")])
 
     text = f"❓ <b>Q{session['current']} of {session['count']}:</b>\n<code>{question}</code> = ?"
-    await client.send_message(chat_id, text, reply_markup=InlineKeyboardMarkup(buttons))
+    await sender.call(chat_id, INTERACTIVE, client.send_message, chat_id, text, reply_markup=InlineKeyboardMarkup(buttons))
 
 # Handle answer selection
 @Client.on_callback_query(filters.regex("^answer_"))
@@ -0,0 +1,309 @@
+import functools
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+
+# 📊 Prometheus-style metrics, rendered by GET /metrics in bot.py.
+# Counters are plain attribute increments on per-label objects that are
+# created once and then reused, so recording costs a dict lookup and an add.
+# There are no locks: almost everything runs on the event loop, and the few
+# increments made from driver threads (MongoDB) can at worst lose a count.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []
+
+
+def _label_text(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._children = {}
+        if not self.label_names:
+            self._default = self._children[()] = self._child()
+        _metrics.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._child()
+        return child
+
+    def render(self, out: list, peers=()):
+        out.append(f"# HELP {self.name} {self.doc}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        children = self._merged(peers) if peers else self._children
+        for values, child in list(children.items()):
+            self._render_child(out, _label_text(self.label_names, values), values, child)
+
+    def snapshot(self):
+        return None
+
+    def _merged(self, peers) -> dict:
+        return self._children
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _child = _CounterChild
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+    def _render_child(self, out, labels, values, child):
+        out.append(f"{self.name}{labels} {child.value}")
+
+    def snapshot(self) -> dict:
+        return {values: child.value for values, child in list(self._children.items())}
+
+    def _merged(self, peers) -> dict:
+        merged = {}
+        for snapshot in (self.snapshot(), *peers):
+            for values, value in snapshot.items():
+                child = merged.get(values) or merged.setdefault(values, _CounterChild())
+                child.value += value
+        return merged
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, doc, labels)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _render_child(self, out, labels, values, child):
+        names = self.label_names + ("le",)
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            out.append(f"{self.name}_bucket{_label_text(names, values + (le,))} {cumulative}")
+        out.append(f"{self.name}_sum{labels} {child.sum}")
+        out.append(f"{self.name}_count{labels} {child.count}")
+
+    def snapshot(self) -> dict:
+        return {values: (list(child.counts), child.sum, child.count) for values, child in list(self._children.items())}
+
+    def _merged(self, peers) -> dict:
+        merged = {}
+        for snapshot in (self.snapshot(), *peers):
+            for values, (counts, total, count) in snapshot.items():
+                child = merged.get(values) or merged.setdefault(values, self._child())
+                child.counts = [a + b for a, b in zip(child.counts, counts)]
+                child.sum += total
+                child.count += count
+        return merged
+
+
+class Gauge(_Metric):
+    """Value read from ``func()`` at scrape time.
+
+    With ``labels`` (a single label name), ``func()`` returns a dict of
+    label value -> value instead.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, func, labels=()):
+        self.func = func
+        super().__init__(name, doc)
+        self.label_names = tuple(labels)
+
+    def _child(self):
+        return None
+
+    def _render_child(self, out, labels, values, child):
+        try:
+            if not self.label_names:
+                out.append(f"{self.name} {float(self.func())}")
+                return
+            for value, reading in list(self.func().items()):
+                out.append(f"{self.name}{_label_text(self.label_names, (value,))} {float(reading)}")
+        except Exception:
+            pass
+
+
+def snapshot() -> dict:
+    """Counter and histogram values of this process, for another process's render()."""
+    return {m.name: snap for m in _metrics if (snap := m.snapshot()) is not None}
+
+
+def render(peers=()) -> str:
+    """``peers`` are snapshot()s of worker processes, added to the counters and histograms here."""
+    out = []
+    for metric in _metrics:
+        metric.render(out, [p[metric.name] for p in peers if metric.name in p])
+    return "\n".join(out) + "\n"
+
+
+# 🤖 Handlers
+handler_calls = Counter("bot_handler_calls_total", "Update handler invocations.", ("handler",))
+handler_errors = Counter("bot_handler_errors_total", "Update handlers that raised.", ("handler",))
+handler_seconds = Histogram("bot_handler_seconds", "Update handler wall time.", ("handler",))
+handler_cpu_seconds = Histogram("bot_handler_cpu_seconds", "CPU time spent inside update handlers (HANDLER_TIMING or during /profile).", ("handler",))
+handler_api_seconds = Histogram("bot_handler_api_seconds", "Time update handlers spent awaiting Telegram API calls (HANDLER_TIMING or during /profile).", ("handler",))
+
+# 📡 Telegram API
+api_calls = Counter("telegram_api_calls_total", "Telegram API calls by method.", ("method",))
+flood_waits = Counter("telegram_flood_waits_total", "FloodWait errors by method.", ("method",))
+flood_seconds = Counter("telegram_flood_wait_seconds_total", "Seconds Telegram asked us to wait.")
+
+# 📤 Sender
+send_dropped = Counter("sender_dropped_total", "Background sends refused because the chat's send backlog was full.", ("chat",))
+
+# 🚪 Join requests
+join_requests = Counter("join_requests_total", "Join requests handled, by chat and result.", ("chat", "result"))
+
+# 📢 Broadcasts
+broadcast_messages = Counter("broadcast_messages_total", "Broadcast deliveries by result.", ("result",))
+
+# 🍃 MongoDB
+mongo_seconds = Histogram(
+    "mongodb_command_seconds", "MongoDB command latency.", ("command",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+mongo_failures = Counter("mongodb_command_failures_total", "Failed MongoDB commands.", ("command",))
+
+# 📮 Outbox
+outbox_items = Counter("outbox_items_total", "Outbox items by outcome.", ("result",))
+outbox_batch = Histogram(
+    "outbox_commit_batch_size", "Outbox writes per group commit.", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+
+
+# Per-handler accumulator for Bot.invoke: a one-item list of API seconds
+api_time = ContextVar("api_time", default=None)
+
+# Per-handler CPU/API split; off by default, see instrument()
+detailed = False
+
+# Most recent slow calls: (unix time, handler, wall, cpu, api, chat id); cpu/api are None unless detailed
+slow_calls = deque(maxlen=50)
+
+
+class _CPUTimed:
+    """Awaits ``coro`` by stepping it by hand, adding up thread CPU time per step.
+
+    Only the handler's own steps are timed; while it is suspended other tasks
+    run, so ``cpu`` is the CPU this handler used, not the event loop's.
+    """
+
+    __slots__ = ("coro", "cpu")
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.cpu = 0.0
+
+    def __await__(self):
+        coro, clock = self.coro, time.thread_time
+        value, error = None, None
+        while True:
+            started = clock()
+            try:
+                yielded = coro.send(value) if error is None else coro.throw(error)
+            except StopIteration as e:
+                self.cpu += clock() - started
+                return e.value
+            except BaseException:
+                self.cpu += clock() - started
+                raise
+            self.cpu += clock() - started
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+def _chat_of(args):
+    update = args[1] if len(args) > 1 else None
+    chat = getattr(update, "chat", None) or getattr(getattr(update, "message", None), "chat", None)
+    return getattr(chat, "id", None)
+
+
+def instrument(callback, slow: float = 1.0):
+    """Wrap an async update handler to record calls, errors, wall time and slow calls.
+
+    CPU and API time are only split out while ``detailed`` is on (HANDLER_TIMING,
+    or for the length of a /profile), since that costs allocations on every call.
+    """
+    name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+    calls = handler_calls.labels(name)
+    errors = handler_errors.labels(name)
+    seconds = handler_seconds.labels(name)
+    cpu_seconds = handler_cpu_seconds.labels(name)
+    api_seconds = handler_api_seconds.labels(name)
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        calls.value += 1
+        cpu = api = None
+        try:
+            if not detailed:
+                return await callback(*args, **kwargs)
+            spent = [0.0]
+            token = api_time.set(spent)
+            timed = _CPUTimed(callback(*args, **kwargs))
+            try:
+                return await timed
+            finally:
+                api_time.reset(token)
+                cpu, api = timed.cpu, spent[0]
+                cpu_seconds.observe(cpu)
+                api_seconds.observe(api)
+        except Exception as e:
+            # Stop/ContinuePropagation are flow control, not failures
+            if not type(e).__name__.endswith("Propagation"):
+                errors.value += 1
+            raise
+        finally:
+            wall = time.perf_counter() - started
+            seconds.observe(wall)
+            if wall >= slow:
+                slow_calls.append((time.time(), name, wall, cpu, api, _chat_of(args)))
+
+    wrapper.instrumented = True
+    return wrapper
@@ -0,0 +1,253 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from pyrogram import Client
+from pyrogram.errors import FloodWait, InternalServerError, UserAlreadyParticipant
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from config import OUTBOX_REPLAY_RATE, OUTBOX_MAX_ATTEMPTS, OUTBOX_MAX_AGE, OUTBOX_KEEP, OUTBOX_OVERFLOW
+from .database import db
+from .sender import sender
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Worth another try after a restart; anything else is final for that item
+TRANSIENT = (FloodWait, InternalServerError, TimeoutError, ConnectionError, OSError)
+
+
+class OutboxItem:
+    """One side effect of a join request: an approval, a message or a sticker.
+
+    ``key`` is ``<chat>:<user>:<request date>:<step>``, so the same request
+    always produces the same keys and is never recorded twice.
+    """
+
+    __slots__ = ("key", "kind", "chat_id", "priority", "data")
+
+    def __init__(self, key: str, kind: str, chat_id: int, priority: int, data: dict):
+        self.key = key
+        self.kind = kind
+        self.chat_id = chat_id
+        self.priority = priority
+        self.data = data
+
+    @property
+    def request(self) -> str:
+        return self.key.rsplit(":", 1)[0]
+
+    def doc(self, now: float) -> dict:
+        return {
+            "_id": self.key, "kind": self.kind, "chat_id": self.chat_id, "priority": self.priority,
+            "data": self.data, "created": now, "attempts": 0, "done": None,
+        }
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "OutboxItem":
+        return cls(doc["_id"], doc["kind"], doc["chat_id"], doc["priority"], doc["data"])
+
+
+def buttons_data(markup: InlineKeyboardMarkup) -> list:
+    """URL buttons as plain lists, so they can be stored."""
+    return [[[b.text, b.url] for b in row] for row in markup.inline_keyboard]
+
+
+def _markup(rows):
+    if rows:
+        return InlineKeyboardMarkup([[InlineKeyboardButton(text, url=url) for text, url in row] for row in rows])
+
+
+class Outbox:
+    """Write-ahead log for what a join request does to the outside world.
+
+    Items are recorded before anything is sent and acknowledged once
+    delivered (or failed for good). Writes from every concurrent request are
+    group-committed: whatever arrives while one commit is in flight goes out
+    together in the next bulk write. On startup, items a previous process
+    left unacknowledged are replayed at OUTBOX_REPLAY_RATE.
+    """
+
+    def __init__(self):
+        self._records = []
+        self._updates = []
+        self._batch = None
+        self._committer = None
+        self._overflow = deque()
+        self._overflow_task = None
+
+    def _write(self, records=(), updates=()) -> asyncio.Future:
+        self._records.extend(records)
+        self._updates.extend(updates)
+        if self._batch is None:
+            self._batch = asyncio.get_running_loop().create_future()
+            # Acks are not awaited; don't warn about errors nobody asked for (they are logged)
+            self._batch.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if self._committer is None:
+            self._committer = asyncio.create_task(self._commit())
+        return self._batch
+
+    async def _commit(self):
+        try:
+            while self._batch is not None:
+                records, updates, batch = self._records, self._updates, self._batch
+                self._records, self._updates, self._batch = [], [], None
+                metrics.outbox_batch.observe(len(records) + len(updates))
+                try:
+                    batch.set_result(await db.outbox_commit(records, updates))
+                except Exception as e:
+                    logger.error(f"Outbox commit of {len(records) + len(updates)} writes failed: {e}")
+                    batch.set_exception(e)
+        finally:
+            self._committer = None
+
+    async def flush(self):
+        if self._batch is not None:
+            await asyncio.shield(self._batch)
+
+    async def record(self, items: list) -> bool:
+        """Durably note ``items`` before running them; False if the request was already recorded."""
+        now = time.time()
+        try:
+            existing = await self._write(records=[item.doc(now) for item in items])
+        except Exception:
+            # An outbox outage must not stop approvals: carry on without the safety net
+            return True
+        if any(item.key in existing for item in items):
+            # Seen before: in flight here, or left over for the startup replay
+            metrics.outbox_items.labels("duplicate").inc(len(items))
+            return False
+        metrics.outbox_items.labels("recorded").inc(len(items))
+        return True
+
+    def _ack(self, item: OutboxItem, error: str = None):
+        self._write(updates=[(item.key, {"$set": {"done": time.time(), "error": error}})])
+        metrics.outbox_items.labels("failed" if error else "delivered").inc()
+
+    def skip(self, items: list, reason: str):
+        for item in items:
+            self._write(updates=[(item.key, {"$set": {"done": time.time(), "error": reason}})])
+        metrics.outbox_items.labels("skipped").inc(len(items))
+
+    async def deliver(self, client: Client, item: OutboxItem):
+        """Run one item (no rate limiting: wrap sends in sender.call) and acknowledge it."""
+        try:
+            if item.kind == "approve":
+                try:
+                    await client.approve_chat_join_request(item.chat_id, item.data["user_id"])
+                except UserAlreadyParticipant:
+                    logger.info(f"User {item.data['user_id']} is already in {item.chat_id}")
+            elif item.kind == "sticker":
+                await client.send_sticker(item.chat_id, item.data["sticker"])
+            else:
+                await client.send_message(
+                    item.chat_id, item.data["text"],
+                    disable_web_page_preview=item.data.get("disable_web_page_preview", False),
+                    reply_markup=_markup(item.data.get("buttons")),
+                )
+        except TRANSIENT:
+            self._write(updates=[(item.key, {"$inc": {"attempts": 1}})])
+            metrics.outbox_items.labels("retry").inc()
+            raise
+        except Exception as e:
+            self._ack(item, str(e) or type(e).__name__)
+            raise
+        self._ack(item)
+        if item.kind == "approve":
+            await db.add_approved(item.chat_id, item.data["user_id"], item.data["tags"])
+
+    def post(self, client: Client, item: OutboxItem):
+        """Deliver ``item`` in the background through ``sender.post``.
+
+        When the chat's send backlog is full the item waits in a bounded
+        overflow (still recorded, so a restart replays it) and is sent one at
+        a time behind the backlog; only past OUTBOX_OVERFLOW is it skipped.
+        """
+        if sender.post(item.chat_id, item.priority, self.deliver, client, item) is not None:
+            return
+        if len(self._overflow) >= OUTBOX_OVERFLOW:
+            logger.warning(f"Outbox: overflow is full, skipping {item.key}")
+            self.skip([item], "send backlog full")
+            return
+        self._overflow.append(item)
+        metrics.outbox_items.labels("overflow").inc()
+        if self._overflow_task is None:
+            self._overflow_task = asyncio.create_task(self._drain_overflow(client))
+
+    async def _drain_overflow(self, client: Client):
+        try:
+            while self._overflow:
+                item = self._overflow.popleft()
+                try:
+                    await sender.call(item.chat_id, item.priority, self.deliver, client, item)
+                except Exception as e:
+                    logger.warning(f"Outbox: overflow send of {item.key} failed: {e}")
+        finally:
+            self._overflow_task = None
+
+    async def send_all(self, client: Client, items: list):
+        """Deliver ``items`` in order through the sender; after a final failure the rest are dropped."""
+        for i, item in enumerate(items):
+            try:
+                await sender.call(item.chat_id, item.priority, self.deliver, client, item)
+            except Exception as e:
+                if not isinstance(e, TRANSIENT):
+                    self.skip(items[i + 1:], f"earlier step failed: {e}")
+                raise
+
+    async def replay(self, client: Client, created_before: float):
+        """Finish what earlier processes recorded but never acknowledged, oldest first."""
+        replayed = dropped = 0
+        try:
+            async for group in _requests(db.outbox_pending(created_before)):
+                items = [item for item, _ in group]
+                age = time.time() - group[0][1]["created"]
+                if age > OUTBOX_MAX_AGE or max(doc["attempts"] for _, doc in group) >= OUTBOX_MAX_ATTEMPTS:
+                    # Too late to make sense to the user, or keeps failing
+                    self.skip(items, "expired" if age > OUTBOX_MAX_AGE else "gave up")
+                    dropped += len(items)
+                    continue
+                metrics.outbox_items.labels("replayed").inc(len(items))
+                await self._replay_request(client, items)
+                replayed += len(items)
+                await asyncio.sleep(len(items) / OUTBOX_REPLAY_RATE)
+            await self.flush()
+            pruned = await db.outbox_prune(time.time() - OUTBOX_KEEP)
+            if replayed or dropped or pruned:
+                logger.info(f"Outbox: replayed {replayed}, dropped {dropped} stale, pruned {pruned} acknowledged items")
+        except Exception as e:
+            logger.error(f"Outbox replay stopped: {e}")
+
+    async def _replay_request(self, client: Client, items: list):
+        if items[0].kind == "approve":
+            try:
+                await self.deliver(client, items[0])
+            except TRANSIENT as e:
+                logger.warning(f"Outbox: approval {items[0].key} still failing ({e}), keeping it for later")
+                return
+            except Exception as e:
+                self.skip(items[1:], f"approval failed: {e}")
+                return
+            items = items[1:]
+        # User DMs and channel posts are independent of each other
+        for _, chat_items in itertools.groupby(items, key=lambda i: i.chat_id):
+            try:
+                await self.send_all(client, list(chat_items))
+            except Exception as e:
+                logger.warning(f"Outbox: replaying {items[0].request} failed: {e}")
+
+
+async def _requests(docs):
+    # Consecutive pending docs that belong to the same join request
+    group = []
+    async for doc in docs:
+        item = OutboxItem.from_doc(doc)
+        if group and group[-1][0].request != item.request:
+            yield group
+            group = []
+        group.append((item, doc))
+    if group:
+        yield group
+
+
+outbox = Outbox()
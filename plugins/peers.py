@@ -0,0 +1,48 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 🔗 State that every process keeps its own copy of.
+#
+# In multi-process mode (WORKER_PROCESSES > 0) caches, the join queue, the
+# known-user index and the handler metrics live in whichever worker handles
+# a chat. Plugins register named hooks on that state: broadcast() runs a
+# hook in every process (invalidations, index updates) and gather() returns
+# its result from every worker (stats, metric snapshots). With a single
+# process both only see the local copy. workers.py sets ``transport``.
+
+hooks = {}
+transport = None
+
+
+def hook(name: str):
+    """Register a function that other processes may run.
+
+    Broadcast hooks must be plain functions. A gather-only hook may be a
+    coroutine function; workers answer once it finishes.
+    """
+    def register(func):
+        hooks[name] = func
+        return func
+    return register
+
+
+def run(name: str, args=()):
+    try:
+        return hooks[name](*args)
+    except Exception as e:
+        logger.warning(f"Hook {name} failed: {e}")
+
+
+def broadcast(name: str, *args):
+    """Run hook ``name`` here and in every other process."""
+    run(name, args)
+    if transport is not None:
+        transport.broadcast(name, args)
+
+
+async def gather(name: str, *args, timeout: float = 5) -> list:
+    """Results of hook ``name`` from the worker processes; empty when there are none."""
+    if transport is None:
+        return []
+    return await transport.gather(name, args, timeout)
@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from config import ADMINS, PROFILE_MAX_SECONDS, PROFILE_INTERVAL
+from . import metrics, peers
+
+logger = logging.getLogger(__name__)
+
+# 🔬 On-demand sampling profiler. Nothing runs until /profile is sent; then a
+# worker thread snapshots every thread's stack each PROFILE_INTERVAL and the
+# result is sent back in "folded" format (one "frame;frame;frame count" line
+# per stack), which flamegraph.pl, speedscope and inferno read directly.
+# Worker processes (WORKER_PROCESSES > 0) are sampled at the same time; each
+# stack starts with the name of the process it came from.
+_running = False
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts = []
+            while frame is not None:
+                parts.append(_frame_name(frame))
+                frame = frame.f_back
+            parts.append(names.get(ident) or str(ident))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+@peers.hook("profile")
+async def _sample(seconds: float, interval: float) -> Counter:
+    # Split handler time into CPU/API while sampling, so /slowcalls has it too
+    detailed, metrics.detailed = metrics.detailed, True
+    try:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval)
+    finally:
+        metrics.detailed = detailed
+    process = multiprocessing.current_process().name
+    return Counter({f"{process};{stack}": count for stack, count in stacks.items()})
+
+
+def _top_functions(stacks: Counter, n: int = 8) -> list:
+    # Leaf frames, i.e. where the samples were actually executing
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves.most_common(n)
+
+
+@Client.on_message(filters.command("profile") & filters.user(ADMINS))
+async def profile(client: Client, message: Message):
+    global _running
+    try:
+        seconds = min(PROFILE_MAX_SECONDS, max(1, int(message.command[1]))) if len(message.command) > 1 else 10
+    except ValueError:
+        return await message.reply_text("❌ Usage: `/profile [seconds]`")
+    if _running:
+        return await message.reply_text("⚠️ A profile is already being recorded.")
+    _running = True
+    try:
+        sts = await message.reply_text(f"🔬 Sampling all threads for {seconds}s...")
+        local = asyncio.create_task(_sample(seconds, PROFILE_INTERVAL))
+        workers = await peers.gather("profile", seconds, PROFILE_INTERVAL, timeout=seconds + 10)
+        stacks = await local
+        for worker_stacks in workers:
+            stacks.update(worker_stacks)
+        total = sum(stacks.values())
+        with tempfile.NamedTemporaryFile("w", suffix=".folded", prefix="profile-", delete=False, encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+            path = f.name
+        top = "\n".join(
+            f"{count * 100 / total:5.1f}% <code>{name}</code>" for name, count in _top_functions(stacks)
+        ) if total else "no samples"
+        try:
+            await client.send_document(
+                message.chat.id, path,
+                file_name=f"profile-{datetime.datetime.utcnow():%Y%m%d-%H%M%S}.folded",
+                caption=f"🔬 {total} samples over {seconds}s from {1 + len(workers)} process(es)\n\n{top}"[:1024]
+            )
+        finally:
+            os.remove(path)
+        await sts.delete()
+    except Exception as e:
+        logger.error(f"Profile failed: {e}")
+        await message.reply_text(f"❌ Profile failed: {e}")
+    finally:
+        _running = False
+
+
+def _seconds(value) -> str:
+    # CPU/API time is only split out under HANDLER_TIMING or while /profile runs
+    return "-" if value is None else f"{value:.2f}"
+
+
+@peers.hook("slow_calls")
+def _slow_calls():
+    return list(metrics.slow_calls)
+
+
+@Client.on_message(filters.command("slowcalls") & filters.user(ADMINS))
+async def slow_calls(client: Client, message: Message):
+    # Handlers mostly run in the worker processes, if there are any
+    calls = _slow_calls()
+    for worker_calls in await peers.gather("slow_calls"):
+        calls.extend(worker_calls)
+    calls = sorted(calls, key=lambda call: call[0])[-20:]
+    if not calls:
+        return await message.reply_text("✅ No slow handler calls recorded.")
+    lines = ["🐢 <b>Slow handler calls</b> (wall / cpu / api, seconds)\n"]
+    for at, name, wall, cpu, api, chat_id in reversed(calls):
+        when = datetime.datetime.utcfromtimestamp(at).strftime("%H:%M:%S")
+        chat = f" · chat <code>{chat_id}</code>" if chat_id else ""
+        lines.append(f"{when} <code>{name}</code> {wall:.2f} / {_seconds(cpu)} / {_seconds(api)}{chat}")
+    await message.reply_text("\n".join(lines))
@@ -0,0 +1,239 @@
+import asyncio
+import datetime
+import heapq
+import logging
+import random
+import time
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from config import ADMINS, QUOTE_INTERVAL, QUOTE_JITTER
+from plugins.database import db
+from plugins.sender import sender, BACKGROUND
+from plugins.quote.quote import quote_store, TARGET_CHANNEL_ID
+from plugins.quote.store import get_random_emoji
+
+logger = logging.getLogger(__name__)
+
+
+def _quote_text(category: str, quote: str) -> str:
+    return (
+        f"❝ <b>{category.capitalize()} Quote ❞</b>\n\n"
+        f"<blockquote>❁┉━┉━┉━┉┉━┉━┉━┉┉━┉━┉❁</blockquote>\n"
+        f"<b><blockquote>{get_random_emoji()} {quote} {get_random_emoji()}</blockquote></b>\n"
+        f"<blockquote>❁┉━┉━┉━┉┉━┉━┉━┉┉━┉━┉❁</blockquote>\n\n"
+        f"<blockquote><b>@II_LevelUP_II {get_random_emoji()}</b></blockquote>"
+    )
+
+
+def _is_quiet(channel: dict, when: float) -> bool:
+    quiet = channel.get("quiet")
+    if not quiet:
+        return False
+    start, end = quiet
+    hour = datetime.datetime.utcfromtimestamp(when).hour
+    # 23-7 wraps around midnight
+    return start <= hour < end if start < end else hour >= start or hour < end
+
+
+def _next_slot(channel: dict, now: float) -> float:
+    # Slots stay on the channel's own grid; a missed stretch (downtime) yields one
+    # post for the slot that was due, then the grid resumes from now
+    slot = channel["slot"] + channel["interval"]
+    if slot <= now:
+        slot += channel["interval"] * ((now - slot) // channel["interval"] + 1)
+    return slot
+
+
+class QuoteScheduler:
+    """Posts quotes to every configured channel from one timer.
+
+    The heap holds ``(next_run, chat_id)``; entries whose next_run no longer
+    matches the channel's are stale and skipped. next_run is claimed in the
+    database before posting, so a restart or a second instance never posts the
+    same slot twice.
+    """
+
+    def __init__(self):
+        self._channels = {}  # chat_id -> channel doc
+        self._heap = []
+        self._wakeup = None
+        self.posted = 0
+        self.skipped = 0
+
+    def _push(self, channel: dict):
+        self._channels[channel["chat_id"]] = channel
+        heapq.heappush(self._heap, (channel["next_run"], channel["chat_id"]))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def update(self, channel: dict):
+        self._push(channel)
+
+    def remove(self, chat_id: int):
+        self._channels.pop(chat_id, None)
+
+    def channels(self) -> list:
+        return sorted(self._channels.values(), key=lambda c: c["next_run"])
+
+    async def _seed(self):
+        # Once per database: a channel removed with /delquotechannel stays removed
+        if not await db.mark_quote_seeded():
+            return
+        if TARGET_CHANNEL_ID and not await db.get_quote_channels():
+            await db.set_quote_channel(TARGET_CHANNEL_ID, new_channel(TARGET_CHANNEL_ID, QUOTE_INTERVAL))
+
+    async def run(self, client: Client):
+        await asyncio.sleep(10)  # Give bot time to fully start
+        self._wakeup = asyncio.Event()
+        await self._seed()
+        for channel in await db.get_quote_channels():
+            self._push(channel)
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            when, chat_id = self._heap[0]
+            channel = self._channels.get(chat_id)
+            if channel is None or channel["next_run"] != when:
+                heapq.heappop(self._heap)
+                continue
+            delay = when - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            try:
+                await self._fire(client, channel)
+            except Exception as e:
+                logger.error(f"[❌ Auto Quote Error] {chat_id}: {e}")
+                channel["next_run"] = time.time() + 60
+                heapq.heappush(self._heap, (channel["next_run"], chat_id))
+
+    async def _fire(self, client: Client, channel: dict):
+        chat_id = channel["chat_id"]
+        slot = _next_slot(channel, time.time())
+        update = {"slot": slot, "next_run": slot + random.uniform(0, QUOTE_JITTER)}
+        if not await db.claim_quote_slot(chat_id, channel["next_run"], update):
+            # Changed or claimed elsewhere: follow what the database says
+            fresh = await db.get_quote_channel(chat_id)
+            if fresh is None:
+                self._channels.pop(chat_id, None)
+            else:
+                self._push(fresh)
+            return
+        due = channel["slot"]
+        channel.update(update)
+        self._push(channel)
+
+        if _is_quiet(channel, due):
+            self.skipped += 1
+            return
+        categories = [c for c in channel.get("categories") or quote_store.categories if c in quote_store.categories]
+        random.shuffle(categories)
+        for category in categories:
+            quote = quote_store.random_quote(category)
+            if not quote.startswith("⚠️"):
+                # Fire-and-forget: a slow or flooded channel must not hold up the timer
+                if sender.post(chat_id, BACKGROUND, client.send_message, chat_id, _quote_text(category, quote)) is None:
+                    await self._release(channel, due)
+                    return
+                self.posted += 1
+                logger.info(f"[✅] Sent quote from '{category}' to {chat_id}")
+                return
+        logger.warning(f"❌ No valid quote categories for {chat_id}.")
+
+
+    async def _release(self, channel: dict, due: float):
+        # The send backlog was full: give the slot back and try it again in a minute
+        retry = {"slot": due, "next_run": time.time() + 60}
+        if await db.claim_quote_slot(channel["chat_id"], channel["next_run"], retry):
+            channel.update(retry)
+            self._push(channel)
+        logger.warning(f"Send backlog for {channel['chat_id']} is full, retrying its quote in 60s")
+
+
+def new_channel(chat_id: int, interval: int, categories=None, quiet=None) -> dict:
+    now = time.time()
+    return {
+        "chat_id": chat_id,
+        "interval": interval,
+        "categories": categories or [],
+        "quiet": quiet,
+        "slot": now,
+        "next_run": now + random.uniform(0, QUOTE_JITTER),
+    }
+
+
+quote_scheduler = QuoteScheduler()
+
+
+def _parse_quiet(value: str):
+    start, end = (int(h) % 24 for h in value.split("-"))
+    return [start, end] if start != end else None
+
+
+@Client.on_message(filters.command("quotechannel") & filters.user(ADMINS))
+async def set_quote_channel(client: Client, message: Message):
+    usage = "❌ Usage: `/quotechannel <chat_id> <minutes> [category,category|all] [quiet HH-HH UTC]`"
+    try:
+        chat_id = int(message.command[1])
+        interval = max(1, int(message.command[2])) * 60
+        categories = None
+        if len(message.command) > 3 and message.command[3] != "all":
+            categories = [c.strip().lower() for c in message.command[3].split(",") if c.strip()]
+        quiet = _parse_quiet(message.command[4]) if len(message.command) > 4 else None
+    except (IndexError, ValueError):
+        return await message.reply_text(usage)
+    unknown = [c for c in categories or [] if c not in quote_store.categories]
+    if unknown:
+        return await message.reply_text(f"⚠️ Unknown categories: {', '.join(unknown)}\nAvailable: {', '.join(quote_store.categories)}")
+
+    channel = await db.get_quote_channel(chat_id)
+    if channel is None:
+        channel = new_channel(chat_id, interval, categories, quiet)
+    else:
+        # Keep the slot grid, only move the next post if the new interval is shorter
+        channel.update({"interval": interval, "categories": categories or [], "quiet": quiet})
+        if channel["slot"] - time.time() > interval:
+            channel["slot"] = time.time()
+            channel["next_run"] = channel["slot"] + random.uniform(0, QUOTE_JITTER)
+    await db.set_quote_channel(chat_id, channel)
+    quote_scheduler.update(channel)
+    await message.reply_text(
+        f"✅ Quotes for <code>{chat_id}</code> every {interval // 60} min\n"
+        f"Categories: {', '.join(categories) if categories else 'all'}\n"
+        f"Quiet hours (UTC): {'%02d-%02d' % tuple(quiet) if quiet else 'none'}"
+    )
+
+
+@Client.on_message(filters.command("delquotechannel") & filters.user(ADMINS))
+async def delete_quote_channel(client: Client, message: Message):
+    try:
+        chat_id = int(message.command[1])
+    except (IndexError, ValueError):
+        return await message.reply_text("❌ Usage: `/delquotechannel <chat_id>`")
+    if not await db.delete_quote_channel(chat_id):
+        return await message.reply_text(f"⚠️ <code>{chat_id}</code> has no scheduled quotes.")
+    quote_scheduler.remove(chat_id)
+    await message.reply_text(f"🗑 Stopped quotes for <code>{chat_id}</code>.")
+
+
+@Client.on_message(filters.command("quotechannels") & filters.user(ADMINS))
+async def list_quote_channels(client: Client, message: Message):
+    channels = quote_scheduler.channels()
+    if not channels:
+        return await message.reply_text("No channels get scheduled quotes. Add one with /quotechannel.")
+    now = time.time()
+    lines = [f"🗓 <b>Scheduled quotes</b> (posted {quote_scheduler.posted}, quiet-skipped {quote_scheduler.skipped})\n"]
+    for c in channels[:50]:
+        quiet = " · quiet %02d-%02d" % tuple(c["quiet"]) if c.get("quiet") else ""
+        lines.append(
+            f"● <code>{c['chat_id']}</code> every {c['interval'] // 60} min · "
+            f"{', '.join(c['categories']) or 'all'}{quiet} · next in {max(0, int(c['next_run'] - now)) // 60} min"
+        )
+    await message.reply_text("\n".join(lines))
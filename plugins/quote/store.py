@@ -0,0 +1,137 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 😀 Emoji decorations, flattened once (duplicates across groups keep their weight)
+EMOJI_GROUPS = {
+    'stars': ['✨', '🌟', '⭐', '💫', '☄️', '🌠'],
+    'fire': ['🔥', '🎇', '🎆', '🧨', '💥'],
+    'hands': ['👏', '🙌', '👍', '✊', '🤝', '🫶'],
+    'symbols': ['💯', '⚡', '🔄', '♻️', '✅', '✔️'],
+    'nature': ['🌱', '🌲', '🌞', '🌈', '🌊'],
+    'objects': ['🏆', '🎯', '⏳', '⌛', '🔑', '💎'],
+    'faces': ['😘', '🤩', '😎', '😈', '🫡', '😊', '💀', '❤️‍🔥'],
+    'trophies': ['🏆', '🥇', '🥈', '🥉', '🎖️', '🏅', '📈', '📊'],
+    'energy': ['⚡', '💪', '🦾', '🚀', '🧠', '💥', '☄️'],
+    'success': ['💰', '💎', '👑', '🎯', '🔑', '🗝️', '🏁', '🚩'],
+    'growth': ['🌱', '🌿', '🌲', '🌻', '🌞', '🌊', '🌀'],
+    'time': ['⏳', '⌛', '⏱️', '🕰️', '⏰', '🔔', '🗓️'],
+    'celebration': ['🎉', '🎊', '🥳', '🎇', '🎆', '✨', '🌟', '⭐'],
+    'determination': ['💢', '❕', '❗', '‼️', '🔥', '🧗', '🏋️', '🤺'],
+    'positivity': ['❤️', '🫶', '☀️', '☮️', '☯️', '🕉️', '🙏', '♾️'],
+    'action': ['🏃', '🚴', '🧗', '🤾', '🏋️', '🤸', '⛹️', '🤼'],
+    'mindset': ['🧘', '🫁', '👁️', '🔭', '🕵️', '💭', '💡', '🔎'],
+}
+EMOJIS = tuple(emoji for group in EMOJI_GROUPS.values() for emoji in group)
+
+
+def get_random_emoji() -> str:
+    return ''.join(random.choices(EMOJIS, k=random.randint(1, 2)))
+
+
+def _parse(path: Path) -> tuple:
+    with open(path, "r", encoding="utf-8") as f:
+        quotes = json.load(f)
+    if not isinstance(quotes, list):
+        raise ValueError("expected a list of quotes")
+    return tuple(
+        f"\"{q.get('quote', str(q))}\"" if isinstance(q, dict) else f"\"{q}\""
+        for q in quotes
+    )
+
+
+class QuoteStore:
+    """All quote files of a directory, parsed once and kept in memory.
+
+    ``refresh`` re-reads only files whose mtime or size changed, so the
+    watcher costs one ``stat`` per file per poll. Nothing is read until the
+    first refresh; a lookup before it (startup warms the store in the
+    background) loads the files on the spot.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._quotes = {}   # category -> tuple of ready-to-send quotes
+        self._stamps = {}   # category -> (mtime_ns, size)
+        self._errors = {}   # category -> message shown instead of a quote
+        self._categories = ()
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @property
+    def categories(self) -> tuple:
+        if not self._loaded:
+            self.refresh()
+        return self._categories
+
+    def _scan(self) -> dict:
+        stamps = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        stamps[entry.name[:-5]] = (st.st_mtime_ns, st.st_size)
+        except OSError as e:
+            logger.error(f"Error getting categories: {e}")
+        return stamps
+
+    def refresh(self) -> bool:
+        """Load new and changed files, forget removed ones; True if anything changed."""
+        # The warm-up/watcher thread and a first lookup on the event loop may overlap
+        with self._lock:
+            changed = self._refresh()
+            self._loaded = True
+        return changed
+
+    def _refresh(self) -> bool:
+        stamps = self._scan()
+        changed = False
+        for category, stamp in stamps.items():
+            if self._stamps.get(category) == stamp:
+                continue
+            changed = True
+            self._errors.pop(category, None)
+            try:
+                quotes = _parse(self.directory / f"{category}.json")
+            except json.JSONDecodeError:
+                quotes, self._errors[category] = (), "⚠️ Invalid JSON format in quotes file."
+            except Exception as e:
+                quotes, self._errors[category] = (), f"⚠️ Error reading quote file: {e}"
+            self._quotes[category] = quotes
+            self._stamps[category] = stamp
+        for category in set(self._stamps) - set(stamps):
+            changed = True
+            del self._stamps[category]
+            self._quotes.pop(category, None)
+            self._errors.pop(category, None)
+        if changed:
+            self._categories = tuple(sorted(self._quotes))
+            self.reloads += 1
+            logger.info(f"Loaded {sum(map(len, self._quotes.values()))} quotes in {len(self._categories)} categories")
+        return changed
+
+    def random_quote(self, category: str) -> str:
+        if not self._loaded:
+            self.refresh()
+        quotes = self._quotes.get(category)
+        if quotes is None:
+            return "⚠️ No quotes found for this category."
+        if not quotes:
+            return self._errors.get(category, "⚠️ No quotes available or invalid format.")
+        return random.choice(quotes)
+
+    async def watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Quote reload failed: {e}")
@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from pyrogram import Client
+from pyrogram.types import Message, CallbackQuery, ChatJoinRequest, ChatMemberUpdated
+from config import ADMINS, RECORD_UPDATES, RECORD_DIR
+
+logger = logging.getLogger(__name__)
+
+# 🎞 Opt-in update recorder (RECORD_UPDATES=True) for benchmarks/replay.py.
+# Runs in group -1, before every other handler, and only notes what the
+# handlers branch on: ids are replaced by keyed hashes that are stable within
+# one trace, free text is reduced to its command word and length.
+
+
+class TraceWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        # Worker processes inherit the key, so their traces use the same pseudonyms
+        self._key = bytes.fromhex(os.environ.setdefault("RECORD_KEY", os.urandom(16).hex()))
+        self._lines = []
+        self._flusher = None
+        self.recorded = 0
+
+    def pseudonym(self, value: int) -> int:
+        digest = hashlib.blake2b(str(value).encode(), key=self._key, digest_size=6).digest()
+        h = int.from_bytes(digest, "big")
+        # Keep the shape of the id: users positive, channels/supergroups -100…
+        return -(1_000_000_000_000 + h % 1_000_000_000_000) if value < 0 else h % 10_000_000_000 + 1
+
+    def record(self, event: dict):
+        # Wall-clock time, so traces from several worker processes can be merged
+        event["t"] = round(time.time(), 4)
+        self._lines.append(json.dumps(event, separators=(",", ":")))
+        self.recorded += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(1)
+        await self.flush()
+
+    async def flush(self):
+        lines, self._lines = self._lines, []
+        if lines:
+            await asyncio.to_thread(self._append, "\n".join(lines) + "\n")
+
+    def _append(self, text: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+
+trace = None
+
+
+def _user(user) -> dict:
+    if user is None:
+        return {"user": None}
+    return {"user": trace.pseudonym(user.id), "admin": user.id == ADMINS}
+
+
+# Long numbers in callback data are chat/user ids (settings:<chat_id>); short ones are pages and the like
+_ID = re.compile(r"-?\d{5,}")
+
+
+def _data(data) -> str:
+    if not isinstance(data, str):
+        return None
+    return _ID.sub(lambda m: str(trace.pseudonym(int(m.group()))), data)
+
+
+def _text(text: str) -> dict:
+    if not text:
+        return {}
+    word = text.split(maxsplit=1)[0]
+    # Commands (and their argument count) drive the handlers; anything else is just its length
+    if word.startswith("/"):
+        return {"command": word.split("@", 1)[0], "args": len(text.split()) - 1}
+    return {"len": len(text)}
+
+
+if RECORD_UPDATES:
+    _worker = f"-w{os.environ['WORKER_INDEX']}" if "WORKER_INDEX" in os.environ else ""
+    trace = TraceWriter(Path(RECORD_DIR) / f"updates-{datetime.datetime.utcnow():%Y%m%d-%H%M%S}{_worker}.jsonl")
+    logger.info(f"Recording anonymised updates to {trace.path}")
+
+    @Client.on_message(group=-1)
+    async def record_message(client: Client, message: Message):
+        chat = message.chat
+        trace.record({
+            "type": "message",
+            "chat": trace.pseudonym(chat.id) if chat else None,
+            "chat_type": chat.type.name.lower() if chat else None,
+            **_user(message.from_user),
+            **_text(message.text or message.caption),
+            "reply": message.reply_to_message_id is not None,
+            "forwarded": message.forward_origin is not None,
+            "media": message.media.name.lower() if message.media else None,
+        })
+
+    @Client.on_callback_query(group=-1)
+    async def record_callback(client: Client, query: CallbackQuery):
+        trace.record({
+            "type": "callback",
+            "chat": trace.pseudonym(query.message.chat.id) if query.message and query.message.chat else None,
+            **_user(query.from_user),
+            "data": _data(query.data),
+        })
+
+    @Client.on_chat_join_request(group=-1)
+    async def record_join_request(client: Client, request: ChatJoinRequest):
+        trace.record({"type": "join_request", "chat": trace.pseudonym(request.chat.id), **_user(request.from_user)})
+
+    @Client.on_chat_member_updated(group=-1)
+    async def record_member(client: Client, update: ChatMemberUpdated):
+        member = update.new_chat_member or update.old_chat_member
+        trace.record({
+            "type": "member",
+            "chat": trace.pseudonym(update.chat.id),
+            **_user(member.user if member else None),
+            "bot": bool(member and member.user and member.user.id == client.me.id),
+            "by": trace.pseudonym(update.from_user.id) if update.from_user else None,
+            "old": update.old_chat_member.status.name.lower() if update.old_chat_member else None,
+            "new": update.new_chat_member.status.name.lower() if update.new_chat_member else None,
+        })
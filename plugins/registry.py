@@ -0,0 +1,72 @@
+import time
+from config import REGISTRY_DB
+from .sqlite_store import SQLiteStore
+
+ADMIN = "admin"
+DEMOTED = "demoted"
+REMOVED = "removed"
+
+
+class ChannelRegistry(SQLiteStore):
+    """Chats the bot is (or was) admin of, and which user made it admin."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS channels (
+        chat_id INTEGER PRIMARY KEY,
+        title TEXT
+    );
+    """
+
+    def migrate(self, conn):
+        # Tables created before the registry had owners only have chat_id and title
+        have = self.columns(conn, "channels")
+        for column, decl in (
+            ("username", "TEXT"),
+            ("added_by", "INTEGER"),
+            ("status", f"TEXT NOT NULL DEFAULT '{ADMIN}'"),
+            ("updated", "REAL"),
+        ):
+            if column not in have:
+                conn.execute(f"ALTER TABLE channels ADD COLUMN {column} {decl}")
+        conn.execute("CREATE INDEX IF NOT EXISTS channels_owner ON channels (added_by, status, chat_id)")
+
+    async def set_admin(self, chat_id: int, title: str, username: str, added_by: int):
+        # Keep the owner while the bot stays admin; whoever re-adds it after removal takes over
+        await self.execute(
+            """
+            INSERT INTO channels (chat_id, title, username, added_by, status, updated)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (chat_id) DO UPDATE SET
+                title = excluded.title,
+                username = excluded.username,
+                added_by = CASE WHEN channels.status = 'admin'
+                    THEN COALESCE(channels.added_by, excluded.added_by)
+                    ELSE COALESCE(excluded.added_by, channels.added_by) END,
+                status = excluded.status,
+                updated = excluded.updated
+            """,
+            (chat_id, title, username, added_by, ADMIN, time.time())
+        )
+
+    async def set_status(self, chat_id: int, status: str):
+        await self.execute(
+            "UPDATE channels SET status = ?, updated = ? WHERE chat_id = ?",
+            (status, time.time(), chat_id)
+        )
+
+    async def page(self, user_id: int, after: int = None, limit: int = 10) -> list:
+        """``(chat_id, title, username)`` of ``user_id``'s chats, ``limit`` at a time, by chat_id."""
+        if after is None:
+            return await self.fetchall(
+                "SELECT chat_id, title, username FROM channels "
+                "WHERE added_by = ? AND status = ? ORDER BY chat_id LIMIT ?",
+                (user_id, ADMIN, limit)
+            )
+        return await self.fetchall(
+            "SELECT chat_id, title, username FROM channels "
+            "WHERE added_by = ? AND status = ? AND chat_id > ? ORDER BY chat_id LIMIT ?",
+            (user_id, ADMIN, after, limit)
+        )
+
+
+channel_registry = ChannelRegistry(REGISTRY_DB)
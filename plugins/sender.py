@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from pyrogram.errors import FloodWait
+from config import SEND_GLOBAL_RATE, SEND_PRIVATE_RATE, SEND_GROUP_RATE, SEND_CHAT_BACKLOG
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value goes first when the global budget is tight
+INTERACTIVE = 0   # replies to commands and callbacks
+APPROVAL = 1      # approve/reject DMs
+BACKGROUND = 2    # log channel, approve channel, quote posts
+BROADCAST = 3
+
+# True while Sender.call runs a send: Bot.invoke then raises every FloodWait
+# instead of sleeping through short ones, so the buckets learn from all of them
+floods_handled = ContextVar("floods_handled", default=False)
+
+
+class TokenBucket:
+    __slots__ = ("base_rate", "rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _fill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token can be taken (0 when one is available now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._fill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._fill(now)
+        self.tokens -= 1
+
+    def flood(self, now: float, seconds: float):
+        # Telegram told us to back off: stop for that long, then come back slower
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0
+        self.rate = max(self.base_rate / 4, self.rate * 0.5)
+
+    def recover(self):
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+
+class Sender:
+    """Single gate for outgoing messages.
+
+    Every send first waits for its chat's bucket, then for a slot in the
+    global bucket; global slots are handed out by priority, so a running
+    broadcast cannot delay a /start reply by more than one slot.
+    """
+
+    def __init__(self, global_rate: float, private_rate: float, group_rate: float, chat_backlog: int):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.chat_backlog = chat_backlog
+        self._chats = {}       # chat_id -> TokenBucket
+        self._backlog = {}     # chat_id -> queued background posts
+        self._waiters = []     # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._dispatcher = None
+        self.remote = None     # set in worker processes: buckets live in the main process
+        self.sent = 0
+        self.dropped = 0
+        self.flood_waits = 0
+        self.flood_seconds = 0.0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 20000:
+                self._prune()
+            # Private chats: ~1 msg/s, groups and channels: ~20 msg/min
+            rate = self.private_rate if chat_id > 0 else self.group_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, 3)
+        return bucket
+
+    def _prune(self):
+        now = time.monotonic()
+        for chat_id in [c for c, b in self._chats.items() if now - b.updated > 60 and now > b.blocked_until]:
+            del self._chats[chat_id]
+
+    async def _acquire_chat(self, chat_id: int):
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            now = time.monotonic()
+            wait = bucket.delay(now)
+            if wait <= 0:
+                bucket.take(now)
+                return bucket
+            await asyncio.sleep(wait)
+
+    async def _acquire_global(self, priority: int):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        self._wakeup.set()
+        await fut
+
+    async def _dispatch(self):
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            wait = self.global_bucket.delay(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():  # waiter was cancelled
+                continue
+            self.global_bucket.take(now)
+            fut.set_result(None)
+
+    async def acquire(self, chat_id: int, priority: int):
+        """Wait for ``chat_id``'s bucket, then for a global slot."""
+        if self.remote:
+            return await self.remote.call("acquire", chat_id, priority)
+        await self._acquire_chat(chat_id)
+        await self._acquire_global(priority)
+
+    def feedback(self, chat_id: int, flood: float = 0):
+        """Report how a send went: ``flood`` is the FloodWait in seconds, 0 on success."""
+        if self.remote:
+            return self.remote.send("feedback", chat_id, flood)
+        bucket = self._chat_bucket(chat_id)
+        if not flood:
+            bucket.recover()
+            self.global_bucket.recover()
+            self.sent += 1
+            return
+        self.flood_waits += 1
+        self.flood_seconds += flood
+        bucket.flood(time.monotonic(), flood)
+        # One chat flooding says little about the global budget; slow it down a bit anyway
+        self.global_bucket.rate = max(self.global_bucket.base_rate / 2, self.global_bucket.rate * 0.9)
+
+    async def call(self, chat_id: int, priority: int, func, *args, retries: int = 2, **kwargs):
+        """Run ``func(*args, **kwargs)`` once ``chat_id`` and the global limit allow it."""
+        for attempt in range(retries + 1):
+            await self.acquire(chat_id, priority)
+            token = floods_handled.set(True)
+            try:
+                result = await func(*args, **kwargs)
+            except FloodWait as e:
+                self.feedback(chat_id, e.value)
+                logger.warning(f"FloodWait {e.value}s sending to {chat_id} (attempt {attempt + 1})")
+                if attempt == retries:
+                    raise
+                continue
+            finally:
+                floods_handled.reset(token)
+            self.feedback(chat_id)
+            return result
+
+    def post(self, chat_id: int, priority: int, func, *args, **kwargs):
+        """Fire-and-forget ``call``; drops the send if the chat already has too much queued."""
+        if self._backlog.get(chat_id, 0) >= self.chat_backlog:
+            self.dropped += 1
+            metrics.send_dropped.labels(chat_id).inc()
+            logger.warning(f"Send backlog for {chat_id} is full, refusing a send ({self.dropped} total)")
+            return None
+        self._backlog[chat_id] = self._backlog.get(chat_id, 0) + 1
+        return asyncio.create_task(self._post(chat_id, priority, func, *args, **kwargs))
+
+    async def _post(self, chat_id, priority, func, *args, **kwargs):
+        try:
+            await self.call(chat_id, priority, func, *args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Background send to {chat_id} failed: {e}")
+        finally:
+            left = self._backlog[chat_id] - 1
+            if left:
+                self._backlog[chat_id] = left
+            else:
+                del self._backlog[chat_id]
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "waiting": len(self._waiters),
+            "dropped": self.dropped,
+            "flood_waits": self.flood_waits,
+            "flood_seconds": self.flood_seconds,
+            "global_rate": self.global_bucket.rate,
+        }
+
+
+sender = Sender(SEND_GLOBAL_RATE, SEND_PRIVATE_RATE, SEND_GROUP_RATE, SEND_CHAT_BACKLOG)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from pyrogram import Client
+from config import API_ID, API_HASH, SESSION_POOL_SIZE, SESSION_IDLE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("client", "session", "users", "last_used")
+
+    def __init__(self, client: Client, session: str):
+        self.client = client
+        self.session = session
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    """Connected user-account clients, reused across /accept and /login.
+
+    Idle clients are disconnected after ``idle_ttl`` seconds or when more than
+    ``maxsize`` are open (least recently used first); clients in use are never
+    evicted.
+    """
+
+    def __init__(self, maxsize: int, idle_ttl: float):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self._entries = OrderedDict()  # user_id -> _Entry
+        self._locks = {}
+        self._reaper = None
+        self.hits = 0
+        self.connects = 0
+
+    def _lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def acquire(self, user_id: int, session: str) -> Client:
+        """Connected client for ``user_id``; pair every call with ``release``."""
+        async with self._lock(user_id):
+            entry = self._entries.get(user_id)
+            if entry is not None and (entry.session != session or not entry.client.is_connected):
+                await self._close(user_id)
+                entry = None
+            if entry is None:
+                client = Client(
+                    f"joinrequest_{user_id}", session_string=session,
+                    api_id=API_ID, api_hash=API_HASH, in_memory=True
+                )
+                await client.connect()
+                self.connects += 1
+                entry = self._add(user_id, client, session)
+            else:
+                self.hits += 1
+            entry.users += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(user_id)
+            return entry.client
+
+    def release(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            entry.users = max(0, entry.users - 1)
+            entry.last_used = time.monotonic()
+
+    def put(self, user_id: int, client: Client, session: str):
+        """Keep an already connected and authorized client (e.g. right after /login)."""
+        old = self._entries.pop(user_id, None)
+        if old is not None and old.client is not client:
+            asyncio.create_task(self._disconnect(old.client))
+        self._add(user_id, client, session)
+
+    async def discard(self, user_id: int):
+        async with self._lock(user_id):
+            await self._close(user_id)
+
+    def _add(self, user_id: int, client: Client, session: str) -> _Entry:
+        entry = self._entries[user_id] = _Entry(client, session)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self.maxsize:
+            for uid in [u for u, e in self._entries.items() if e.users == 0 and u != user_id]:
+                if len(self._entries) <= self.maxsize:
+                    break
+                asyncio.create_task(self._disconnect(self._entries.pop(uid).client))
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        return entry
+
+    async def _close(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            await self._disconnect(entry.client)
+
+    @staticmethod
+    async def _disconnect(client: Client):
+        try:
+            if client.is_connected:
+                await client.disconnect()
+        except Exception as e:
+            logger.warning(f"Error disconnecting user session: {e}")
+
+    async def _reap(self):
+        while self._entries:
+            await asyncio.sleep(min(60, self.idle_ttl))
+            now = time.monotonic()
+            for user_id in [u for u, e in self._entries.items() if e.users == 0 and now - e.last_used > self.idle_ttl]:
+                await self._close(user_id)
+                self._locks.pop(user_id, None)
+
+    async def close_all(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for user_id in list(self._entries):
+            await self._close(user_id)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+session_pool = SessionPool(SESSION_POOL_SIZE, SESSION_IDLE_TTL)
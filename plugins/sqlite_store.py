@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteStore:
+    """SQLite database used from asyncio without blocking the event loop.
+
+    Every statement runs on one dedicated thread that owns the connection, so
+    calls are serialized without locks. WAL mode lets readers in other
+    processes (backups, the sqlite3 shell) run alongside writes. Subclasses
+    put their schema in ``SCHEMA`` and can add migrations in ``migrate``.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self.migrate(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def migrate(self, conn: sqlite3.Connection):
+        pass
+
+    @staticmethod
+    def columns(conn: sqlite3.Connection, table: str) -> set:
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+    def _call(self, fn, args):
+        return fn(self._connect(), *args)
+
+    async def run(self, fn, *args):
+        """``fn(conn, *args)`` on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    async def execute(self, sql: str, params=()) -> int:
+        def _execute(conn):
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+        return await self.run(_execute)
+
+    async def fetchall(self, sql: str, params=()) -> list:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def close(self):
+        def _close(conn):
+            conn.close()
+            self._conn = None
+        if self._conn is not None:
+            await self.run(_close)
+        self._executor.shutdown(wait=False)
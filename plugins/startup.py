@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import time
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# ⏱ Startup timing. Blocking phases are marked in order until the bot takes
+# updates; warm-up jobs (MongoDB, indexes, caches, quote files) run after
+# that in the background and are timed on their own. Both end up in the log
+# and in /metrics as startup_phase_seconds{phase}.
+
+
+class StartupTimer:
+    def __init__(self):
+        # Imported at the top of bot.py, so "imports" covers everything after it
+        self.began = time.perf_counter()
+        self._last = self.began
+        self.phases = {}
+        self.warmups = {}
+        self.ready = None
+        self._pending = set()
+
+    def mark(self, phase: str):
+        """Close ``phase``: the time since the previous mark."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def set_ready(self) -> str:
+        self.ready = time.perf_counter() - self.began
+        self._report_warmups()
+        return f"ready in {self.ready:.2f}s ({_join(self.phases)})"
+
+    def background(self, phase: str, coro) -> asyncio.Task:
+        """Run a warm-up job without waiting for it; logged once all of them are done."""
+        task = asyncio.create_task(self._timed(phase, coro))
+        self._pending.add(task)
+        return task
+
+    async def _timed(self, phase: str, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        except Exception as e:
+            logger.error(f"Startup: {phase} failed: {e}")
+        finally:
+            self.warmups[phase] = time.perf_counter() - started
+            self._pending.discard(asyncio.current_task())
+            self._report_warmups()
+
+    def _report_warmups(self):
+        if self.ready is not None and not self._pending and self.warmups:
+            logger.info(f"Startup: warm-up done {time.perf_counter() - self.began:.2f}s after launch ({_join(self.warmups)})")
+
+    def seconds(self) -> dict:
+        return {**self.phases, **self.warmups, **({"ready": self.ready} if self.ready is not None else {})}
+
+
+def _join(phases: dict) -> str:
+    return " · ".join(f"{name} {seconds:.2f}s" for name, seconds in phases.items())
+
+
+startup = StartupTimer()
+
+metrics.Gauge(
+    "startup_phase_seconds", "Time spent in each startup phase (ready: launch until updates are taken).",
+    startup.seconds, labels=("phase",)
+)
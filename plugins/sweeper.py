@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from pyrogram.errors import InputUserDeactivated, PeerIdInvalid, UserNotParticipant, ChatAdminRequired
+from config import ADMINS, SWEEP_PERIOD, SWEEP_GRACE, SWEEP_BATCH, SWEEP_MAX_RATE, SWEEP_REMOVE
+from .database import db
+from .bio import check_user_bio, is_member
+from .sender import sender, BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# 🧹 Walks the approved-members index stalest-first and re-checks each bio.
+# Checks are paced so a full pass takes about SWEEP_PERIOD; the verified_at
+# of every member is the checkpoint, so a restart just carries on.
+stats = {"checked": 0, "ok": 0, "warned": 0, "removed": 0, "gone": 0, "errors": 0, "rate": 0.0}
+
+
+def _warning_text(tags):
+    return (
+        "⚠️ <b>Tag Missing From Your Bio</b>\n\n"
+        "<b><i>Add one of these tags back to your bio to stay a verified member:</i></b>\n"
+        + "\n".join(f"<blockquote>● <code>{tag}</code> ♡</blockquote>" for tag in tags)
+        + "\n\nIf it is still missing on the next check, you will be removed. 🌝"
+    )
+
+
+async def verify_member(client: Client, doc: dict):
+    chat_id, user_id, tags = doc["chat_id"], doc["user_id"], doc["tags"]
+    now = time.time()
+    try:
+        _, ok = await check_user_bio(client, user_id, tags)
+    except (InputUserDeactivated, PeerIdInvalid):
+        await db.remove_approved(chat_id, user_id)
+        stats["gone"] += 1
+        return
+
+    if ok:
+        await db.update_approved(chat_id, user_id, {"verified_at": now, "warned_at": None})
+        stats["ok"] += 1
+        return
+
+    # Only members get warned or removed; leave events can be missed while the bot is down
+    try:
+        member = await client.get_chat_member(chat_id, user_id)
+    except UserNotParticipant:
+        member = None
+    if not is_member(member):
+        await db.remove_approved(chat_id, user_id)
+        stats["gone"] += 1
+        return
+
+    if doc.get("warned_at") is None or not SWEEP_REMOVE:
+        try:
+            await sender.call(user_id, BACKGROUND, client.send_message, user_id, _warning_text(tags))
+        except Exception as e:
+            logger.info(f"Could not warn {user_id}: {e}")
+        # Come back to this member once the grace period is over
+        await db.update_approved(chat_id, user_id, {"verified_at": now - SWEEP_PERIOD + SWEEP_GRACE, "warned_at": now})
+        stats["warned"] += 1
+        return
+
+    try:
+        # Ban + unban removes the member without blocking a future join request
+        await client.ban_chat_member(chat_id, user_id)
+        await client.unban_chat_member(chat_id, user_id)
+        stats["removed"] += 1
+    except UserNotParticipant:
+        stats["gone"] += 1
+    except ChatAdminRequired:
+        logger.warning(f"Cannot remove members from {chat_id}: not an admin")
+        await db.update_approved(chat_id, user_id, {"verified_at": now})
+        return
+    await db.remove_approved(chat_id, user_id)
+
+
+async def bio_sweeper(client: Client):
+    await asyncio.sleep(60)
+    while True:
+        try:
+            due = await db.get_due_approved(time.time() - SWEEP_PERIOD, SWEEP_BATCH)
+            if not due:
+                await asyncio.sleep(min(600, SWEEP_PERIOD))
+                continue
+
+            # Even pace over the period, with some headroom to catch up after downtime
+            total = await db.approved_count()
+            rate = min(SWEEP_MAX_RATE, max(0.1, total / SWEEP_PERIOD * 1.2))
+            stats["rate"] = rate
+            for doc in due:
+                started = time.monotonic()
+                try:
+                    await verify_member(client, doc)
+                except Exception as e:
+                    stats["errors"] += 1
+                    logger.warning(f"Sweep check of {doc['user_id']} in {doc['chat_id']} failed: {e}")
+                    await db.update_approved(doc["chat_id"], doc["user_id"], {"verified_at": time.time()})
+                stats["checked"] += 1
+                await asyncio.sleep(max(0.0, 1 / rate - (time.monotonic() - started)))
+        except Exception as e:
+            logger.error(f"Bio sweeper error: {e}")
+            await asyncio.sleep(60)
+
+
+@Client.on_message(filters.command("sweepstats") & filters.user(ADMINS))
+async def sweep_stats(client: Client, message: Message):
+    total = await db.approved_count()
+    await message.reply_text(
+        f"🧹 <b>Bio Sweeper</b>\n\n"
+        f"Approved members tracked: {total}\n"
+        f"Pace: {stats['rate']:.2f} checks/s\n\n"
+        f"Checked: {stats['checked']}\n"
+        f"Still tagged: {stats['ok']}\n"
+        f"Warned: {stats['warned']}\n"
+        f"Removed: {stats['removed']}\n"
+        f"Gone: {stats['gone']}\n"
+        f"Errors: {stats['errors']}"
+    )
@@ -0,0 +1,133 @@
+import logging
+from pyrogram import Client, filters, enums
+from pyrogram.types import Message
+from pyrogram.errors import RPCError
+from config import ADMINS, TAG_RULES_TTL
+from .cache import TTLCache
+from .database import db
+from .matcher import TagRules
+from . import peers
+
+logger = logging.getLogger(__name__)
+
+# Default TAG MAP, used by every chat that has no rules of its own
+TAG_MAP = {
+    "#movie": ["@real_pirates", "@drama_loverx"],
+    "#drama": ["@drama_loverx"],
+    "#study": ["@II_LevelUP_II"],
+    "#success": ["@ii_way_to_success_ii"],
+    "#skill": ["@II_LevelUP_II"],
+    "#alone": ["@just_vibing_alone"],
+}
+
+DEFAULT_RULES = TagRules(TAG_MAP)
+
+# chat_id -> TagRules. The TTL only bounds how often we ask MongoDB for the
+# version; the rules themselves are re-read and recompiled when it changed.
+rules_cache = TTLCache(TAG_RULES_TTL)
+_compiled = {}
+
+
+async def get_tag_rules(chat_id: int) -> TagRules:
+    async def load():
+        version = await db.get_tag_rules_version(chat_id)
+        if not version:
+            return DEFAULT_RULES
+        compiled = _compiled.get(chat_id)
+        if compiled is None or compiled.version != version:
+            doc = await db.get_tag_rules(chat_id)
+            rules = {rule['hashtag']: rule['tags'] for rule in doc.get('rules', [])}
+            if not rules:
+                _compiled.pop(chat_id, None)
+                return DEFAULT_RULES
+            compiled = _compiled[chat_id] = TagRules(rules, doc['version'])
+        return compiled
+
+    return await rules_cache.get_or_load(chat_id, load)
+
+
+async def _can_edit(client: Client, chat_id: int, user_id: int) -> bool:
+    if user_id == ADMINS:
+        return True
+    try:
+        member = await client.get_chat_member(chat_id, user_id)
+    except RPCError:
+        return False
+    return member.status in (enums.ChatMemberStatus.ADMINISTRATOR, enums.ChatMemberStatus.OWNER)
+
+
+async def _parse_chat(client: Client, message: Message, min_args: int, usage: str):
+    if len(message.command) < min_args:
+        await message.reply_text(f"❌ Usage: `{usage}`")
+        return None
+    try:
+        chat_id = int(message.command[1])
+    except ValueError:
+        await message.reply_text(f"❌ Usage: `{usage}`")
+        return None
+    if not await _can_edit(client, chat_id, message.from_user.id):
+        await message.reply_text("❌ You must be an admin of that chat to change its tag rules.")
+        return None
+    return chat_id
+
+
+async def _save_rules(chat_id: int, rules: dict):
+    await db.set_tag_rules(chat_id, [{'hashtag': h, 'tags': t} for h, t in rules.items()])
+    # The chat's join requests may be handled by another worker process
+    peers.broadcast("tag_rules_changed", chat_id)
+
+
+@peers.hook("tag_rules_changed")
+def _tag_rules_changed(chat_id: int):
+    rules_cache.invalidate(chat_id)
+
+
+async def _current_rules(chat_id: int) -> dict:
+    doc = await db.get_tag_rules(chat_id)
+    return {rule['hashtag']: rule['tags'] for rule in (doc or {}).get('rules', [])}
+
+
+@Client.on_message(filters.command("addtag") & filters.private)
+async def add_tag_rule(client: Client, message: Message):
+    chat_id = await _parse_chat(client, message, 4, "/addtag <chat_id> <#hashtag> <@tag> [@tag ...]")
+    if chat_id is None:
+        return
+    hashtag = message.command[2].lower()
+    if not hashtag.startswith("#") or len(hashtag) < 2:
+        return await message.reply_text(f"❌ <code>{hashtag}</code> is not a hashtag: it must start with <code>#</code>.")
+    rules = await _current_rules(chat_id)
+    rules[hashtag] = list(dict.fromkeys(message.command[3:]))
+    await _save_rules(chat_id, rules)
+    await message.reply_text(
+        f"✅ <code>{hashtag}</code> in the description of <code>{chat_id}</code> now requires: "
+        f"{', '.join(rules[hashtag])}\n\n<i>This chat uses its own {len(rules)} rule(s) instead of the defaults.</i>"
+    )
+
+
+@Client.on_message(filters.command("deltag") & filters.private)
+async def delete_tag_rule(client: Client, message: Message):
+    chat_id = await _parse_chat(client, message, 3, "/deltag <chat_id> <#hashtag>")
+    if chat_id is None:
+        return
+    hashtag = message.command[2].lower()
+    rules = await _current_rules(chat_id)
+    if rules.pop(hashtag, None) is None:
+        return await message.reply_text(f"⚠️ No rule for <code>{hashtag}</code>.")
+    await _save_rules(chat_id, rules)
+    note = "" if rules else "\n\n<i>No rules left: the default rules apply again.</i>"
+    await message.reply_text(f"🗑 Removed the rule for <code>{hashtag}</code>.{note}")
+
+
+@Client.on_message(filters.command("tags") & filters.private)
+async def list_tag_rules(client: Client, message: Message):
+    chat_id = await _parse_chat(client, message, 2, "/tags <chat_id>")
+    if chat_id is None:
+        return
+    rules = await get_tag_rules(chat_id)
+    title = "Default rules" if rules is DEFAULT_RULES else f"Rules (version {rules.version})"
+    lines = [f"🏷 <b>{title}</b> for <code>{chat_id}</code>\n"]
+    for hashtag, tags in list(zip(rules.hashtags, rules.tags))[:50]:
+        lines.append(f"● <code>{hashtag}</code> → {', '.join(tags)}")
+    if len(rules.hashtags) > 50:
+        lines.append(f"\n… and {len(rules.hashtags) - 50} more")
+    await message.reply_text("\n".join(lines))
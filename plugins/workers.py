@@ -0,0 +1,484 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from pyrogram import Client, enums, raw, utils
+from pyrogram.types import Identifier
+from config import ADMINS, SLOW_HANDLER_SECONDS, HANDLER_TIMING, QUOTE_RELOAD_INTERVAL
+from . import metrics, peers
+from .sender import sender, floods_handled
+
+logger = logging.getLogger(__name__)
+
+# 🧵 Optional multi-process mode (WORKER_PROCESSES > 0).
+#
+# The main process keeps the only Telegram connection. Raw updates are
+# sharded by chat id (so one chat always lands in the same worker, in
+# arrival order) and pickled to N worker processes that run the plugin
+# handlers. Workers have no connection of their own: every API call, peer
+# lookup and send-rate slot is an RPC back to the main process, so FloodWait
+# handling, the send buckets and the API metrics stay in one place.
+#
+# The other direction goes through plugins/peers.py: the main process runs
+# hooks in the workers to read their stats and metrics or to invalidate
+# their caches, and workers relay their own invalidations to each other
+# through the main process.
+#
+# Messages are pickled up front so a bad payload fails in the caller instead
+# of silently inside the queue's feeder thread, and everything pushed during
+# one event-loop iteration goes through the queue as a single batch.
+
+
+def _dump(message) -> bytes:
+    return pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+
+
+class _Batcher:
+    def __init__(self, queue):
+        self.queue = queue
+        self.pending = []
+
+    def push(self, message):
+        data = _dump(message)
+        if not self.pending:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.pending.append(data)
+
+    def flush(self):
+        if self.pending:
+            batch, self.pending = self.pending, []
+            self.queue.put(batch)
+
+
+def _read_batches(queue, loop, handle):
+    # Runs in a thread: hands each batch to the event loop in one wakeup
+    while True:
+        try:
+            batch = queue.get()
+            if batch is None:
+                return
+            loop.call_soon_threadsafe(handle, [pickle.loads(data) for data in batch])
+        except (EOFError, OSError, TypeError, RuntimeError):
+            # Queue closed or loop gone: the process is shutting down
+            return
+
+
+def shard_of(chat_id: int, count: int) -> int:
+    return chat_id % count
+
+
+def route(update):
+    """(chat_id, user_id) of the raw updates the handlers care about, else None."""
+    if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage,
+                           raw.types.UpdateEditMessage, raw.types.UpdateEditChannelMessage)):
+        peer = getattr(update.message, "peer_id", None)
+        if peer is None:
+            return None
+        sender_peer = getattr(update.message, "from_id", None) or peer
+        return utils.get_peer_id(peer), getattr(sender_peer, "user_id", None)
+    if isinstance(update, (raw.types.UpdateBotCallbackQuery, raw.types.UpdateBotChatInviteRequester)):
+        return utils.get_peer_id(update.peer), update.user_id
+    if isinstance(update, raw.types.UpdateChannelParticipant):
+        return utils.get_channel_id(update.channel_id), update.actor_id
+    if isinstance(update, raw.types.UpdateChatParticipant):
+        return -update.chat_id, update.actor_id
+    return None
+
+
+class WorkerPool:
+    """Main-process side: worker processes, their inboxes and the RPC server.
+
+    ``target(index, inbox, outbox, *args)`` runs in each process; ``handlers``
+    maps RPC names to the coroutines (or plain functions) that serve them.
+    """
+
+    def __init__(self, count: int, target, *args):
+        self.count = count
+        self._ctx = multiprocessing.get_context("spawn")
+        self.inboxes = [self._ctx.Queue() for _ in range(count)]
+        self.outbox = self._ctx.Queue()
+        self._senders = [_Batcher(inbox) for inbox in self.inboxes]
+        self._target = target
+        self._args = args
+        self.processes = []
+        self.handlers = {}
+        self._ids = itertools.count()
+        self._replies = {}
+        self._loop = None
+        self._reader = None
+        self._supervisor = None
+        self.forwarded = 0
+        self.restarts = 0
+        self.calls = 0
+
+    def start(self, handlers: dict):
+        self.handlers = {**handlers, "broadcast": self._relay}
+        self._loop = asyncio.get_running_loop()
+        peers.transport = self
+        self.processes = [self._spawn(index) for index in range(self.count)]
+        self._supervisor = asyncio.create_task(self._supervise())
+        self._reader = threading.Thread(
+            target=_read_batches, args=(self.outbox, self._loop, self._handle), name="worker-rpc", daemon=True
+        )
+        self._reader.start()
+        logger.info(f"Started {self.count} worker processes")
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=self._target, args=(index, self.inboxes[index], self.outbox, *self._args),
+            name=f"worker-{index}", daemon=True
+        )
+        process.start()
+        return process
+
+    async def _supervise(self):
+        # A crashed worker is replaced; its shard's updates wait in the inbox meanwhile
+        while True:
+            await asyncio.sleep(5)
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logger.error(f"{process.name} exited with code {process.exitcode}, restarting")
+                    self.restarts += 1
+                    self.processes[index] = self._spawn(index)
+
+    def submit(self, chat_id: int, payload):
+        # Updates sent before start() wait in the queue until the worker is up
+        self._senders[shard_of(chat_id, self.count)].push(("update", payload))
+        self.forwarded += 1
+
+    def _handle(self, messages):
+        for message in messages:
+            if message[0] == "reply":
+                self._resolve(*message[1:])
+                continue
+            self.calls += 1
+            if message[0] == "call":
+                _, index, call_id, name, args = message
+                asyncio.create_task(self._serve(index, call_id, name, args))
+            else:
+                _, name, args = message
+                asyncio.create_task(self._serve(None, None, name, args))
+
+    def _resolve(self, call_id, ok, value):
+        fut = self._replies.pop(call_id, None)
+        if fut is None or fut.done():
+            return
+        if ok:
+            fut.set_result(value)
+        else:
+            fut.set_exception(value)
+
+    def broadcast(self, name: str, args, exclude: int = None):
+        """Run peers hook ``name`` in every worker (but ``exclude``), without waiting."""
+        for index, batcher in enumerate(self._senders):
+            if index != exclude:
+                batcher.push(("hook", None, name, args))
+
+    def _relay(self, name, args, origin):
+        # A worker's broadcast: it already ran the hook itself
+        peers.run(name, args)
+        self.broadcast(name, args, exclude=origin)
+
+    async def gather(self, name: str, args, timeout: float = 5) -> list:
+        """Results of peers hook ``name`` from every live worker; slow or failing ones are left out."""
+        futures = []
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                call_id = next(self._ids)
+                fut = self._replies[call_id] = self._loop.create_future()
+                futures.append(fut)
+                self._senders[index].push(("hook", call_id, name, args))
+        if not futures:
+            return []
+        done, pending = await asyncio.wait(futures, timeout=timeout)
+        for fut in pending:
+            fut.cancel()
+        results = []
+        for fut in done:
+            if fut.exception() is None:
+                results.append(fut.result())
+            else:
+                logger.warning(f"Worker hook {name} failed: {fut.exception()}")
+        return results
+
+    async def _serve(self, index, call_id, name, args):
+        try:
+            result = self.handlers[name](*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            reply = ("result", call_id, True, result)
+        except Exception as e:
+            if index is None:
+                logger.warning(f"Worker notification {name} failed: {e}")
+                return
+            reply = ("result", call_id, False, e)
+        if index is None:
+            return
+        try:
+            self._senders[index].push(reply)
+        except Exception as e:
+            self._senders[index].push(("result", call_id, False, RuntimeError(f"{name}: unpicklable result ({e})")))
+
+    async def stop(self, timeout: float = 10):
+        peers.transport = None
+        if self._supervisor:
+            self._supervisor.cancel()
+        for batcher in self._senders:
+            batcher.push(("stop",))
+            batcher.flush()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, terminating")
+                process.terminate()
+        self.outbox.put(None)
+        self.processes.clear()
+
+    def stats(self) -> dict:
+        return {
+            "processes": self.count,
+            "alive": sum(p.is_alive() for p in self.processes),
+            "forwarded": self.forwarded,
+            "calls": self.calls,
+            "restarts": self.restarts,
+        }
+
+
+class WorkerLink:
+    """Worker-process side of the pool: receives updates and makes RPCs."""
+
+    def __init__(self, index: int, inbox, outbox):
+        self.index = index
+        self.inbox = inbox
+        self.outbox = _Batcher(outbox)
+        self.stopped = asyncio.Event()
+        self._ids = itertools.count()
+        self._calls = {}
+        self._loop = None
+        self._on_update = None
+
+    def start(self, on_update):
+        self._loop = asyncio.get_running_loop()
+        self._on_update = on_update
+        peers.transport = self
+        threading.Thread(
+            target=_read_batches, args=(self.inbox, self._loop, self._handle), name="worker-inbox", daemon=True
+        ).start()
+
+    def _handle(self, messages):
+        for message in messages:
+            if message[0] == "update":
+                self._on_update(message[1])
+            elif message[0] == "result":
+                self._resolve(*message[1:])
+            elif message[0] == "hook":
+                self._hook(*message[1:])
+            elif message[0] == "stop":
+                self.stopped.set()
+
+    def _resolve(self, call_id, ok, value):
+        fut = self._calls.pop(call_id, None)
+        if fut is None or fut.done():
+            return
+        if ok:
+            fut.set_result(value)
+        else:
+            fut.set_exception(value)
+
+    def _hook(self, call_id, name, args):
+        # Hooks are functions on this process's state; errors go back to gather()
+        try:
+            result = peers.hooks[name](*args)
+        except Exception as e:
+            return self._reply(call_id, name, False, e)
+        if asyncio.iscoroutine(result):
+            # Long-running hooks (/profile) answer when done, without holding up the inbox
+            asyncio.create_task(self._await_hook(call_id, name, result))
+        else:
+            self._reply(call_id, name, True, result)
+
+    async def _await_hook(self, call_id, name, coro):
+        try:
+            self._reply(call_id, name, True, await coro)
+        except Exception as e:
+            self._reply(call_id, name, False, e)
+
+    def _reply(self, call_id, name, ok, value):
+        if call_id is None:
+            if not ok:
+                logger.warning(f"Hook {name} failed: {value}")
+            return
+        try:
+            self.outbox.push(("reply", call_id, ok, value))
+        except Exception as e:
+            self.outbox.push(("reply", call_id, False, RuntimeError(f"{name}: unpicklable result ({e})")))
+
+    def broadcast(self, name: str, args):
+        # Through the main process, which runs it there and in the other workers
+        self.send("broadcast", name, args, self.index)
+
+    async def gather(self, name: str, args, timeout: float = 5) -> list:
+        # Stats are gathered by the main process; a worker has no peers of its own
+        return []
+
+    async def call(self, name: str, *args):
+        call_id = next(self._ids)
+        fut = self._loop.create_future()
+        self._calls[call_id] = fut
+        try:
+            self.outbox.push(("call", self.index, call_id, name, args))
+            return await fut
+        finally:
+            self._calls.pop(call_id, None)
+
+    def send(self, name: str, *args):
+        # One-way notification, no reply
+        self.outbox.push(("send", name, args))
+
+
+class WorkerClient(Client):
+    """Client for worker processes: handlers run here, Telegram is reached through the main process."""
+
+    def __init__(self, link: WorkerLink):
+        super().__init__(
+            f"worker_{link.index}",
+            in_memory=True,
+            plugins=dict(root="plugins"),
+            workers=50,
+            sleep_threshold=10
+        )
+        self.link = link
+
+    async def invoke(self, query, *args, sleep_threshold=None, **kwargs):
+        api = metrics.api_time.get()
+        started = time.perf_counter()
+        try:
+            # The main process can't see this task's context: pass sender.call's choice along
+            return await self.link.call("invoke", query, 0 if floods_handled.get() else sleep_threshold)
+        finally:
+            if api is not None:
+                api[0] += time.perf_counter() - started
+
+    async def resolve_peer(self, peer_id):
+        # The main process has every peer's access hash; workers only see their shard
+        return await self.link.call("resolve_peer", peer_id)
+
+    async def serve(self):
+        from .bio import bio_refresher, join_queue
+        from .database import db
+        from .quote.quote import quote_store
+        from . import recorder
+        from .outbox import outbox
+        from .startup import startup
+
+        startup.mark("imports")
+        await self.storage.open()
+        self.is_connected = True
+        # Updates that arrive before the dispatcher starts wait in its queue
+        self.link.start(self.dispatcher.updates_queue.put_nowait)
+        sender.remote = self.link
+        self.me = await self.get_me()
+        self.username = "@" + self.me.username
+        self.load_plugins()
+        metrics.detailed = HANDLER_TIMING
+        for handlers in self.dispatcher.groups.values():
+            for handler in handlers:
+                callback = handler.callback
+                if asyncio.iscoroutinefunction(callback) and not getattr(callback, "instrumented", False):
+                    handler.callback = metrics.instrument(callback, SLOW_HANDLER_SECONDS)
+        await self.dispatcher.start()
+
+        join_queue.start(self)
+        startup.mark("handlers")
+        startup.background("quotes", asyncio.to_thread(quote_store.refresh))
+        startup.background("known users", db.load_known_users())
+        tasks = [
+            asyncio.create_task(bio_refresher(self)),
+            asyncio.create_task(quote_store.watch(QUOTE_RELOAD_INTERVAL)),
+        ]
+        logger.info(f"Worker {self.link.index} {startup.set_ready()} (pid {os.getpid()})")
+
+        await self.link.stopped.wait()
+        await join_queue.stop()
+        await outbox.flush()
+        for task in tasks:
+            task.cancel()
+        await self.dispatcher.stop()
+        if recorder.trace:
+            await recorder.trace.flush()
+        await self.storage.close()
+
+
+async def _serve_worker(index, inbox, outbox):
+    await WorkerClient(WorkerLink(index, inbox, outbox)).serve()
+
+
+def worker_main(index: int, inbox, outbox):
+    """Entry point of each worker process."""
+    os.environ["WORKER_INDEX"] = str(index)
+    logging.basicConfig(level=logging.INFO, format=f"[worker {index}] %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_serve_worker(index, inbox, outbox))
+
+
+# Private commands whose state lives in the main process: drains resume there
+# and the logged-in user sessions are pooled there
+MAIN_COMMANDS = ("accept", "login", "logout")
+
+
+def command_of(update) -> str:
+    """Bot command a raw message update starts with ("" if none), without the /prefix or @botname."""
+    text = getattr(getattr(update, "message", None), "message", None)
+    if not text or not text.startswith("/"):
+        return ""
+    return text[1:].split("@", 1)[0].split(None, 1)[0].lower() if text[1:2].strip() else ""
+
+
+class ShardingQueue(asyncio.Queue):
+    """Main-process ``dispatcher.updates_queue``: forwards chat updates to the workers.
+
+    Updates from the admin stay in the main process, where the jobs their
+    commands control (broadcasts, quote scheduler, sweeps, drains) run. So do
+    /accept, /login and /logout, and any reply a main-process handler is
+    waiting for (``client.listen``/``ask``). Anything without a chat is
+    handled locally as before.
+    """
+
+    def __init__(self, pool: WorkerPool, client: Client):
+        super().__init__()
+        self.pool = pool
+        self.client = client
+
+    def put_nowait(self, packet):
+        if packet is not None:
+            target = route(packet[0])
+            if target is not None and target[1] != ADMINS and not self._local(packet[0], *target):
+                return self.pool.submit(target[0], packet)
+        super().put_nowait(packet)
+
+    def _local(self, update, chat_id, user_id) -> bool:
+        if command_of(update) in MAIN_COMMANDS:
+            return True
+        listeners = self.client.listeners[enums.ListenerTypes.MESSAGE]
+        if not listeners:
+            return False
+        data = Identifier(chat_id=chat_id, from_user_id=user_id)
+        return any(listener.identifier.matches(data) for listener in listeners)
+
+
+# Worker handler metrics, merged into the main process's /metrics
+peers.hook("metrics")(metrics.snapshot)
+
+
+def rpc_handlers(client: Client) -> dict:
+    """What workers may ask the main process to do."""
+    return {
+        "invoke": lambda query, sleep_threshold: client.invoke(query, sleep_threshold=sleep_threshold),
+        "resolve_peer": client.resolve_peer,
+        "acquire": sender.acquire,
+        "feedback": sender.feedback,
+    }